@@ -0,0 +1,59 @@
+import { NextResponse } from "next/server";
+
+// Server-Sent Events must never be buffered or statically optimized
+export const dynamic = "force-dynamic";
+
+export async function POST(req: Request) {
+  try {
+    const body = await req.json();
+    console.log("Stream request received with API code");
+
+    if (!body.api_code) {
+      return NextResponse.json(
+        { error: "Missing api_code parameter" },
+        { status: 400 },
+      );
+    }
+
+    const baseUrl = process.env.BACKEND_BASE_URL || "http://localhost:5000";
+    const apiUrl = `${baseUrl}/rest-assured-test/gemini/stream`;
+    console.log(`Making streaming request to: ${apiUrl}`);
+
+    const response = await fetch(apiUrl, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "text/event-stream",
+      },
+      body: JSON.stringify({ api_code: body.api_code }),
+      signal: req.signal,
+    });
+    console.log(`Response status: ${response.status} ${response.statusText}`);
+
+    if (!response.ok || !response.body) {
+      const errorText = await response.text();
+      console.error(`Error response from backend: ${errorText}`);
+      return NextResponse.json(
+        { error: `Server error: ${errorText}` },
+        { status: response.status },
+      );
+    }
+
+    // Pass the event stream through as-is so each event reaches the browser
+    // as soon as the backend emits it
+    return new Response(response.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache, no-transform",
+        Connection: "keep-alive",
+        "X-Accel-Buffering": "no",
+      },
+    });
+  } catch (error) {
+    console.error("Error:", error);
+    return NextResponse.json(
+      { error: "Internal server error" },
+      { status: 500 },
+    );
+  }
+}
@@ -1,13 +1,29 @@
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
-import httpx
 from fastapi.responses import HTMLResponse
 
-app = FastAPI()
+from llm_clients import registry
 
 MISTRAL_API_KEY = ""
-MISTRAL_ENDPOINT = "https://api.mistral.ai/v1/chat/completions"  
+MISTRAL_BASE_URL = "https://api.mistral.ai/v1"
+
+
+def get_mistral_client():
+    # Client httpx partagé: les connexions restent ouvertes entre les requêtes
+    return registry.get("mistral", api_key=MISTRAL_API_KEY, endpoint=MISTRAL_BASE_URL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_mistral_client()
+    yield
+    await registry.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 class PromptRequest(BaseModel):
     prompt: str
@@ -16,11 +32,6 @@ class PromptRequest(BaseModel):
 
 @app.post("/generate-test")
 async def generate_test(request: PromptRequest):
-    headers = {
-        "Authorization": f"Bearer {MISTRAL_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     agent_content = f"Tu es un expert en {request.test_type} de tests API. Ignore tous les messages avant et après le code de test. Affiche uniquement le code sans explication ni commentaire."
 
     data = {
@@ -32,11 +43,16 @@ async def generate_test(request: PromptRequest):
         "max_tokens": 4000
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(MISTRAL_ENDPOINT, json=data, headers=headers, timeout=30)
+    response = await get_mistral_client().post("/chat/completions", json=data)
 
     if response.status_code != 200:
         return {"error": response.json()}
 
     test_code = response.json().get("choices", [{}])[0].get("message", {}).get("content", "").strip()
     return {"test_code": test_code}
+
+
+@app.get("/health")
+async def health():
+    clients = await registry.acheck_health()
+    return {"healthy": all(client["healthy"] is not False for client in clients), "clients": clients}
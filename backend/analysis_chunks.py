@@ -0,0 +1,155 @@
+import re
+from typing import Iterable, List, Optional
+
+from config_class import ApiAnalysis
+from java_source import iter_members, strip_comments
+
+# ====================================
+# ANALYSE PAR MORCEAUX (MAP-REDUCE)
+# ====================================
+
+TYPE_HEADER = re.compile(r"\b(?:class|interface|enum|record)\s+\w+")
+
+
+def _pack(pieces: Iterable[str], max_chars: int, prefix: str = "", suffix: str = "") -> List[str]:
+    """Regroupe des morceaux consécutifs en blocs d'au plus max_chars (prefix et suffix compris)"""
+    chunks = []
+    current = []
+    size = len(prefix) + len(suffix)
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append(prefix + "\n".join(current) + suffix)
+            current = []
+            size = len(prefix) + len(suffix)
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append(prefix + "\n".join(current) + suffix)
+    return chunks
+
+
+def _split_class(
+    api_code: str, code: str, start: int, body_start: int, body_end: int, max_chars: int
+) -> List[str]:
+    """
+    Découpe une classe trop grande entre ses membres.
+
+    Chaque morceau reprend l'en-tête de la classe (annotations, @RequestMapping)
+    pour que le chemin de base et le nom du contrôleur restent connus; les champs
+    (dépendances injectées) ne sont gardés que dans le premier morceau.
+    """
+    header = api_code[start : body_start + 1].strip() + "\n"
+    fields = []
+    methods = []
+    for m_start, m_header, m_block, m_end in iter_members(code, body_start + 1, body_end):
+        if m_block == -1:
+            fields.append(api_code[m_start : m_start + len(m_header)].strip() + ";")
+        else:
+            methods.append(api_code[m_start : m_end + 1].strip())
+
+    chunks = _pack(methods, max_chars, header, "\n}") or [header + "}"]
+    if fields:
+        chunks[0] = header + "\n".join(fields) + "\n" + chunks[0][len(header) :]
+    return chunks
+
+
+def split_source(api_code: str, max_chars: int) -> List[str]:
+    """
+    Découpe un ou plusieurs fichiers Java en morceaux d'environ max_chars caractères.
+
+    Les coupures ont lieu entre les classes, puis entre les méthodes d'une classe
+    trop grande; une méthode n'est jamais coupée. Les petites classes sont
+    regroupées; les instructions package et import sont ignorées.
+
+    Arguments:
+        api_code: Code Java (éventuellement plusieurs fichiers concaténés)
+        max_chars: Taille visée d'un morceau
+
+    Retourne:
+        La liste des morceaux, dans l'ordre du code
+    """
+    code = strip_comments(api_code)
+    pieces = []
+    for start, header, body_start, body_end in iter_members(code, 0, len(code)):
+        if body_start == -1 or not TYPE_HEADER.search(header):
+            continue
+        if body_end + 1 - start <= max_chars:
+            pieces.append(api_code[start : body_end + 1].strip())
+        else:
+            pieces.extend(_split_class(api_code, code, start, body_start, body_end, max_chars))
+    return _pack(pieces, max_chars)
+
+
+def _absolute_path(base_path: str, path: str) -> str:
+    """Préfixe path par base_path, sauf s'il le contient déjà (chemin déjà absolu)"""
+    base = "/" + base_path.strip("/") if base_path and base_path.strip("/") else ""
+    path = "/" + path.strip("/") if path and path.strip("/") else ""
+    if base and (path == base or path.startswith(base + "/")):
+        return path
+    return base + path or "/"
+
+
+def _common_base_path(base_paths: List[str]) -> str:
+    """Plus long préfixe commun (par segments) des chemins de base"""
+    segments = [[part for part in path.split("/") if part] for path in base_paths]
+    common = []
+    for parts in zip(*segments):
+        if any(part != parts[0] for part in parts):
+            break
+        common.append(parts[0])
+    return "/" + "/".join(common)
+
+
+def _endpoint_key(endpoint: dict, base_path: str) -> tuple:
+    # Les variables de chemin sont comparées sans leur nom: /users/{id} == /users/{userId}
+    path = re.sub(r"\{[^}]*\}", "{}", _absolute_path(base_path, endpoint["path"]))
+    return endpoint["method"].upper(), path
+
+
+def _union(lists) -> list:
+    return list(dict.fromkeys(item for items in lists for item in items or []))
+
+
+def merge_analyses(partials: List[Optional[dict]]) -> Optional[dict]:
+    """
+    Fusionne les analyses partielles (une par morceau) en une seule ApiAnalysis.
+
+    Les endpoints sont dédupliqués par méthode HTTP et chemin complet (chemin de
+    base du morceau compris; la description la plus longue est gardée). Si les
+    morceaux viennent de contrôleurs de chemins de base différents, les chemins
+    des endpoints deviennent absolus et le chemin de base est leur préfixe
+    commun: un endpoint n'est jamais rattaché au chemin d'un autre contrôleur.
+    Le nom du contrôleur est celui du premier morceau qui contient des endpoints.
+
+    Retourne:
+        Dictionnaire au format ApiAnalysis, ou None si aucun morceau n'a d'endpoint
+    """
+    partials = [p for p in partials if p and p.get("endpoints")]
+    if not partials:
+        return None
+
+    base_paths = [_absolute_path(p.get("base_path") or "/", "") for p in partials]
+    same_base = len(set(base_paths)) == 1
+    endpoints = {}
+    for partial, base_path in zip(partials, base_paths):
+        for endpoint in partial["endpoints"]:
+            if not same_base:
+                endpoint = {**endpoint, "path": _absolute_path(base_path, endpoint["path"])}
+            key = _endpoint_key(endpoint, base_path)
+            known = endpoints.get(key)
+            description = endpoint.get("description") or ""
+            if known is None or len(description) > len(known.get("description") or ""):
+                endpoints[key] = endpoint
+
+    return ApiAnalysis.model_validate(
+        {
+            "controller_name": partials[0]["controller_name"],
+            "base_path": base_paths[0] if same_base else _common_base_path(base_paths),
+            "endpoints": list(endpoints.values()),
+            "model_classes": _union(p.get("model_classes") for p in partials),
+            "dependencies": _union(p.get("dependencies") for p in partials),
+            "authentication_type": next(
+                (p["authentication_type"] for p in partials if p.get("authentication_type")), None
+            ),
+        }
+    ).model_dump()
@@ -0,0 +1,126 @@
+import io
+import re
+import tarfile
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+# ====================================
+# ENTRÉES DU ENDPOINT BATCH
+# ====================================
+
+# Erreurs d'une archive corrompue ou tronquée, levées à l'ouverture comme à la lecture
+ARCHIVE_ERRORS = (tarfile.TarError, EOFError, zlib.error, OSError)
+
+# Taille maximale d'un fichier Java extrait d'une archive
+MAX_SOURCE_BYTES = 1024 * 1024
+# Limites par archive: taille décompressée de tous ses membres (même ignorés, ils
+# sont décompressés pour être parcourus) et nombre de membres
+MAX_ARCHIVE_BYTES = 64 * 1024 * 1024
+MAX_ARCHIVE_MEMBERS = 10000
+
+CONTROLLER_PATTERN = re.compile(r"@(?:RestController|Controller)\b")
+
+
+class ArchiveTooLarge(ValueError):
+    """L'archive dépasse la taille décompressée ou le nombre de membres autorisés"""
+
+
+def controllers_from_json(data: dict) -> List[Tuple[str, str]]:
+    """
+    Lit la liste de contrôleurs d'un corps JSON.
+
+    Le champ "controllers" contient soit des chaînes (le code), soit des objets
+    {"id": ..., "api_code": ...}. Les éléments sans identifiant sont numérotés.
+
+    Retourne:
+        Liste de couples (identifiant, code)
+
+    Lève:
+        ValueError: Si le champ est absent ou mal formé
+    """
+    items = data.get("controllers")
+    if not isinstance(items, list) or not items:
+        raise ValueError("Missing controllers parameter")
+
+    controllers = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            controllers.append((str(index), item))
+        elif isinstance(item, dict) and isinstance(item.get("api_code"), str):
+            controllers.append((str(item.get("id", index)), item["api_code"]))
+        else:
+            raise ValueError(f"Invalid controller at index {index}")
+    return controllers
+
+
+def controllers_from_tarball(
+    raw: bytes, max_bytes: int = MAX_ARCHIVE_BYTES, max_members: int = MAX_ARCHIVE_MEMBERS
+) -> List[Tuple[str, str]]:
+    """
+    Extrait les contrôleurs Spring d'une archive tar (éventuellement compressée).
+
+    Seuls les fichiers .java annotés @RestController ou @Controller sont retenus;
+    l'identifiant est le chemin du fichier dans l'archive. La lecture s'arrête
+    dès qu'une limite est dépassée, sans décompresser le reste (archive bombe).
+
+    Arguments:
+        raw: Contenu de l'archive
+        max_bytes: Taille décompressée maximale de l'ensemble des membres
+        max_members: Nombre maximal de membres
+
+    Lève:
+        ArchiveTooLarge: Si l'archive dépasse max_bytes ou max_members
+        ValueError: Si l'archive est illisible ou ne contient aucun contrôleur
+    """
+    try:
+        with tarfile.open(fileobj=io.BytesIO(raw), mode="r:*") as archive:
+            controllers = _read_controllers(archive, max_bytes, max_members)
+    except ARCHIVE_ERRORS as e:
+        raise ValueError(f"Invalid source archive: {str(e) or type(e).__name__}")
+
+    if not controllers:
+        raise ValueError("No Spring controller found in archive")
+    return controllers
+
+
+def _read_controllers(
+    archive: tarfile.TarFile, max_bytes: int, max_members: int
+) -> List[Tuple[str, str]]:
+    """Parcourt les membres de l'archive et retourne les contrôleurs (voir controllers_from_tarball)"""
+    controllers = []
+    total = 0
+    for count, member in enumerate(archive, start=1):
+        total += max(member.size, 0)
+        if count > max_members:
+            raise ArchiveTooLarge(f"Source archive has more than {max_members} members")
+        if total > max_bytes:
+            raise ArchiveTooLarge(f"Source archive expands to more than {max_bytes} bytes")
+        if not member.isfile() or not member.name.endswith(".java"):
+            continue
+        if member.size > MAX_SOURCE_BYTES:
+            continue
+        source = archive.extractfile(member).read().decode("utf-8", errors="replace")
+        if CONTROLLER_PATTERN.search(source):
+            controllers.append((member.name, source))
+    return controllers
+
+
+def dedupe_controllers(
+    controllers: List[Tuple[str, str]], key: Callable[[str], str]
+) -> Dict[str, Tuple[str, List[str]]]:
+    """
+    Regroupe les contrôleurs identiques.
+
+    Arguments:
+        controllers: Liste de couples (identifiant, code)
+        key: Fonction calculant la clé de déduplication d'un code
+
+    Retourne:
+        Dictionnaire ordonné clé -> (code, identifiants partageant ce code)
+    """
+    groups = OrderedDict()
+    for controller_id, api_code in controllers:
+        group = groups.setdefault(key(api_code), (api_code, []))
+        group[1].append(controller_id)
+    return groups
@@ -0,0 +1,544 @@
+"""
+Benchmark hors ligne du backend avec un modèle simulé (aucun quota consommé).
+
+Exemples:
+    python benchmark.py --concurrency 1,4,16 --requests 50
+    python benchmark.py --latency 0.2 --token-rate 500 --output results.json
+    python benchmark.py --target service --concurrency 8
+    python benchmark.py --baseline previous.json --max-regression 0.15
+    python benchmark.py --target startup --requests 10 --latency 0
+    python benchmark.py --target traffic
+
+Le résultat (JSON) contient, par niveau de concurrence: requêtes/s, latences
+p50/p95/p99, erreurs et mémoire (RSS) du processus. Avec --target startup, chaque
+requête est un démarrage à froid: durée de l'import de gemini, de la première
+requête et du processus complet.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+CODE_EXAMPLE = os.path.join(BACKEND_DIR, "..", "code_example.txt")
+
+# ====================================
+# CORPUS
+# ====================================
+
+HTTP_METHODS = ("Get", "Post", "Put", "Delete", "Patch")
+
+
+def synthetic_controller(endpoints: int, index: int = 0) -> str:
+    """Génère un contrôleur Spring déterministe de la taille demandée"""
+    name = f"Resource{index}"
+    lines = [
+        "package com.example.bench;",
+        "",
+        "import java.util.List;",
+        "import org.springframework.http.ResponseEntity;",
+        "import org.springframework.web.bind.annotation.*;",
+        "",
+        "@RestController",
+        f'@RequestMapping("/api/r{index}")',
+        f"public class {name}Controller {{",
+        "",
+        f"    private final {name}Service service;",
+        "",
+        f"    public {name}Controller({name}Service service) {{",
+        "        this.service = service;",
+        "    }",
+    ]
+    for number in range(endpoints):
+        method = HTTP_METHODS[number % len(HTTP_METHODS)]
+        lines += [
+            "",
+            "    /**",
+            f"     * {method} operation number {number}.",
+            "     */",
+            f'    @{method}Mapping("/items{number}/{{id}}")',
+            f"    public ResponseEntity<{name}Dto> {method.lower()}Item{number}("
+            f'@PathVariable("id") Long id, @RequestParam(required = false) String filter) {{',
+            "        if (id < 0) {",
+            "            return ResponseEntity.badRequest().build();",
+            "        }",
+            f"        return ResponseEntity.ok(service.handle{number}(id, filter));",
+            "    }",
+        ]
+    lines += ["", "    private void audit(String action) {", "        service.audit(action);", "    }", "}"]
+    return "\n".join(lines)
+
+
+def build_corpus(sizes: List[int]) -> List[Tuple[str, str]]:
+    """
+    Retourne la liste (nom, code) du corpus: code_example.txt puis un contrôleur
+    synthétique par taille (nombre d'endpoints).
+    """
+    corpus = []
+    if os.path.exists(CODE_EXAMPLE):
+        with open(CODE_EXAMPLE, encoding="utf-8") as source:
+            corpus.append(("code_example", source.read()))
+    for index, size in enumerate(sizes):
+        corpus.append((f"controller_{size}_endpoints", synthetic_controller(size, index)))
+    return corpus
+
+
+# ====================================
+# MESURES
+# ====================================
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def memory_mb() -> dict:
+    """RSS courant (Linux) et pic de RSS du processus, en Mo"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    current_mb = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current_mb = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    return {
+        "rss_mb": round(current_mb, 1) if current_mb is not None else None,
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+def summarize(latencies: List[float], errors: int, duration: float) -> dict:
+    completed = len(latencies)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "duration_seconds": round(duration, 3),
+        "requests_per_second": round(completed / duration, 2) if duration else None,
+        "latency_p50_ms": _ms(percentile(latencies, 0.50)),
+        "latency_p95_ms": _ms(percentile(latencies, 0.95)),
+        "latency_p99_ms": _ms(percentile(latencies, 0.99)),
+        **memory_mb(),
+    }
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 2) if value is not None else None
+
+
+# ====================================
+# CIBLES
+# ====================================
+
+
+def install_fake_llm(latency: float, token_rate: float):
+    """Remplace le client Gemini du registre par FakeChatModel (avant tout import de gemini)"""
+    from fake_llm import FakeChatModel
+    from llm_clients import registry
+
+    registry.register(
+        "gemini", lambda model, **params: FakeChatModel(latency=latency, token_rate=token_rate)
+    )
+
+
+def run_flask(corpus, args) -> List[dict]:
+    """Mesure le serveur Flask (gemini.py) en processus, un client de test par thread"""
+    install_fake_llm(args.latency, args.token_rate)
+    import gemini
+
+    counter = iter(range(10**9))
+
+    def request_once(client, code: str) -> bool:
+        if args.cold:
+            # Code unique: ni le cache de résultats ni celui des analyses ne sont utilisés
+            code = f"{code}\n// bench {next(counter)}"
+        payload = {"api_code": code, "no_cache": args.cold}
+        if args.mode:
+            payload["mode"] = args.mode
+        response = client.post("/rest-assured-test/gemini", json=payload)
+        return response.status_code == 200
+
+    return _run_levels(corpus, args, lambda: gemini.app.test_client(), request_once)
+
+
+def run_url(corpus, args) -> List[dict]:
+    """Mesure un serveur déjà démarré (le modèle simulé doit être configuré côté serveur)"""
+    import requests
+
+    counter = iter(range(10**9))
+    url = args.url.rstrip("/") + "/rest-assured-test/gemini"
+
+    def request_once(session, code: str) -> bool:
+        if args.cold:
+            code = f"{code}\n// bench {next(counter)}"
+        payload = {"api_code": code, "no_cache": args.cold}
+        if args.mode:
+            payload["mode"] = args.mode
+        return session.post(url, json=payload, timeout=600).status_code == 200
+
+    return _run_levels(corpus, args, requests.Session, request_once)
+
+
+def _run_levels(corpus, args, make_client: Callable, request_once: Callable) -> List[dict]:
+    results = []
+    for concurrency in args.concurrency:
+        for name, code in corpus:
+            clients = [make_client() for _ in range(concurrency)]
+            latencies, failures = [], []
+
+            def worker(slot: int):
+                client = clients[slot]
+                for number in range(slot, args.requests, concurrency):
+                    started = time.perf_counter()
+                    try:
+                        ok = request_once(client, code)
+                    except Exception:
+                        ok = False
+                    if ok:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        failures.append(number)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(worker, range(concurrency)))
+            summary = summarize(latencies, len(failures), time.perf_counter() - started)
+            results.append({"input": name, "concurrency": concurrency, **summary})
+            print(
+                f"{name:32} c={concurrency:<4} {summary['requests_per_second']} req/s "
+                f"p50={summary['latency_p50_ms']}ms p95={summary['latency_p95_ms']}ms "
+                f"p99={summary['latency_p99_ms']}ms errors={summary['errors']}",
+                file=sys.stderr,
+            )
+    return results
+
+
+# Exécuté par run_startup dans un interpréteur neuf: le modèle simulé n'est installé
+# qu'après l'import mesuré (aucun client n'est créé avant la première requête)
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import gemini
+imported = time.perf_counter()
+from benchmark import install_fake_llm, memory_mb
+install_fake_llm(float(sys.argv[1]), float(sys.argv[2]))
+ready = time.perf_counter()
+response = gemini.app.test_client().post(
+    "/rest-assured-test/gemini", json={"api_code": sys.stdin.read(), "no_cache": True}
+)
+print(json.dumps({
+    "ok": response.status_code == 200,
+    "import": imported - started,
+    "first_request": time.perf_counter() - ready,
+    **memory_mb(),
+}))
+"""
+
+
+def run_startup(corpus, args) -> List[dict]:
+    """
+    Mesure le démarrage à froid: chaque essai lance un interpréteur neuf qui importe
+    gemini puis sert une première requête sur la première entrée du corpus.
+    """
+    name, code = corpus[0]
+    samples = {"import": [], "first_request": [], "process": []}
+    peaks = []
+    errors = 0
+    for number in range(args.requests):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, str(args.latency), str(args.token_rate)],
+            input=f"{code}\n// startup {number}",
+            capture_output=True,
+            text=True,
+            cwd=BACKEND_DIR,
+        )
+        elapsed = time.perf_counter() - started
+        lines = [line for line in completed.stdout.splitlines() if line.startswith('{"ok"')]
+        probe = json.loads(lines[-1]) if lines else None
+        if probe is None or not probe["ok"]:
+            errors += 1
+            continue
+        samples["import"].append(probe["import"])
+        samples["first_request"].append(probe["first_request"])
+        samples["process"].append(elapsed)
+        peaks.append(probe["peak_rss_mb"])
+
+    results = []
+    for stage, values in samples.items():
+        result = {
+            "input": f"startup_{stage}",
+            "concurrency": 1,
+            "requests": len(values) + errors,
+            "errors": errors,
+            "latency_p50_ms": _ms(percentile(values, 0.50)),
+            "latency_p95_ms": _ms(percentile(values, 0.95)),
+            "latency_p99_ms": _ms(percentile(values, 0.99)),
+            "peak_rss_mb": max(peaks) if peaks else None,
+        }
+        results.append(result)
+        print(
+            f"{result['input']:32} ({name}) p50={result['latency_p50_ms']}ms "
+            f"p95={result['latency_p95_ms']}ms errors={errors}",
+            file=sys.stderr,
+        )
+    return results
+
+
+# Exécuté par run_traffic: une génération simple et une génération en flux, dont
+# les tests produits sont comparés entre l'enregistrement et le rejeu
+TRAFFIC_PROBE = """
+import json, sys
+from benchmark import install_fake_llm
+install_fake_llm(0, 0)
+import gemini
+client = gemini.app.test_client()
+code = sys.stdin.read()
+plain = client.post("/rest-assured-test/gemini", json={"api_code": code, "no_cache": True})
+events = client.post(
+    "/rest-assured-test/gemini/stream", json={"api_code": code, "no_cache": True}
+).get_data(as_text=True)
+done = [block for block in events.split("\\n\\n") if block.startswith("event: done")]
+print(json.dumps({
+    "ok": plain.status_code == 200 and bool(done),
+    "plain": (plain.get_json() or {}).get("generated_test"),
+    "stream": json.loads(done[-1].split("data: ", 1)[1])["generated_test"] if done else None,
+    "errors": [block for block in events.split("\\n\\n") if block.startswith("event: error")],
+}))
+"""
+
+
+def run_traffic(corpus, args) -> List[dict]:
+    """
+    Vérifie l'aller-retour enregistrement -> rejeu (LLM_TRAFFIC_MODE) pour
+    /rest-assured-test/gemini et /rest-assured-test/gemini/stream: chaque entrée
+    du corpus est générée en mode record puis en mode replay, dans deux
+    interpréteurs neufs aux caches distincts, et les tests doivent être identiques.
+    """
+    workdir = tempfile.mkdtemp(prefix="autotest-traffic-")
+    traffic_path = os.path.join(workdir, "llm_traffic.jsonl")
+    results = []
+    for name, code in corpus:
+        outputs = {}
+        for mode in ("record", "replay"):
+            env = {
+                **os.environ,
+                "LLM_TRAFFIC_MODE": mode,
+                "LLM_TRAFFIC_PATH": traffic_path,
+                "CACHE_PATH": os.path.join(workdir, f"{name}-{mode}.sqlite3"),
+                "SIMILARITY_THRESHOLD": "0",
+            }
+            completed = subprocess.run(
+                [sys.executable, "-c", TRAFFIC_PROBE],
+                input=code,
+                capture_output=True,
+                text=True,
+                cwd=BACKEND_DIR,
+                env=env,
+            )
+            lines = [line for line in completed.stdout.splitlines() if line.startswith('{"ok"')]
+            outputs[mode] = json.loads(lines[-1]) if lines else {"ok": False, "errors": [completed.stderr[-500:]]}
+
+        record, replay = outputs["record"], outputs["replay"]
+        errors = [] if record["ok"] and replay["ok"] else record.get("errors", []) + replay.get("errors", [])
+        for endpoint in ("plain", "stream"):
+            if record["ok"] and replay["ok"] and record[endpoint] != replay[endpoint]:
+                errors.append(f"{endpoint}: replayed test differs from recorded test")
+        results.append({"input": name, "concurrency": 1, "requests": 2, "errors": len(errors), "details": errors})
+        print(f"{name:32} traffic round-trip {'ok' if not errors else 'FAILED: ' + '; '.join(errors)}", file=sys.stderr)
+    return results
+
+
+def run_service(corpus, args) -> List[dict]:
+    """Mesure le service asynchrone (generation_service.py) avec des FakeProvider"""
+    import httpx
+    from providers.fake_provider import FakeProvider
+    from providers.router import Router
+
+    import generation_service
+
+    generation_service.app.state.router = Router([FakeProvider(latencies=(args.latency,))])
+
+    async def level(client, concurrency: int, code: str) -> dict:
+        latencies, errors = [], 0
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/generate", json={"api_code": code})
+                    ok = response.status_code == 200
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        return summarize(latencies, errors, time.perf_counter() - started)
+
+    async def main():
+        results = []
+        transport = httpx.ASGITransport(app=generation_service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for concurrency in args.concurrency:
+                for name, code in corpus:
+                    summary = await level(client, concurrency, code)
+                    results.append({"input": name, "concurrency": concurrency, **summary})
+                    print(
+                        f"{name:32} c={concurrency:<4} {summary['requests_per_second']} req/s "
+                        f"p50={summary['latency_p50_ms']}ms p95={summary['latency_p95_ms']}ms",
+                        file=sys.stderr,
+                    )
+        return results
+
+    return asyncio.run(main())
+
+
+# ====================================
+# COMPARAISON
+# ====================================
+
+
+def compare(results: List[dict], baseline: List[dict], max_regression: float) -> List[str]:
+    """
+    Compare les résultats à une exécution précédente.
+
+    Retourne:
+        La liste des régressions (p95 plus lent ou débit plus faible de plus de max_regression)
+    """
+    previous = {(r["input"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["input"], result["concurrency"]))
+        if not before:
+            continue
+        label = f"{result['input']} c={result['concurrency']}"
+        if before.get("latency_p95_ms") and result.get("latency_p95_ms"):
+            change = result["latency_p95_ms"] / before["latency_p95_ms"] - 1
+            if change > max_regression:
+                regressions.append(f"{label}: p95 +{change:.0%}")
+        if before.get("requests_per_second") and result.get("requests_per_second"):
+            change = 1 - result["requests_per_second"] / before["requests_per_second"]
+            if change > max_regression:
+                regressions.append(f"{label}: throughput -{change:.0%}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("flask", "service", "startup", "traffic"), default="flask")
+    parser.add_argument("--url", help="Mesurer un serveur Flask déjà démarré au lieu du processus courant")
+    parser.add_argument("--concurrency", default="1,4,16", help="Niveaux de concurrence, séparés par des virgules")
+    parser.add_argument("--requests", type=int, default=32, help="Requêtes par entrée du corpus et par niveau")
+    parser.add_argument("--sizes", default="1,5,20", help="Tailles (endpoints) des contrôleurs synthétiques")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latence simulée avant le premier token (s)")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="Tokens de sortie simulés par seconde")
+    parser.add_argument("--mode", choices=("single", "fanout"), help="Mode de génération demandé")
+    parser.add_argument("--warm", dest="cold", action="store_false", help="Réutiliser les caches entre requêtes")
+    parser.add_argument("--output", help="Fichier JSON de sortie (sinon stdout)")
+    parser.add_argument("--baseline", help="Résultats précédents à comparer")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+
+    # Caches et file de tâches isolés, modèle simulé, logs limités aux avertissements
+    workdir = tempfile.mkdtemp(prefix="autotest-bench-")
+    os.environ.setdefault("CACHE_PATH", os.path.join(workdir, "cache.sqlite3"))
+    os.environ.setdefault("JOBS_PATH", os.path.join(workdir, "jobs.sqlite3"))
+    os.environ.setdefault("ENHANCE_JOBS_PATH", os.path.join(workdir, "enhancements.sqlite3"))
+    os.environ.setdefault("LOG_DIR", os.path.join(workdir, "logs"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ.setdefault("LLM_WARMUP", "0")
+    os.environ.setdefault("LLM_RPM", "1000000")
+    os.environ.setdefault("LLM_TPM", "1000000000")
+    if args.cold:
+        # "// bench N" disparaît avec les commentaires: sans cela, l'index des
+        # quasi-doublons servirait toutes les requêtes après la première
+        os.environ.setdefault("SIMILARITY_THRESHOLD", "0")
+
+    corpus = build_corpus(args.sizes)
+    if args.target == "service":
+        results = run_service(corpus, args)
+    elif args.target == "startup":
+        results = run_startup(corpus, args)
+    elif args.target == "traffic":
+        results = run_traffic(corpus, args)
+    elif args.url:
+        results = run_url(corpus, args)
+    else:
+        results = run_flask(corpus, args)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "target": args.url or args.target,
+        "config": {
+            "latency": args.latency,
+            "token_rate": args.token_rate,
+            "requests": args.requests,
+            "mode": args.mode,
+            "cold": args.cold,
+            "analyzer_mode": os.environ.get("ANALYZER_MODE", "hybrid"),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as target:
+            target.write(output)
+    else:
+        print(output)
+
+    if args.target == "traffic" and any(result["errors"] for result in results):
+        return 1
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as source:
+            regressions = compare(results, json.load(source)["results"], args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
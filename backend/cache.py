@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Le logger est configuré par gemini.py; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+
+def normalize_api_code(api_code: str) -> str:
+    """
+    Normalise le code API pour que des soumissions équivalentes partagent la même clé.
+
+    Les fins de ligne sont unifiées, les espaces en fin de ligne et les lignes vides
+    sont supprimés. Le contenu (y compris les commentaires) n'est pas modifié.
+    """
+    lines = api_code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines if line.strip())
+
+
+def make_key(*parts) -> str:
+    """
+    Construit une clé de cache stable (SHA-256) à partir de plusieurs composants.
+
+    Les composants non textuels sont sérialisés en JSON avec des clés triées.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, separators=(",", ":"))
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TwoTierCache:
+    """
+    Cache à deux niveaux: LRU en mémoire devant un stockage SQLite sur disque.
+
+    Le disque est lui aussi borné: au-delà de max_disk_entries, les entrées les
+    moins récemment lues (accessed_at) sont supprimées à chaque écriture, et les
+    entrées expirées sont balayées au plus toutes les SWEEP_INTERVAL secondes.
+
+    Attributs:
+        path: Chemin du fichier SQLite (partagé entre plusieurs tables)
+        table: Nom de la table utilisée par cette instance
+        max_entries: Nombre maximal d'entrées conservées en mémoire
+        ttl: Durée de vie d'une entrée en secondes (0 pour ne jamais expirer)
+        max_disk_entries: Nombre maximal d'entrées sur disque (0 pour ne pas borner)
+    """
+
+    SWEEP_INTERVAL = 3600.0
+    # Une lecture servie par la mémoire ne met à jour accessed_at sur disque
+    # qu'au plus une fois par TOUCH_INTERVAL secondes
+    TOUCH_INTERVAL = 60.0
+
+    def __init__(
+        self,
+        path: str,
+        table: str,
+        max_entries: int = 256,
+        ttl: float = 86400,
+        max_disk_entries: int = 10000,
+    ):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+        self._evictions = 0
+        self._last_sweep = 0.0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}
+        if "accessed_at" not in columns:
+            # Fichier créé par une version sans éviction
+            self._db.execute(
+                f"ALTER TABLE {table} ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0"
+            )
+            self._db.execute(f"UPDATE {table} SET accessed_at = created_at")
+        self._db.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)"
+        )
+        self._db.commit()
+        with self._lock:
+            self._sweep(time.time())
+        logger.info(f"Cache '{table}' opened at {path}")
+
+    def _expired(self, created_at: float) -> bool:
+        return bool(self.ttl) and time.time() - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retourne la valeur associée à la clé, ou None si absente ou expirée"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value, touched_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self._hits_memory += 1
+                    now = time.time()
+                    if now - touched_at > self.TOUCH_INTERVAL:
+                        self._touch(key, now)
+                        self._memory[key] = (created_at, value, now)
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+
+            created_at = row[1]
+            if self._expired(created_at):
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._db.commit()
+                self._misses += 1
+                return None
+
+            value = json.loads(row[0])
+            now = time.time()
+            self._touch(key, now)
+            self._remember(key, created_at, value, now)
+            self._hits_disk += 1
+            return value
+
+    def put(self, key: str, value: dict):
+        """Enregistre la valeur en mémoire et sur disque, puis évince si le disque est plein"""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, value, created_at)
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), created_at, created_at),
+            )
+            if self.max_disk_entries:
+                # Tout ce qui suit les max_disk_entries entrées les plus récemment lues
+                evicted = self._db.execute(
+                    f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                ).rowcount
+                if evicted > 0:
+                    self._evictions += evicted
+                    logger.debug("Cache '%s' evicted %d entries", self.table, evicted)
+            if created_at - self._last_sweep > self.SWEEP_INTERVAL:
+                self._sweep(created_at)
+            self._db.commit()
+
+    def _touch(self, key: str, now: float):
+        self._db.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+
+    def _sweep(self, now: float):
+        """Supprime les entrées expirées (appelé avec le verrou)"""
+        self._last_sweep = now
+        if not self.ttl:
+            return
+        removed = self._db.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+        self._db.commit()
+        if removed > 0:
+            logger.info(f"Cache '{self.table}' removed {removed} expired entries")
+
+    def _remember(self, key: str, created_at: float, value: dict, touched_at: float):
+        self._memory[key] = (created_at, value, touched_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Retourne les compteurs de hits/miss et la taille du cache"""
+        with self._lock:
+            disk_size = self._db.execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+            return {
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_size,
+                "max_disk_entries": self.max_disk_entries,
+                "evictions": self._evictions,
+            }
+
+
+def cache_from_env(table: str, prefix: str) -> TwoTierCache:
+    """
+    Crée un cache configuré par des variables d'environnement.
+
+    Arguments:
+        table: Nom de la table SQLite
+        prefix: Préfixe des variables (ex: "RESULT_CACHE" lit RESULT_CACHE_MAX_ENTRIES,
+            RESULT_CACHE_TTL_SECONDS et RESULT_CACHE_MAX_DISK_ENTRIES)
+    """
+    return TwoTierCache(
+        path=os.environ.get("CACHE_PATH", "cache/gemini_cache.sqlite3"),
+        table=table,
+        max_entries=int(os.environ.get(f"{prefix}_MAX_ENTRIES", "256")),
+        ttl=float(os.environ.get(f"{prefix}_TTL_SECONDS", "604800")),
+        max_disk_entries=int(os.environ.get(f"{prefix}_MAX_DISK_ENTRIES", "10000")),
+    )
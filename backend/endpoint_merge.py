@@ -0,0 +1,331 @@
+import re
+import textwrap
+from typing import Dict, List, Optional, Tuple
+
+from java_source import iter_members, parse_annotations, strip_comments
+
+# ====================================
+# FUSION DES TESTS GÉNÉRÉS PAR ENDPOINT
+# ====================================
+
+# Importations toujours nécessaires à la classe parente générée
+BASE_IMPORTS = [
+    "import io.restassured.RestAssured;",
+    "import org.junit.jupiter.api.BeforeEach;",
+    "import org.junit.jupiter.api.DisplayName;",
+    "import org.junit.jupiter.api.Nested;",
+    "import org.junit.jupiter.api.Test;",
+    "import org.springframework.boot.test.context.SpringBootTest;",
+    "import org.springframework.boot.test.web.server.LocalServerPort;",
+]
+
+# Membres de configuration: retirés des fragments s'ils ne font que ce que fait
+# déjà la classe parente (injecter le port et le passer à RestAssured)
+SETUP_ANNOTATIONS = {"LocalServerPort", "BeforeEach", "BeforeAll", "SpringBootTest"}
+PARENT_SETUP_STATEMENT = re.compile(
+    r'(?:RestAssured\.)?port\s*=\s*(?:this\.)?port|RestAssured\.baseURI\s*=\s*"http://localhost"'
+    r"|RestAssured\.basePath\s*=\s*RestAssured\.DEFAULT_PATH"
+)
+
+ENDPOINT_MARKER = "// endpoint: "
+
+
+def endpoint_label(endpoint: dict) -> str:
+    """Retourne le libellé "MÉTHODE chemin" d'un endpoint"""
+    return f"{endpoint['method'].upper()} {endpoint['path']}"
+
+
+def extract_imports(code: str) -> List[str]:
+    """Retourne les lignes d'importation d'un fichier Java, dans l'ordre"""
+    return re.findall(r"^\s*(import\s+(?:static\s+)?[\w.*]+\s*;)", code, re.MULTILINE)
+
+
+def _class_members(code: str, stripped: str, start: int, end: int) -> List[Tuple[str, str, int]]:
+    """
+    Retourne les membres entre start et end.
+
+    Chaque membre est un triplet (en-tête sans commentaires, texte original
+    désindenté, position de l'accolade ouvrante dans ce texte ou -1).
+    """
+    members = []
+    for m_start, header, block_start, block_end in iter_members(stripped, start, end):
+        stop = block_end + 1 if block_start != -1 else m_start + len(header) + 1
+        first = m_start + len(code[m_start:stop]) - len(code[m_start:stop].lstrip())
+        if first >= stop or code[first:stop].strip() == ";":
+            continue
+        column = first - (code.rfind("\n", 0, first) + 1)
+        text = textwrap.dedent(" " * column + code[first:stop])
+        offset = -1
+        if block_start != -1:
+            offset = next(iter_members(strip_comments(text), 0, len(text)))[2]
+        members.append((header, text, offset))
+    return members
+
+
+def _carried_member(header: str, text: str, body_start: int) -> Optional[str]:
+    """
+    Retourne le membre d'une classe de fragment à conserver, ou None s'il est
+    fourni par la classe parente.
+
+    Une méthode @BeforeEach/@BeforeAll qui configure autre chose que le port
+    (RestAssured.basePath...) est conservée; une méthode @BeforeAll devient
+    @BeforeEach, une classe @Nested ne pouvant pas en déclarer.
+    """
+    annotations = {name for name, _ in parse_annotations(header)[0]}
+    if re.search(r"\bint\s+port\s*$", header):
+        return None
+    if not annotations & SETUP_ANNOTATIONS:
+        return text
+    if body_start == -1 or not annotations & {"BeforeEach", "BeforeAll"}:
+        return None
+    body = strip_comments(text)[body_start + 1 :].rstrip()[:-1]
+    statements = [statement.strip() for statement in body.split(";") if statement.strip()]
+    if all(PARENT_SETUP_STATEMENT.fullmatch(statement) for statement in statements):
+        return None
+    if "BeforeAll" in annotations:
+        declaration = re.sub(r"\bstatic\s+", "", text[:body_start], count=1)
+        declaration = re.sub(r"@BeforeAll\b", "@BeforeEach", declaration, count=1)
+        text = declaration + text[body_start:]
+    return text
+
+
+def extract_nested_classes(code: str) -> List[str]:
+    """
+    Extrait les classes @Nested d'un fragment de test.
+
+    Les classes @Nested peuvent être au premier niveau du fragment ou à
+    l'intérieur d'une classe englobante. Si cette classe déclare d'autres
+    membres que la configuration fournie par la classe parente (champs et
+    méthodes utilitaires, @BeforeEach qui fixe RestAssured.basePath...), ils
+    sont regroupés avec ses classes @Nested dans une nouvelle classe @Nested,
+    pour que celles-ci y aient toujours accès. La classe parente remet
+    basePath à sa valeur par défaut avant chaque test: un groupe ne hérite pas
+    de la configuration d'un autre.
+    """
+    stripped = strip_comments(code)
+    blocks = []
+    for header, text, body_start in _class_members(code, stripped, 0, len(stripped)):
+        if body_start == -1 or not re.search(r"\bclass\s+\w+", header):
+            continue
+        annotations = {name for name, _ in parse_annotations(header)[0]}
+        if "Nested" in annotations:
+            blocks.append(text)
+            continue
+        inner = strip_comments(text)
+        body_end = len(inner.rstrip()) - 1
+        nested = []
+        carried = []
+        for m_header, m_text, m_body_start in _class_members(text, inner, body_start + 1, body_end):
+            m_annotations = {name for name, _ in parse_annotations(m_header)[0]}
+            if "Nested" in m_annotations and re.search(r"\bclass\s+\w+", m_header):
+                nested.append(m_text)
+                continue
+            member = _carried_member(m_header, m_text, m_body_start)
+            if member is not None:
+                carried.append(member)
+
+        if carried:
+            body = "\n\n".join(carried + nested)
+            blocks.append("@Nested\nclass EndpointTests {\n" + _indent(body) + "\n}")
+        else:
+            blocks.extend(nested)
+    return blocks
+
+
+def _indent(text: str, prefix: str = "    ") -> str:
+    return "\n".join(prefix + line if line.strip() else line for line in text.splitlines())
+
+
+def _rename_duplicate(block: str, used: set) -> str:
+    match = re.search(r"\bclass\s+(\w+)", block)
+    if not match:
+        return block
+    name = candidate = match.group(1)
+    suffix = 2
+    while candidate in used:
+        candidate = f"{name}{suffix}"
+        suffix += 1
+    used.add(candidate)
+    if candidate == name:
+        return block
+    return block[: match.start(1)] + candidate + block[match.end(1) :]
+
+
+def _sorted_imports(imports: List[str]) -> List[str]:
+    normalized = {re.sub(r"\s+", " ", line.strip()) for line in imports}
+    regular = sorted(line for line in normalized if not line.startswith("import static"))
+    static = sorted(line for line in normalized if line.startswith("import static"))
+    return regular + ([""] if regular and static else []) + static
+
+
+def merge_endpoint_tests(
+    controller_name: str, fragments: List[Tuple[dict, str]], package: Optional[str] = None
+) -> str:
+    """
+    Fusionne les tests générés par endpoint en une seule classe compilable.
+
+    Arguments:
+        controller_name: Nom du contrôleur testé (la classe s'appellera <nom>Test)
+        fragments: Liste de couples (endpoint, code Java généré pour cet endpoint)
+        package: Déclaration de package à reprendre (facultatif)
+
+    Retourne:
+        Le code Java de la classe de test, avec importations dédupliquées, une
+        seule configuration RestAssured et un commentaire "// endpoint: ..."
+        devant chaque groupe @Nested
+    """
+    imports = list(BASE_IMPORTS)
+    used_names = set()
+    groups = []
+    for endpoint, code in fragments:
+        imports.extend(extract_imports(code))
+        blocks = [_rename_duplicate(b, used_names) for b in extract_nested_classes(code)]
+        if not blocks:
+            continue
+        groups.append(
+            ENDPOINT_MARKER + endpoint_label(endpoint) + "\n" + "\n\n".join(blocks)
+        )
+    return render_test_class(controller_name, imports, groups, package)
+
+
+def render_test_class(
+    controller_name: str, imports: List[str], groups: List[str], package: Optional[str] = None
+) -> str:
+    """Assemble la classe de test parente autour des groupes @Nested fournis"""
+    header = f"package {package};\n\n" if package else ""
+    body = "\n\n".join(_indent(group) for group in groups)
+    return (
+        header
+        + "\n".join(_sorted_imports(imports))
+        + "\n\n"
+        + "@SpringBootTest(webEnvironment = SpringBootTest.WebEnvironment.RANDOM_PORT)\n"
+        + f"@DisplayName(\"{controller_name} API\")\n"
+        + f"class {controller_name}Test {{\n\n"
+        + "    @LocalServerPort\n"
+        + "    private int port;\n\n"
+        + "    @BeforeEach\n"
+        + "    void setUp() {\n"
+        + "        RestAssured.port = port;\n"
+        + "        RestAssured.basePath = RestAssured.DEFAULT_PATH;\n"
+        + "    }\n\n"
+        + body
+        + "\n}\n"
+    )
+
+
+def split_endpoint_groups(test_code: str) -> Dict[str, str]:
+    """
+    Découpe une classe produite par merge_endpoint_tests en groupes par endpoint.
+
+    Retourne:
+        Dictionnaire {libellé "MÉTHODE chemin": groupe désindenté, marqueur compris},
+        vide si la classe ne contient aucun marqueur "// endpoint: ..."
+    """
+    lines = test_code.rstrip().splitlines()
+    # La dernière ligne est l'accolade fermante de la classe parente
+    if lines and lines[-1].strip() == "}":
+        lines = lines[:-1]
+    groups = {}
+    label = None
+    current = []
+    for line in lines:
+        if line.strip().startswith(ENDPOINT_MARKER):
+            if label is not None:
+                groups[label] = textwrap.dedent("\n".join(current)).strip()
+            label = line.strip()[len(ENDPOINT_MARKER) :].strip()
+            current = []
+        if label is not None:
+            current.append(line)
+    if label is not None:
+        groups[label] = textwrap.dedent("\n".join(current)).strip()
+    return groups
+
+
+def splice_endpoint_tests(
+    previous_test: str,
+    controller_name: str,
+    endpoints: List[dict],
+    fragments: List[Tuple[dict, str]],
+    package: Optional[str] = None,
+) -> str:
+    """
+    Remplace dans une classe déjà générée les groupes des endpoints régénérés.
+
+    Arguments:
+        previous_test: Classe produite précédemment par merge_endpoint_tests
+        controller_name: Nom du contrôleur testé
+        endpoints: Endpoints actuels, dans l'ordre de la classe à produire
+        fragments: Couples (endpoint, code Java) des endpoints ajoutés ou modifiés
+        package: Déclaration de package à reprendre (facultatif)
+
+    Retourne:
+        La classe de test: groupes régénérés pour les endpoints de fragments,
+        groupes précédents pour les autres, sans les endpoints disparus
+    """
+    previous = split_endpoint_groups(previous_test)
+    regenerated = {endpoint_label(endpoint): code for endpoint, code in fragments}
+    kept = {
+        label: group
+        for label, group in previous.items()
+        if label not in regenerated and label in {endpoint_label(e) for e in endpoints}
+    }
+    used_names = {
+        name for group in kept.values() for name in re.findall(r"\bclass\s+(\w+)", group)
+    }
+    imports = list(BASE_IMPORTS) + extract_imports(previous_test)
+
+    groups = []
+    for endpoint in endpoints:
+        label = endpoint_label(endpoint)
+        if label in regenerated:
+            code = regenerated[label]
+            imports.extend(extract_imports(code))
+            blocks = [_rename_duplicate(b, used_names) for b in extract_nested_classes(code)]
+            if blocks:
+                groups.append(ENDPOINT_MARKER + label + "\n" + "\n\n".join(blocks))
+        elif label in kept:
+            groups.append(kept[label])
+    return render_test_class(controller_name, imports, groups, package)
+
+
+def append_endpoint_tests(test_code: str, fragments: List[Tuple[dict, str]]) -> str:
+    """
+    Ajoute à une classe de test quelconque les groupes @Nested d'autres endpoints.
+
+    Les importations manquantes sont ajoutées après les dernières importations
+    existantes et les groupes, précédés de leur marqueur "// endpoint: ...",
+    avant l'accolade fermante de la classe.
+
+    Arguments:
+        test_code: Classe de test complète (accolades équilibrées)
+        fragments: Couples (endpoint, code Java) générés pour les endpoints à ajouter
+
+    Retourne:
+        La classe de test complétée
+    """
+    used_names = set(re.findall(r"\bclass\s+(\w+)", test_code))
+    known = {re.sub(r"\s+", " ", line.strip()) for line in extract_imports(test_code)}
+    imports = []
+    groups = []
+    for endpoint, code in fragments:
+        for line in extract_imports(code):
+            normalized = re.sub(r"\s+", " ", line.strip())
+            if normalized not in known:
+                known.add(normalized)
+                imports.append(normalized)
+        blocks = [_rename_duplicate(b, used_names) for b in extract_nested_classes(code)]
+        if blocks:
+            groups.append(ENDPOINT_MARKER + endpoint_label(endpoint) + "\n" + "\n\n".join(blocks))
+
+    body = test_code.rstrip()
+    if groups and body.endswith("}"):
+        body = body[:-1].rstrip() + "\n\n" + "\n\n".join(_indent(g) for g in groups) + "\n}"
+    if imports:
+        last_import = list(re.finditer(r"^\s*import\s+[^;]+;", body, re.MULTILINE))
+        package = re.search(r"^\s*package\s+[^;]+;", body, re.MULTILINE)
+        anchor = last_import[-1] if last_import else package
+        if anchor:
+            body = body[: anchor.end()] + "\n" + "\n".join(imports) + body[anchor.end() :]
+        else:
+            body = "\n".join(imports) + "\n\n" + body
+    return body + "\n"
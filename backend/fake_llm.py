@@ -0,0 +1,150 @@
+import hashlib
+import json
+import re
+import time
+from typing import Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from prompts.registry import prompt_registry
+from spring_analyzer import analyze_controller
+
+# ====================================
+# MODÈLE SIMULÉ POUR LES BENCHMARKS
+# ====================================
+
+CANNED_TEST = """```java
+import static io.restassured.RestAssured.given;
+
+import io.restassured.RestAssured;
+import org.junit.jupiter.api.BeforeEach;
+import org.junit.jupiter.api.DisplayName;
+import org.junit.jupiter.api.Nested;
+import org.junit.jupiter.api.Test;
+import org.springframework.boot.test.context.SpringBootTest;
+import org.springframework.boot.test.web.server.LocalServerPort;
+
+@SpringBootTest(webEnvironment = SpringBootTest.WebEnvironment.RANDOM_PORT)
+class {name}Test {{
+    @LocalServerPort
+    private int port;
+
+    @BeforeEach
+    void setUp() {{
+        RestAssured.port = port;
+    }}
+
+    @Nested
+    @DisplayName("{label}")
+    class EndpointTests {{
+        @Test
+        void returnsSuccess() {{
+            given().when().get("{path}").then().statusCode(200);
+        }}
+    }}
+}}
+```"""
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Modèle de chat local et déterministe, compatible avec les chaînes LangChain.
+
+    La réponse dépend uniquement du prompt, reconnu par son préfixe statique
+    (prompts.registry): JSON d'analyse pour le prompt d'analyse (obtenu avec le
+    parseur local quand le code est un contrôleur), objet de descriptions pour
+    le prompt de description, et classe de test RestAssured sinon. La durée
+    d'un appel vaut latency + tokens de sortie / token_rate.
+
+    Attributs:
+        latency: Délai avant le premier token, en secondes
+        token_rate: Tokens de sortie produits par seconde (0 = instantané)
+        max_output_tokens: Même attribut que ChatGoogleGenerativeAI (utilisé dans les logs)
+        responses: Réponses imposées, utilisées en boucle à la place des réponses générées
+    """
+
+    latency: float = 0.5
+    token_rate: float = 200.0
+    max_output_tokens: int = 4096
+    responses: List[str] = []
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, prompt: str) -> str:
+        if self.responses:
+            return self.responses[self.calls % len(self.responses)]
+
+        code = re.search(r"```java\s*([\s\S]*?)```", prompt)
+        api_info = analyze_controller(code.group(1)) if code else None
+        if prompt.startswith(
+            (prompt_registry.prefix("api_analysis"), prompt_registry.prefix("api_analysis_compact"))
+        ):
+            if api_info is None:
+                digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:6]
+                api_info = {
+                    "controller_name": f"Api{digest}",
+                    "base_path": "/",
+                    "endpoints": [
+                        {"path": "/", "method": "GET", "parameters": [], "return_type": "String", "description": "root"}
+                    ],
+                }
+            for endpoint in api_info["endpoints"]:
+                endpoint.pop("handler", None)
+                endpoint["description"] = endpoint.get("description") or endpoint["path"]
+            return "```json\n" + json.dumps(api_info) + "\n```"
+        if prompt.startswith(prompt_registry.prefix("endpoint_description")):
+            endpoints = re.findall(r"^- (\w+) (\S+)", prompt, re.MULTILINE)
+            return json.dumps({f"{m} {p}": f"Handles {m} {p}" for m, p in endpoints})
+
+        endpoint = (api_info or {}).get("endpoints") or [{"method": "GET", "path": "/"}]
+        return CANNED_TEST.format(
+            name=(api_info or {}).get("controller_name", "Api"),
+            label=f"{endpoint[0]['method']} {endpoint[0]['path']}",
+            path=endpoint[0]["path"],
+        )
+
+    def _usage(self, prompt: str, content: str) -> dict:
+        input_tokens, output_tokens = _count_tokens(prompt), _count_tokens(content)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs
+    ) -> ChatResult:
+        prompt = messages[-1].content
+        content = self._reply(prompt)
+        self.calls += 1
+        delay = self.latency
+        if self.token_rate:
+            delay += _count_tokens(content) / self.token_rate
+        time.sleep(delay)
+        message = AIMessage(content=content, usage_metadata=self._usage(prompt, content))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt = messages[-1].content
+        content = self._reply(prompt)
+        self.calls += 1
+        time.sleep(self.latency)
+        step = 16  # environ 4 tokens par fragment
+        for start in range(0, len(content), step):
+            if self.token_rate:
+                time.sleep(_count_tokens(content[start : start + step]) / self.token_rate)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content[start : start + step]))
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, content))
+        )
@@ -1,15 +1,51 @@
+from __future__ import annotations
+
+import contextvars
+import logging
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import uuid
 import json
 import re
-from flask import jsonify, Flask, request
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import g, jsonify, Flask, request, Response, stream_with_context
 from dotenv import load_dotenv
 
-from logger import setup_logger
+from logger import request_id_var, setup_logger
+from model_tiers import policy_from_env
+from metrics import PipelineMetrics, server_timing_header, start_request_timing
+from llm_clients import registry as llm_registry
+from cache import cache_from_env, make_key, normalize_api_code
 from config_class import EndpointInfo, ApiAnalysis
-from prompts.rest_prompt import (
-    RestAssuredPrompts,
+from spring_analyzer import analyze_controller, finalize_analysis, unresolved_endpoints
+from endpoint_merge import (
+    append_endpoint_tests,
+    endpoint_label,
+    merge_endpoint_tests,
+    splice_endpoint_tests,
+    split_endpoint_groups,
+)
+from analysis_chunks import merge_analyses, split_source
+from java_validation import FenceExtractor, check_java, close_truncated, extract_code
+from near_duplicates import similarity_index_from_env
+from batch import (
+    ArchiveTooLarge,
+    controllers_from_json,
+    controllers_from_tarball,
+    dedupe_controllers,
 )
+from jobs import JobManager, JobQueueFull, FINISHED_STATES, SUCCEEDED, FAILED
+from llm_scheduler import BATCH, LLMScheduler, RateLimitExceeded, scheduler_from_env
+from llm_traffic import traffic_from_env
+from prompt_compaction import CompactionReport, compact_java, minify_json
+from prompts.registry import prompt_registry
+
+if TYPE_CHECKING:
+    # Seulement pour les annotations: le client (et ses ~1 s d'import) est créé
+    # par llm_clients à la première utilisation ou au warm-up
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
 
 # Initialize logger
@@ -19,18 +55,96 @@ load_dotenv()
 logger.info("Environment variables loaded.")
 
 app = Flask(__name__)  # Create Flask application instance
+# Taille maximale d'un corps de requête (JSON ou archive): au-delà, réponse 413
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_REQUEST_BYTES", str(32 * 1024 * 1024)))
 logger.info("Flask app initialized.")
 
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_SAMPLING = {
+    "temperature": 0.2,  # Valeur basse pour des résultats cohérents
+    "top_p": 0.95,  # Légèrement créatif tout en restant focalisé
+    "max_tokens": 4096,  # Longueur maximale pour les réponses complètes
+}
+
+# Modèle et limite de sortie par étape (LLM_TIERS, LLM_TIER_RULES); une réponse qui
+# échoue à la validation est redemandée au tier suivant
+model_policy = policy_from_env(GEMINI_MODEL, GEMINI_SAMPLING["max_tokens"])
+
+# Mode d'analyse: "hybrid" (parseur local + LLM pour les descriptions manquantes),
+# "local" (parseur Python uniquement) ou "llm" (analyse complète par le modèle)
+ANALYZER_MODE = os.environ.get("ANALYZER_MODE", "hybrid").lower()
+
+# Génération par endpoint: nombre d'appels LLM simultanés, et nombre d'endpoints
+# à partir duquel ce mode est choisi automatiquement (0 = uniquement sur demande)
+GENERATION_MODES = ("single", "fanout", "incremental")
+FANOUT_WORKERS = int(os.environ.get("FANOUT_WORKERS", "4"))
+FANOUT_MIN_ENDPOINTS = int(os.environ.get("FANOUT_MIN_ENDPOINTS", "0"))
+
+# Nombre de contrôleurs traités simultanément par le endpoint batch, et limites d'une
+# archive de sources (taille décompressée de l'ensemble des membres, nombre de membres)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_ARCHIVE_BYTES = int(os.environ.get("BATCH_MAX_ARCHIVE_BYTES", str(64 * 1024 * 1024)))
+BATCH_MAX_ARCHIVE_MEMBERS = int(os.environ.get("BATCH_MAX_ARCHIVE_MEMBERS", "10000"))
+
+# Analyse par morceaux: au-delà de ANALYSIS_CHUNK_CHARS caractères (après compaction),
+# le code est découpé entre classes et méthodes et les morceaux sont analysés en parallèle
+ANALYSIS_CHUNK_CHARS = int(os.environ.get("ANALYSIS_CHUNK_CHARS", "24000"))
+ANALYSIS_CHUNK_WORKERS = int(os.environ.get("ANALYSIS_CHUNK_WORKERS", "4"))
+
+# Livraison progressive: le test de base est renvoyé tout de suite avec un generation_id
+# et enhance_test tourne en arrière-plan (champ "enhance" de la requête, défaut ci-dessous)
+BACKGROUND_ENHANCEMENT = os.environ.get("BACKGROUND_ENHANCEMENT", "0") == "1"
+ENHANCE_CALLBACK_TIMEOUT = float(os.environ.get("ENHANCE_CALLBACK_TIMEOUT", "10"))
+# Hôtes ("hôte" ou "hôte:port", séparés par des virgules) auxquels callback_url peut
+# envoyer le résultat; vide = pas d'envoi, le client interroge l'endpoint enhancements
+ENHANCE_CALLBACK_HOSTS = {
+    host.strip().lower()
+    for host in os.environ.get("ENHANCE_CALLBACK_HOSTS", "").split(",")
+    if host.strip()
+}
+
+# Validation locale des classes générées: une classe tronquée est refermée après son
+# dernier membre complet, et les tests des endpoints manquants sont générés à part
+# si leur nombre ne dépasse pas JAVA_REPAIR_MAX_ENDPOINTS (0 = pas d'appel de réparation)
+JAVA_REPAIR_MAX_ENDPOINTS = int(os.environ.get("JAVA_REPAIR_MAX_ENDPOINTS", "5"))
+
+# Compaction des entrées de prompt (code sans commentaires ni corps de méthodes
+# hors contrat HTTP, JSON minifié, schéma d'analyse compact); PROMPT_COMPACTION=0 la désactive
+PROMPT_COMPACTION = os.environ.get("PROMPT_COMPACTION", "1") != "0"
+compaction_report = CompactionReport()
+
+# Caches des tests générés et des analyses, invalidés automatiquement si les prompts changent
+PROMPTS_VERSION = f"{prompt_registry.version}-{'compact' if PROMPT_COMPACTION else 'full'}"
+result_cache = cache_from_env("results", "RESULT_CACHE")
+analysis_cache = cache_from_env("analyses", "ANALYSIS_CACHE")
+# Dernière analyse et dernière classe générée par contrôleur (mode "incremental")
+controller_store = cache_from_env("controllers", "CONTROLLER_CACHE")
+
+# Index MinHash/LSH des contrôleurs générés: un contrôleur quasi identique (seuil
+# SIMILARITY_THRESHOLD) aux endpoints identiques réutilise le test déjà généré
+similarity_index = similarity_index_from_env()
+
+# Durées et tokens par étape, exposés sur /metrics (et Server-Timing si SERVER_TIMING=1)
+pipeline_metrics = PipelineMetrics()
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# Ordonnanceur partagé par tous les appels LLM (budgets RPM/TPM, priorités, retry);
+# LLM_TRAFFIC_MODE=record enregistre chaque appel, LLM_TRAFFIC_MODE=replay les rejoue sans réseau
+llm_scheduler = scheduler_from_env(
+    usage_callback=pipeline_metrics.record_usage, traffic=traffic_from_env()
+)
+
 
-def setup_llm(api_key=None)-> ChatGoogleGenerativeAI:
+def setup_llm(api_key=None, tier=None)-> ChatGoogleGenerativeAI:
     """
     Configure et retourne l'instance du modèle LLM.
 
     Arguments:
         api_key: Clé API Google Gemini (facultative, sinon utilise la variable d'environnement)
+        tier: Tier de model_policy à utiliser (facultatif, sinon le modèle par défaut)
 
     Retourne:
-        Une instance du modèle Gemini configurée
+        L'instance du modèle Gemini configurée, partagée par les requêtes
 
     Lève:
         ValueError: Si aucune clé API n'est trouvée
@@ -46,15 +160,444 @@ def setup_llm(api_key=None)-> ChatGoogleGenerativeAI:
             "Clé API Google Gemini non fournie et non trouvée dans les variables d'environnement"
         )
 
-    model = "gemini-2.5-flash"
-    logger.info(f"Using Gemini model: {model}")
-    return ChatGoogleGenerativeAI(
-        model=model,
+    # Le client est partagé par tout le processus pour conserver ses connexions;
+    # les nouvelles tentatives sont gérées par llm_scheduler, pas par le client
+    if tier is None:
+        return llm_registry.get(
+            "gemini", GEMINI_MODEL, google_api_key=api_key, max_retries=1, **GEMINI_SAMPLING
+        )
+    return llm_registry.get(
+        "gemini",
+        tier.model,
         google_api_key=api_key,
-        temperature=0.2,  # Valeur basse pour des résultats cohérents
-        top_p=0.95,  # Légèrement créatif tout en restant focalisé
-        max_tokens=4096,  # Longueur maximale pour les réponses complètes
+        max_retries=1,
+        **{**GEMINI_SAMPLING, "max_tokens": tier.max_tokens},
+    )
+
+
+def warm_up_llm():
+    """
+    Crée le client Gemini en arrière-plan au démarrage.
+
+    Désactivable avec LLM_WARMUP=0; sans clé API, rien n'est créé.
+    """
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if api_key and os.environ.get("LLM_WARMUP", "1") != "0":
+        llm_registry.warm_up(
+            [
+                (
+                    "gemini",
+                    GEMINI_MODEL,
+                    {"google_api_key": api_key, "max_retries": 1, **GEMINI_SAMPLING},
+                )
+            ]
+        )
+
+
+def compact_inputs(stage, prompt, inputs, baseline=None, **transforms):
+    """
+    Applique la compaction aux entrées d'un prompt et journalise le gain.
+
+    Arguments:
+        stage: Nom de l'étape, pour le rapport de compaction
+        prompt: BasePrompt qui recevra les entrées compactées
+        inputs: Entrées d'origine du prompt
+        baseline: BasePrompt non compacté servant de référence (par défaut prompt)
+        **transforms: Fonction de compaction à appliquer à chaque entrée nommée
+
+    Retourne:
+        Les entrées compactées, ou inputs si la compaction est désactivée
+    """
+    if not PROMPT_COMPACTION:
+        return inputs
+    compacted = {**inputs, **{name: fn(inputs[name]) for name, fn in transforms.items()}}
+    before = (baseline or prompt).estimate_tokens(**inputs)
+    after = prompt.estimate_tokens(**compacted)
+    compaction_report.record(stage, before, after)
+    logger.info(f"Prompt compaction ({stage}): {before} -> {after} estimated tokens")
+    return compacted
+
+
+def timed_stage(name, cache="none"):
+    """
+    Chronomètre une étape du pipeline servie par Gemini.
+
+    Le modèle de l'étape est celui du tier appelé (fixé par invoke_tiered, le
+    dernier en cas d'escalade), ou "none" si l'étape n'a appelé aucun modèle.
+    """
+    return pipeline_metrics.stage(name, provider="gemini", cache=cache)
+
+
+def is_truncated(response):
+    """Indique si le modèle a arrêté sa réponse à la limite de tokens de sortie"""
+    metadata = getattr(response, "response_metadata", None) or {}
+    return str(metadata.get("finish_reason", "")).upper() in ("MAX_TOKENS", "LENGTH")
+
+
+def parse_json_response(content):
+    """Extrait et décode le JSON d'une réponse (éventuellement dans un bloc ```json)"""
+    json_match = re.search(r"```json\s*([\s\S]*?)\s*```", content)
+    return json.loads(json_match.group(1) if json_match else content)
+
+
+def valid_json_response(response):
+    """Validation des étapes d'extraction: réponse complète et objet JSON décodable"""
+    if is_truncated(response):
+        return False
+    try:
+        return isinstance(parse_json_response(response.content), dict)
+    except ValueError:
+        return False
+
+
+def valid_code_response(response):
+    """Validation des étapes de génération: réponse complète et blocs de code fermés"""
+    return not is_truncated(response) and response.content.count("```") % 2 == 0
+
+
+def repairable_code_response(response):
+    """
+    Validation des étapes dont la classe est ensuite réparée localement (basic, enhance).
+
+    Une réponse tronquée est gardée si close_truncated peut la refermer après un
+    membre complet: validate_generated_test la répare et ne régénère que les
+    endpoints perdus, ce qui coûte bien moins qu'une nouvelle génération complète
+    sur le tier supérieur. Seule une réponse irrécupérable est escaladée.
+    """
+    if valid_code_response(response):
+        return True
+    code = extract_code(response.content)
+    check = check_java(code)
+    if not check.truncated:
+        return not check.errors
+    repaired = close_truncated(code)
+    return repaired is not None and not check_java(repaired).errors
+
+
+def tier_client(llm, tier):
+    """Client d'un tier: llm s'il correspond au modèle par défaut, sinon un client du registre"""
+    if tier.model == GEMINI_MODEL and tier.max_tokens == GEMINI_SAMPLING["max_tokens"]:
+        return llm
+    return setup_llm(tier=tier)
+
+
+def invoke_tiered(stage, llm, prompt, inputs, validate, endpoints=0):
+    """
+    Appelle le modèle choisi par model_policy et escalade si la réponse est invalide.
+
+    Arguments:
+        stage: Nom de l'étape (analyze, describe, basic, endpoint, enhance)
+        llm: Client du modèle par défaut (les autres tiers viennent du registre)
+        prompt: BasePrompt de l'étape
+        inputs: Entrées du prompt (déjà compactées)
+        validate: Fonction (réponse) -> bool
+        endpoints: Nombre d'endpoints du contrôleur (0 si inconnu)
+
+    Retourne:
+        La première réponse valide, ou celle du plus grand tier
+    """
+    tier = model_policy.choose(stage, sum(len(str(value)) for value in inputs.values()), endpoints)
+    while True:
+        client = tier_client(llm, tier)
+        pipeline_metrics.set_model(tier.model)
+        started = time.perf_counter()
+        response = llm_scheduler.invoke(prompt.prompt | client, inputs, prompt)
+        elapsed = time.perf_counter() - started
+        valid = validate(response)
+        larger = None if valid else model_policy.escalate(tier)
+        model_policy.record(stage, tier, elapsed, escalated=larger is not None)
+        outcome = "ok" if valid else "escalated" if larger is not None else "invalid"
+        pipeline_metrics.llm_calls.observe(elapsed, stage, tier.name, tier.model, outcome)
+        if larger is None:
+            return response
+        logger.warning(
+            f"{stage} response from tier {tier.name} failed validation, retrying with {larger.name}"
+        )
+        tier = larger
+
+
+def lookup_result(cache_key):
+    """Cherche un test dans le cache de résultats (étape "lookup", hit ou miss)"""
+    with pipeline_metrics.stage("lookup") as current:
+        cached = result_cache.get(cache_key)
+        current.cache = "miss" if cached is None else "hit"
+    return cached
+
+
+def result_cache_key(api_code, mode=None):
+    """
+    Calcule la clé du cache de résultats pour un code API.
+
+    La clé combine le code normalisé, le modèle, les paramètres d'échantillonnage,
+    la version des prompts et le mode de génération demandé: toute modification
+    de l'un d'eux invalide le cache.
+    """
+    return make_key(normalize_api_code(api_code), *generation_settings(mode))
+
+
+def generation_settings(mode=None):
+    """Tout ce dont dépend un test généré, hors code: modèle, échantillonnage, prompts, tiers, mode"""
+    return (GEMINI_MODEL, GEMINI_SAMPLING, PROMPTS_VERSION, model_policy.version, mode or "auto")
+
+
+def similarity_scope(mode=None):
+    """Cloisonne l'index de similarité comme le cache de résultats (sans le code)"""
+    return make_key(*generation_settings(mode))
+
+
+def reuse_near_duplicate(api_code, api_info, mode=None):
+    """
+    Cherche un test déjà généré pour un contrôleur quasi identique.
+
+    Le test retrouvé est adapté si le contrôleur a été renommé (le nom de
+    l'ancien contrôleur est remplacé par le nouveau).
+
+    Retourne:
+        Dictionnaire {"generated_test": ..., "similarity": ...}, ou None
+    """
+    if similarity_index is None:
+        return None
+    with pipeline_metrics.stage("similar") as current:
+        match = similarity_index.find(similarity_scope(mode), api_code, api_info)
+        cached = result_cache.get(match.result_key) if match else None
+        current.cache = "miss" if cached is None else "hit"
+    if cached is None:
+        return None
+
+    generated_test = cached["generated_test"]
+    name = api_info.get("controller_name")
+    if match.controller_name and name and match.controller_name != name:
+        generated_test = re.sub(rf"\b{re.escape(match.controller_name)}", name, generated_test)
+    logger.info(
+        f"Reusing test of near-duplicate controller {match.controller_name} "
+        f"(similarity {match.similarity:.2f})"
+    )
+    return {"generated_test": generated_test, "similarity": round(match.similarity, 3)}
+
+
+def analysis_fingerprint(api_code):
+    """
+    Calcule l'identifiant d'analyse (empreinte du contrôleur) pour un code API.
+
+    Contrairement à la clé du cache de résultats, les paramètres d'échantillonnage
+    n'en font pas partie: une analyse reste valable si seule la température change.
+    """
+    return make_key(
+        normalize_api_code(api_code),
+        GEMINI_MODEL,
+        PROMPTS_VERSION,
+        model_policy.version,
+        ANALYZER_MODE,
+    )
+
+
+def get_cached_analysis(analysis_id):
+    """
+    Retourne l'analyse enregistrée sous cet identifiant.
+
+    Retourne:
+        Dictionnaire {"api_code": ..., "api_info": ...} ou None si inconnu
+    """
+    return analysis_cache.get(analysis_id)
+
+
+def analysis_matches(cached_analysis, api_code):
+    """Indique si une analyse en cache a été produite pour ce code API (au formatage près)"""
+    return normalize_api_code(cached_analysis["api_code"]) == normalize_api_code(api_code)
+
+
+def analyze_with_cache(llm, api_code):
+    """
+    Analyse le code API en réutilisant une analyse précédente si elle existe.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java Spring Boot à analyser
+
+    Retourne:
+        Tuple (analysis_id, api_info)
+
+    Lève:
+        Exception: Si l'analyse de l'API échoue
+    """
+    analysis_id = analysis_fingerprint(api_code)
+    with timed_stage("analyze") as current:
+        cached = analysis_cache.get(analysis_id)
+        if cached is not None:
+            current.cache = "hit"
+            logger.info(f"Reusing cached API analysis {analysis_id[:12]}")
+            return analysis_id, cached["api_info"]
+
+        current.cache = "miss"
+        api_info = analyze_api(llm, api_code)
+    if not api_info:
+        logger.error("API analysis failed!")
+        raise Exception("API analysis failed")
+
+    analysis_cache.put(analysis_id, {"api_code": api_code, "api_info": api_info})
+    return analysis_id, api_info
+
+
+def analyze_api(llm, api_code):
+    """
+    Analyse le code API selon ANALYZER_MODE.
+
+    Le parseur local lit les annotations Spring (@RestController, @GetMapping...)
+    en quelques millisecondes. En mode "hybrid", le LLM n'est appelé que pour
+    décrire les endpoints sans Javadoc (par morceaux au-delà de
+    ANALYSIS_CHUNK_CHARS); si le parseur ne trouve aucun endpoint, l'analyse
+    complète par le LLM est utilisée.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java Spring Boot à analyser
+
+    Retourne:
+        Dictionnaire contenant les informations structurées sur l'API ou None en cas d'erreur
+    """
+    if ANALYZER_MODE != "llm":
+        api_info = analyze_controller(api_code)
+        if api_info is not None:
+            logger.info(
+                f"Local analysis completed: {api_info['controller_name']} "
+                f"with {len(api_info['endpoints'])} endpoints"
+            )
+            missing = unresolved_endpoints(api_info)
+            if missing and ANALYZER_MODE == "hybrid":
+                if needs_chunking(api_code):
+                    describe_endpoints_chunked(llm, api_code, missing)
+                else:
+                    describe_endpoints(llm, api_code, missing)
+            return finalize_analysis(api_info)
+        logger.info("Local analyzer found no endpoint, falling back to LLM analysis")
+
+    if needs_chunking(api_code):
+        return analyze_api_chunked(llm, api_code)
+    return analyze_api_code(llm, api_code)
+
+
+def needs_chunking(api_code):
+    """Indique si le code (après compaction) dépasse ANALYSIS_CHUNK_CHARS caractères"""
+    size = len(compact_java(api_code)) if PROMPT_COMPACTION else len(api_code)
+    return bool(ANALYSIS_CHUNK_CHARS) and size > ANALYSIS_CHUNK_CHARS
+
+
+def analyze_api_chunked(llm, api_code):
+    """
+    Analyse un code trop grand pour un seul prompt (map-reduce).
+
+    Le code est découpé entre classes et méthodes (split_source), chaque morceau
+    est analysé par analyze_api_code avec au plus ANALYSIS_CHUNK_WORKERS appels
+    simultanés, puis les analyses partielles sont fusionnées et les endpoints
+    dédupliqués (merge_analyses). Un morceau en échec est ignoré.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java Spring Boot à analyser (un ou plusieurs fichiers)
+
+    Retourne:
+        Dictionnaire contenant les informations structurées sur l'API ou None en cas d'erreur
+    """
+    chunks = split_source(api_code, ANALYSIS_CHUNK_CHARS)
+    logger.info(f"Analyzing {len(api_code)} characters in {len(chunks)} chunks")
+    if len(chunks) <= 1:
+        return analyze_api_code(llm, chunks[0] if chunks else api_code)
+
+    with ThreadPoolExecutor(max_workers=min(ANALYSIS_CHUNK_WORKERS, len(chunks))) as executor:
+        partials = list(
+            executor.map(
+                lambda chunk: contextvars.copy_context().run(analyze_api_code, llm, chunk),
+                chunks,
+            )
+        )
+
+    failed = sum(1 for partial in partials if partial is None)
+    if failed:
+        logger.warning(f"{failed} of {len(chunks)} analysis chunks failed")
+    api_info = merge_analyses(partials)
+    if api_info is not None:
+        logger.info(
+            f"Chunked analysis merged: {api_info['controller_name']} "
+            f"with {len(api_info['endpoints'])} endpoints"
+        )
+    return api_info
+
+
+def describe_endpoints(llm, api_code, endpoints):
+    """
+    Demande au LLM une description pour les endpoints non documentés.
+
+    Les descriptions sont écrites directement dans les dictionnaires d'endpoints.
+    En cas d'erreur, ils restent vides et seront déduits du nom de la méthode.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        endpoints: Endpoints à décrire (issus du parseur local)
+    """
+    logger.info(f"Requesting descriptions for {len(endpoints)} endpoints")
+    listing = "\n".join(
+        f"- {e['method']} {e['path']} ({e.get('handler', '')})" for e in endpoints
     )
+    try:
+        description_prompt = prompt_registry.get("endpoint_description")
+        inputs = compact_inputs(
+            "describe",
+            description_prompt,
+            {"api_code": api_code, "endpoints": listing},
+            api_code=compact_java,
+        )
+        response = invoke_tiered(
+            "describe", llm, description_prompt, inputs, valid_json_response, len(endpoints)
+        )
+        descriptions = parse_json_response(response.content)
+        for endpoint in endpoints:
+            description = descriptions.get(f"{endpoint['method']} {endpoint['path']}")
+            if description:
+                endpoint["description"] = str(description)
+    except Exception as e:
+        logger.warning(f"Endpoint description failed, using handler names: {str(e)}")
+
+
+def describe_endpoints_chunked(llm, api_code, endpoints):
+    """
+    Décrit les endpoints non documentés d'un code trop grand pour un seul prompt.
+
+    Le code est découpé comme pour analyze_api_chunked; chaque morceau n'est
+    envoyé qu'avec les endpoints dont il contient la méthode (clé "handler"),
+    avec au plus ANALYSIS_CHUNK_WORKERS appels simultanés. Un endpoint introuvable
+    garde une description déduite du nom de sa méthode.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        endpoints: Endpoints à décrire (issus du parseur local)
+    """
+    chunks = split_source(api_code, ANALYSIS_CHUNK_CHARS)
+    remaining = list(endpoints)
+    work = []
+    for chunk in chunks:
+        located = [
+            e
+            for e in remaining
+            if e.get("handler") and re.search(rf"\b{re.escape(e['handler'])}\s*\(", chunk)
+        ]
+        if located:
+            work.append((chunk, located))
+            remaining = [e for e in remaining if not any(e is found for found in located)]
+    logger.info(f"Describing {len(endpoints)} endpoints in {len(work)} chunks")
+    if remaining:
+        logger.warning(f"{len(remaining)} endpoints not found in any chunk, using handler names")
+    if not work:
+        return
+
+    with ThreadPoolExecutor(max_workers=min(ANALYSIS_CHUNK_WORKERS, len(work))) as executor:
+        list(
+            executor.map(
+                lambda item: contextvars.copy_context().run(describe_endpoints, llm, *item),
+                work,
+            )
+        )
 
 
 def analyze_api_code(llm, api_code):
@@ -71,30 +614,43 @@ def analyze_api_code(llm, api_code):
     try:
         logger.info("Starting API code analysis...")
         # Utiliser l'API du model avec LangChain
-        api_analysis_prompt = RestAssuredPrompts.get_api_analysis_prompt().prompt
-        chain = api_analysis_prompt | llm
-        logger.info("Prompt chain created.")
-        response = chain.invoke({"api_code": api_code})
-
-        # Extraire le JSON de la réponse (peut être encapsulé dans des blocs de code)
-        json_match = re.search(r"```json\s*([\s\S]*?)\s*```", response.content)
-        if json_match:
-            logger.debug("JSON block found in response.")
-            json_str = json_match.group(1)  # Si un bloc JSON est trouvé, on l'extrait
-        else:
-            logger.debug("No JSON block found, using full response content.")
-            json_str = response.content  # Sinon, on prend tout le texte brute
+        api_analysis_prompt = prompt_registry.get(
+            "api_analysis_compact" if PROMPT_COMPACTION else "api_analysis"
+        )
+        inputs = compact_inputs(
+            "analyze",
+            api_analysis_prompt,
+            {"api_code": api_code},
+            baseline=prompt_registry.get("api_analysis"),
+            api_code=compact_java,
+        )
+        response = invoke_tiered(
+            "analyze", llm, api_analysis_prompt, inputs, valid_json_response
+        )
+
+        with pipeline_metrics.stage("parse"):
+            # Extraire le JSON de la réponse (peut être encapsulé dans des blocs de code)
+            json_match = re.search(r"```json\s*([\s\S]*?)\s*```", response.content)
+            if json_match:
+                logger.debug("JSON block found in response.")
+                json_str = json_match.group(1)  # Si un bloc JSON est trouvé, on l'extrait
+            else:
+                logger.debug("No JSON block found, using full response content.")
+                json_str = response.content  # Sinon, on prend tout le texte brute
 
-        # Nettoyer et parser le JSON
-        api_info = json.loads(json_str)
+            # Nettoyer et parser le JSON
+            api_info = json.loads(json_str)
         logger.info(
             f"API analysis completed successfully: {api_info['controller_name']} with {len(api_info['endpoints'])} endpoints"
         )
         return api_info
+    except RateLimitExceeded:
+        # Le quota épuisé n'est pas une erreur d'analyse: l'appelant répond 429
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse: {str(e)}")
         logger.debug(
-            f"Response received: {response.content if 'response' in locals() else 'N/A'}"
+            "Response received: %s", response.content if "response" in locals() else "N/A"
         )
         logger.exception("Full traceback:")
         return None
@@ -117,27 +673,298 @@ def generate_basic_test(llm: ChatGoogleGenerativeAI, api_code, api_info):
     api_info_str = json.dumps(api_info, indent=2)
 
     # Génération du test
-    basic_test_prompt = RestAssuredPrompts.get_basic_test_prompt().prompt
-    chain = basic_test_prompt | llm
-    logger.debug("Prompt chain for basic test created.")
-    response = chain.invoke({"api_code": api_code, "api_info": api_info_str})
-    logger.info(
-        f"Input tokens: {response.usage_metadata['input_tokens']}, "
-        f"Max tokens allowed: {llm.max_output_tokens}"
+    basic_test_prompt = prompt_registry.get("basic_test")
+    inputs = compact_inputs(
+        "basic",
+        basic_test_prompt,
+        {"api_code": api_code, "api_info": api_info_str},
+        api_code=compact_java,
+        api_info=minify_json,
+    )
+    response = invoke_tiered(
+        "basic",
+        llm,
+        basic_test_prompt,
+        inputs,
+        repairable_code_response,
+        len(api_info["endpoints"]),
     )
+    logger.info(f"Input tokens: {response.usage_metadata['input_tokens']}")
 
     # Extraire le code Java de la réponse
-    java_match = re.search(r"```(?:java)?\s*([\s\S]*?)\s*```", response.content)
-    if java_match:
-        logger.debug("Java code block found in response.")
-        test_code = java_match.group(1).strip()
-        logger.info(f"Basic test generated successfully: {len(test_code)} characters")
+    with pipeline_metrics.stage("parse"):
+        extractor = FenceExtractor()
+        extractor.feed(response.content)
+        test_code = extractor.result()
+    if not extractor.found:
+        # Si pas de bloc de code, tout le texte est retourné
+        logger.warning("No Java code block found in response, returning raw content")
+        logger.debug("Response: %s", response)
+    logger.info(f"Basic test generated successfully: {len(test_code)} characters")
+    return test_code
+
+
+def stream_basic_test(llm: ChatGoogleGenerativeAI, api_code, api_info):
+    """
+    Génère un test RestAssured de base en diffusant la réponse du LLM.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        api_info: Informations structurées sur l'API
+
+    Retourne:
+        Un générateur des fragments de texte produits par le modèle
+    """
+    logger.info("Streaming basic RestAssured test...")
+    api_info_str = json.dumps(api_info, indent=2)
+
+    basic_test_prompt = prompt_registry.get("basic_test")
+    inputs = compact_inputs(
+        "basic",
+        basic_test_prompt,
+        {"api_code": api_code, "api_info": api_info_str},
+        api_code=compact_java,
+        api_info=minify_json,
+    )
+    # Pas d'escalade possible une fois la réponse diffusée: seul le tier de départ est utilisé
+    tier = model_policy.choose(
+        "basic", sum(len(str(value)) for value in inputs.values()), len(api_info["endpoints"])
+    )
+    chain = basic_test_prompt.prompt | tier_client(llm, tier)
+    for chunk in llm_scheduler.stream(chain, inputs, basic_test_prompt):
+        if chunk.content:
+            yield chunk.content
+
+
+def generate_endpoint_test(llm: ChatGoogleGenerativeAI, api_code, api_info, endpoint):
+    """
+    Génère le groupe de tests @Nested d'un seul endpoint.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        api_info: Informations structurées sur l'API
+        endpoint: Endpoint à tester (élément de api_info["endpoints"])
+
+    Retourne:
+        Code Java contenant les importations et la classe @Nested de l'endpoint
+    """
+    label = endpoint_label(endpoint)
+    logger.debug("Generating tests for endpoint %s", label)
+    endpoint_prompt = prompt_registry.get("endpoint_test")
+    inputs = compact_inputs(
+        "endpoint",
+        endpoint_prompt,
+        {
+            "controller_name": api_info["controller_name"],
+            "base_path": api_info["base_path"],
+            "endpoint": json.dumps(endpoint, indent=2),
+            "api_code": api_code,
+        },
+        api_code=compact_java,
+        endpoint=minify_json,
+    )
+    response = invoke_tiered(
+        "endpoint", llm, endpoint_prompt, inputs, valid_code_response, len(api_info["endpoints"])
+    )
+
+    with pipeline_metrics.stage("parse"):
+        extractor = FenceExtractor()
+        extractor.feed(response.content)
+    if not extractor.found:
+        logger.warning(f"No Java code block found for endpoint {label}, using raw content")
+    return extractor.result()
+
+
+def generate_endpoint_fragments(llm: ChatGoogleGenerativeAI, api_code, api_info, endpoints):
+    """
+    Génère en parallèle les tests des endpoints donnés (FANOUT_WORKERS appels simultanés).
+
+    Retourne:
+        Liste de couples (endpoint, code Java) pour les endpoints générés avec succès
+
+    Lève:
+        Exception: Si la génération échoue pour tous les endpoints
+    """
+    logger.info(
+        f"Generating tests for {len(endpoints)} endpoints with {FANOUT_WORKERS} workers"
+    )
+    with ThreadPoolExecutor(max_workers=FANOUT_WORKERS) as executor:
+        # Chaque tâche hérite du contexte (priorité des appels LLM) de l'appelant
+        futures = [
+            executor.submit(
+                contextvars.copy_context().run,
+                generate_endpoint_test, llm, api_code, api_info, endpoint,
+            )
+            for endpoint in endpoints
+        ]
+
+    fragments = []
+    for endpoint, future in zip(endpoints, futures):
+        try:
+            fragments.append((endpoint, future.result()))
+        except Exception as e:
+            logger.error(
+                f"Test generation failed for endpoint {endpoint_label(endpoint)}: {str(e)}"
+            )
+    if endpoints and not fragments:
+        raise Exception("Test generation failed for every endpoint")
+    return fragments
+
+
+def java_package(api_code):
+    """Retourne le package déclaré dans le code Java, ou None"""
+    package = re.search(r"^\s*package\s+([\w.]+)\s*;", api_code, re.MULTILINE)
+    return package.group(1) if package else None
+
+
+def generate_fanout_test(llm: ChatGoogleGenerativeAI, api_code, api_info):
+    """
+    Génère les tests de chaque endpoint en parallèle puis les fusionne.
+
+    Chaque endpoint fait l'objet d'un appel LLM distinct, limité à FANOUT_WORKERS
+    appels simultanés: la durée totale dépend de l'endpoint le plus lent et non de
+    la taille du contrôleur, et aucune réponse n'atteint la limite de tokens.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        api_info: Informations structurées sur l'API
+
+    Retourne:
+        Code Java de la classe de test fusionnée
+
+    Lève:
+        Exception: Si la génération échoue pour tous les endpoints
+    """
+    endpoints = api_info["endpoints"]
+    fragments = generate_endpoint_fragments(llm, api_code, api_info, endpoints)
+
+    with pipeline_metrics.stage("parse"):
+        test_code = merge_endpoint_tests(
+            api_info["controller_name"], fragments, java_package(api_code)
+        )
+    logger.info(
+        f"Merged tests for {len(fragments)}/{len(endpoints)} endpoints: "
+        f"{len(test_code)} characters"
+    )
+    return test_code
+
+
+def controller_key(api_info):
+    """Identifie un contrôleur (nom et chemin de base) pour la régénération incrémentale"""
+    return make_key(
+        api_info["controller_name"], api_info["base_path"], GEMINI_MODEL, PROMPTS_VERSION
+    )
+
+
+def endpoint_contract(endpoint):
+    """Partie d'un endpoint qui détermine ses tests (la description n'en fait pas partie)"""
+    return json.dumps(
+        [endpoint.get("parameters"), endpoint.get("return_type")], sort_keys=True
+    )
+
+
+def generate_incremental_test(llm: ChatGoogleGenerativeAI, api_code, api_info):
+    """
+    Régénère uniquement les tests des endpoints ajoutés ou modifiés.
+
+    La dernière analyse et la dernière classe générée pour ce contrôleur (même
+    nom et même chemin de base) sont lues dans controller_store. Les endpoints
+    dont les paramètres ou le type de retour ont changé, et les nouveaux, sont
+    générés comme en mode fanout; les groupes des autres sont repris de la
+    classe précédente et ceux des endpoints supprimés sont retirés. Sans
+    génération précédente, tout le contrôleur est généré en mode fanout.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        api_info: Informations structurées sur l'API
+
+    Retourne:
+        Code Java de la classe de test
+    """
+    previous = controller_store.get(controller_key(api_info))
+    if previous is None or not split_endpoint_groups(previous["generated_test"]):
+        logger.info("No previous generation for this controller, generating every endpoint")
+        return generate_fanout_test(llm, api_code, api_info)
+
+    before = {
+        endpoint_label(e): endpoint_contract(e) for e in previous["api_info"]["endpoints"]
+    }
+    endpoints = api_info["endpoints"]
+    changed = [
+        e for e in endpoints if before.get(endpoint_label(e)) != endpoint_contract(e)
+    ]
+    removed = set(before) - {endpoint_label(e) for e in endpoints}
+    logger.info(
+        f"Incremental regeneration: {len(changed)} added or modified, "
+        f"{len(removed)} removed, {len(endpoints) - len(changed)} reused"
+    )
+
+    fragments = generate_endpoint_fragments(llm, api_code, api_info, changed)
+    with pipeline_metrics.stage("parse"):
+        return splice_endpoint_tests(
+            previous["generated_test"],
+            api_info["controller_name"],
+            endpoints,
+            fragments,
+            java_package(api_code),
+        )
+
+
+def validate_generated_test(llm: ChatGoogleGenerativeAI, api_code, api_info, test_code):
+    """
+    Vérifie localement une classe générée et ne régénère que ce qui manque.
+
+    Une classe tronquée est coupée après son dernier membre complet puis
+    refermée; les endpoints sans test (perdus à la troncature ou oubliés par le
+    modèle) sont générés comme en mode fanout et ajoutés à la classe, au plus
+    JAVA_REPAIR_MAX_ENDPOINTS. Les problèmes restants sont journalisés, la
+    classe est renvoyée dans tous les cas.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java de l'API
+        api_info: Informations structurées sur l'API
+        test_code: Classe de test générée
+
+    Retourne:
+        Code Java de la classe de test, réparée si nécessaire
+    """
+    endpoints = api_info["endpoints"]
+    with pipeline_metrics.stage("validate"):
+        check = check_java(test_code, endpoints, api_info["base_path"])
+        if check.truncated:
+            repaired = close_truncated(test_code)
+            if repaired is not None:
+                logger.warning("Generated test was truncated, keeping its complete members")
+                test_code = repaired
+                check = check_java(test_code, endpoints, api_info["base_path"])
+    if check.ok:
         return test_code
 
-    # Si pas de bloc de code, retourner tout le texte
-    logger.warning("No Java code block found in response, returning raw content")
-    logger.debug(f"Response: {response}")
-    return response.content.strip()
+    missing = check.missing_endpoints
+    if missing and not check.errors and len(missing) <= JAVA_REPAIR_MAX_ENDPOINTS:
+        logger.warning(
+            f"Generated test misses {len(missing)} endpoint(s), generating them separately"
+        )
+        try:
+            fragments = generate_endpoint_fragments(llm, api_code, api_info, missing)
+        except Exception as e:
+            logger.error(f"Repair generation failed: {str(e)}")
+            fragments = []
+        with pipeline_metrics.stage("parse"):
+            test_code = append_endpoint_tests(test_code, fragments)
+            check = check_java(test_code, endpoints, api_info["base_path"])
+
+    problems = check.errors + [
+        f"no test for {endpoint_label(e)}" for e in check.missing_endpoints
+    ]
+    if problems:
+        logger.warning(f"Generated test failed validation: {'; '.join(problems)}")
+    return test_code
 
 
 def enhance_test(llm: ChatGoogleGenerativeAI, api_code, basic_test):
@@ -155,38 +982,390 @@ def enhance_test(llm: ChatGoogleGenerativeAI, api_code, basic_test):
     logger.info("Enhancing test with advanced scenarios")
 
     # Générer le test amélioré
-    advanced_test_prompt = RestAssuredPrompts.get_advanced_test_prompt().prompt
-    chain = advanced_test_prompt | llm
+    advanced_prompt = prompt_registry.get("advanced_test")
+    advanced_test_prompt = advanced_prompt.prompt
     logger.debug("Invoking LLM for test enhancement")
-    response = chain.invoke({"api_code": api_code, "basic_test": basic_test})
-    logger.info(
-        f"Input tokens: {response.usage_metadata['input_tokens']}, "
-        f"Max tokens allowed: {llm.max_output_tokens}"
+    inputs = compact_inputs(
+        "enhance",
+        advanced_prompt,
+        {"api_code": api_code, "basic_test": basic_test},
+        api_code=compact_java,
     )
+    response = invoke_tiered("enhance", llm, advanced_prompt, inputs, repairable_code_response)
+    logger.info(f"Input tokens: {response.usage_metadata['input_tokens']}")
 
-    filled_prompt = advanced_test_prompt.format_prompt(
-        api_code=api_code, basic_test=basic_test
-    ).text
-    logger.debug(f"Enhancement prompt length: {len(filled_prompt)} characters")
-    logger.debug(f"Final enhancement prompt:\n{filled_prompt}")
+    # Le prompt complet n'est reconstruit que si les logs DEBUG sont actifs
+    if logger.isEnabledFor(logging.DEBUG):
+        filled_prompt = advanced_test_prompt.format_prompt(**inputs).text
+        logger.debug("Enhancement prompt length: %d characters", len(filled_prompt))
+        logger.debug("Final enhancement prompt:\n%s", filled_prompt)
 
     # Extraire le code Java de la réponse
-    java_match = re.search(r"```(?:java)?\s*([\s\S]*?)\s*```", response.content)
-    if java_match:
-        logger.debug("Java code block found in enhanced test response")
-        enhanced_code = java_match.group(1).strip()
-        logger.info(f"Test enhanced successfully: {len(enhanced_code)} characters")
-        return enhanced_code
-
-    # Si pas de bloc de code, retourner tout le texte
-    logger.warning(
-        "No Java code block found in enhanced test response, returning raw content"
-    )
-    logger.debug(f"Response: {response}")
-    logger.debug(
-        f"Enhanced test preview: {response.content[:500]}{'...' if len(response.content) > 500 else ''}"
+    with pipeline_metrics.stage("parse"):
+        extractor = FenceExtractor()
+        extractor.feed(response.content)
+        enhanced_code = extractor.result()
+    if not extractor.found:
+        logger.warning(
+            "No Java code block found in enhanced test response, returning raw content"
+        )
+        logger.debug("Response: %s", response)
+
+    # Une amélioration cassée ne remplace jamais un test de base valide
+    with pipeline_metrics.stage("validate"):
+        check = check_java(enhanced_code)
+        if check.truncated:
+            repaired = close_truncated(enhanced_code)
+            if repaired is not None and not check_java(repaired).errors:
+                logger.warning("Enhanced test was truncated, keeping its complete members")
+                enhanced_code, check = repaired, check_java(repaired)
+        if check.errors and not check_java(basic_test).errors:
+            logger.warning(
+                f"Enhanced test failed validation ({'; '.join(check.errors)}), keeping basic test"
+            )
+            return basic_test
+
+    logger.info(f"Test enhanced successfully: {len(enhanced_code)} characters")
+    logger.debug("Enhanced test preview: %.500s", enhanced_code)
+    return enhanced_code
+
+
+def resolve_generation_mode(mode, api_info):
+    """
+    Détermine le mode de génération: celui demandé, sinon "fanout" pour les
+    contrôleurs d'au moins FANOUT_MIN_ENDPOINTS endpoints, sinon "single".
+    """
+    if mode in GENERATION_MODES:
+        return mode
+    if FANOUT_MIN_ENDPOINTS and len(api_info["endpoints"]) >= FANOUT_MIN_ENDPOINTS:
+        return "fanout"
+    return "single"
+
+
+def run_pipeline(
+    llm: ChatGoogleGenerativeAI,
+    api_code,
+    analysis_id=None,
+    mode=None,
+    checkpoint=None,
+    no_cache=False,
+):
+    """
+    Enchaîne les étapes de génération pour un code API.
+
+    Arguments:
+        llm: Instance du modèle de langage
+        api_code: Code Java Spring Boot à tester
+        analysis_id: Identifiant d'une analyse en cache (facultatif, saute l'étape 1)
+        mode: "single" (un seul appel), "fanout" (un appel par endpoint), "incremental"
+            (seuls les endpoints modifiés depuis la dernière génération) ou None (auto)
+        checkpoint: Fonction appelée entre les étapes, qui lève une exception pour
+            interrompre le pipeline (annulation ou échéance d'une tâche)
+        no_cache: Ne pas réutiliser le test d'un contrôleur quasi identique
+
+    Retourne:
+        Dictionnaire {"generated_test": ..., "analysis_id": ...}
+
+    Lève:
+        Exception: Si l'analyse de l'API échoue
+    """
+    # Étape 1: Analyser l'API (ou réutiliser l'analyse fournie)
+    cached = get_cached_analysis(analysis_id) if analysis_id else None
+    if cached is not None and not analysis_matches(cached, api_code):
+        # Le résultat est mis en cache sous la clé de api_code: il doit en provenir
+        logger.warning(f"Analysis {analysis_id[:12]} does not match api_code, analyzing again")
+        cached = None
+    if cached is not None:
+        logger.info(f"Step 1: Using provided analysis {analysis_id[:12]}")
+        api_info = cached["api_info"]
+    else:
+        logger.info("Step 1: Analyzing API code")
+        analysis_id, api_info = analyze_with_cache(llm, api_code)
+
+    logger.info(f"API analysis successful")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("API analysis details: %.500s", json.dumps(api_info, indent=2))
+    if checkpoint:
+        checkpoint()
+
+    # Un contrôleur quasi identique a déjà été généré: son test est réutilisé
+    reused = None if no_cache else reuse_near_duplicate(api_code, api_info, mode)
+    if reused is not None:
+        return {**reused, "analysis_id": analysis_id}
+
+    # Étape 2: Générer un test de base
+    mode = resolve_generation_mode(mode, api_info)
+    logger.info(f"Step 2: Generating basic test ({mode} mode)")
+    with timed_stage("basic", cache="miss"):
+        if mode == "incremental":
+            basic_test = generate_incremental_test(llm, api_code, api_info)
+        elif mode == "fanout":
+            basic_test = generate_fanout_test(llm, api_code, api_info)
+        else:
+            basic_test = generate_basic_test(llm, api_code, api_info)
+    basic_test = validate_generated_test(llm, api_code, api_info, basic_test)
+    if mode != "single":
+        # Les classes fusionnées par endpoint servent de base aux régénérations incrémentales
+        controller_store.put(
+            controller_key(api_info), {"api_info": api_info, "generated_test": basic_test}
+        )
+    logger.info("Basic test generation successful")
+    logger.debug("Basic test:\n%s", basic_test)
+
+    # Étape 3: Améliorer le test
+    skipping_enhancement = True
+    # The enhanced test are always empty using basic_test for now
+    if skipping_enhancement:
+        return {"generated_test": basic_test, "analysis_id": analysis_id}
+
+    if checkpoint:
+        checkpoint()
+    logger.info("Step 3: Enhancing test")
+    with timed_stage("enhance", cache="miss"):
+        enhanced_test = enhance_test(llm, api_code, basic_test)
+
+    logger.info("Enhanced test generation successful")
+    logger.debug("Enhanced test preview: %.500s", enhanced_test)
+
+    logger.info("Test generation completed successfully")
+    return {"generated_test": enhanced_test, "analysis_id": analysis_id}
+
+
+def generate_and_cache(
+    llm, api_code, analysis_id=None, mode=None, checkpoint=None, no_cache=False
+):
+    """
+    Exécute le pipeline et enregistre son résultat dans le cache de résultats.
+
+    Avec no_cache, aucun test de contrôleur quasi identique n'est réutilisé.
+
+    Retourne:
+        Dictionnaire {"generated_test": ..., "analysis_id": ..., "cached": False}
+    """
+    result = run_pipeline(llm, api_code, analysis_id, mode, checkpoint, no_cache)
+    cache_key = result_cache_key(api_code, mode)
+    result_cache.put(cache_key, result)
+    if similarity_index is not None and "similarity" not in result:
+        analysis = get_cached_analysis(result["analysis_id"])
+        if analysis is not None:
+            similarity_index.add(similarity_scope(mode), api_code, analysis["api_info"], cache_key)
+    return {**result, "cached": False}
+
+
+def generate_with_cache(
+    api_code, mode=None, analysis_id=None, no_cache=False, checkpoint=None, llm=None
+):
+    """
+    Retourne le test en cache pour ce code, ou exécute le pipeline.
+
+    Arguments:
+        api_code: Code Java Spring Boot à tester
+        mode: Mode de génération ("single", "fanout", "incremental" ou None)
+        analysis_id: Identifiant d'une analyse en cache (facultatif)
+        no_cache: Ignorer le cache de résultats (et l'index des quasi-doublons)
+        checkpoint: Point de contrôle appelé entre les étapes (facultatif)
+        llm: Instance du modèle à réutiliser (créée si absente)
+
+    Retourne:
+        Le même dictionnaire que /rest-assured-test/gemini
+    """
+    if not no_cache:
+        cached = lookup_result(result_cache_key(api_code, mode))
+        if cached is not None:
+            return {**cached, "cached": True}
+
+    llm = llm or setup_llm()
+    return generate_and_cache(llm, api_code, analysis_id, mode, checkpoint, no_cache)
+
+
+def run_generation_job(payload, checkpoint):
+    """
+    Exécute une tâche de génération soumise à /rest-assured-test/gemini/jobs.
+
+    Arguments:
+        payload: Corps de la requête de soumission (api_code, mode, analysis_id, no_cache)
+        checkpoint: Point de contrôle d'annulation/échéance fourni par le JobManager
+
+    Retourne:
+        Le même dictionnaire que /rest-assured-test/gemini
+    """
+    # Les tâches de fond passent après les requêtes interactives
+    with LLMScheduler.priority(BATCH):
+        return generate_with_cache(
+            payload["api_code"],
+            mode=payload.get("mode"),
+            analysis_id=payload.get("analysis_id"),
+            no_cache=payload.get("no_cache", False),
+            checkpoint=checkpoint,
+        )
+
+
+def enhanced_cache_key(api_code, basic_test, mode=None):
+    """Clé du cache pour le test amélioré: code API, mode et test de base amélioré"""
+    return make_key(result_cache_key(api_code, f"{mode or 'auto'}+enhanced"), basic_test)
+
+
+def run_enhancement_job(payload, checkpoint):
+    """
+    Améliore en arrière-plan un test de base déjà renvoyé au client.
+
+    Arguments:
+        payload: api_code, basic_test, analysis_id, mode et callback_url (facultatif)
+        checkpoint: Point de contrôle d'annulation/échéance fourni par le JobManager
+
+    Retourne:
+        Dictionnaire {"generated_test": ..., "analysis_id": ..., "cached": ...}
+    """
+    cache_key = enhanced_cache_key(payload["api_code"], payload["basic_test"], payload.get("mode"))
+    cached = lookup_result(cache_key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    checkpoint()
+    with LLMScheduler.priority(BATCH):
+        with timed_stage("enhance", cache="miss"):
+            enhanced_test = enhance_test(setup_llm(), payload["api_code"], payload["basic_test"])
+    result = {"generated_test": enhanced_test, "analysis_id": payload.get("analysis_id")}
+    result_cache.put(cache_key, result)
+    return {**result, "cached": False}
+
+
+def callback_allowed(callback_url):
+    """Indique si callback_url est une URL http(s) vers un hôte de ENHANCE_CALLBACK_HOSTS"""
+    try:
+        parts = urlsplit(callback_url)
+        port = parts.port
+    except ValueError:
+        return False
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return False
+    host = parts.hostname.lower()
+    return host in ENHANCE_CALLBACK_HOSTS or f"{host}:{port}" in ENHANCE_CALLBACK_HOSTS
+
+
+def deliver_enhancement(payload, job):
+    """Envoie le résultat d'une amélioration à callback_url, si la requête en a fourni une"""
+    callback_url = payload.get("callback_url")
+    if not callback_url:
+        return
+    if not callback_allowed(callback_url):
+        # Tâche soumise avant un changement de ENHANCE_CALLBACK_HOSTS
+        logger.warning(f"Enhancement callback to {callback_url} skipped: host not allowed")
+        return
+    import requests
+
+    body = {"generation_id": job["job_id"], "status": job["status"]}
+    if job["result"] is not None:
+        body.update(job["result"])
+    if job["error"]:
+        body["error"] = job["error"]
+    try:
+        # Pas de redirection: elle pourrait mener hors des hôtes autorisés
+        response = requests.post(
+            callback_url, json=body, timeout=ENHANCE_CALLBACK_TIMEOUT, allow_redirects=False
+        )
+        response.raise_for_status()
+        logger.info(f"Enhancement {job['job_id']} delivered to {callback_url}")
+    except requests.RequestException as e:
+        logger.warning(f"Enhancement callback to {callback_url} failed: {str(e)}")
+
+
+# Tâches asynchrones: pool de workers borné, file persistante dans SQLite
+job_manager = JobManager(
+    run_generation_job,
+    path=os.environ.get("JOBS_PATH", "cache/jobs.sqlite3"),
+    workers=int(os.environ.get("JOB_WORKERS", "4")),
+    max_queued=int(os.environ.get("JOB_QUEUE_SIZE", "100")),
+    default_timeout=float(os.environ.get("JOB_TIMEOUT_SECONDS", "600")),
+)
+
+# Améliorations en arrière-plan: pool distinct et plus petit, pour ne jamais
+# priver la génération interactive (ses appels LLM passent aussi en priorité BATCH)
+enhancement_manager = JobManager(
+    run_enhancement_job,
+    path=os.environ.get("ENHANCE_JOBS_PATH", "cache/enhancements.sqlite3"),
+    workers=int(os.environ.get("ENHANCE_WORKERS", "2")),
+    max_queued=int(os.environ.get("ENHANCE_QUEUE_SIZE", "100")),
+    default_timeout=float(os.environ.get("ENHANCE_TIMEOUT_SECONDS", "600")),
+    on_finish=deliver_enhancement,
+    name="enhance",
+)
+
+
+def schedule_enhancement(result, api_code, mode=None, callback_url=None):
+    """
+    Ajoute au résultat d'une génération l'identifiant de son amélioration en arrière-plan.
+
+    Si la file des améliorations est pleine, le test de base est renvoyé seul
+    ("enhancement": "unavailable").
+    """
+    payload = {
+        "api_code": api_code,
+        "basic_test": result["generated_test"],
+        "analysis_id": result.get("analysis_id"),
+        "mode": mode,
+        "callback_url": callback_url,
+    }
+    try:
+        generation_id = enhancement_manager.submit(payload)
+    except JobQueueFull as e:
+        logger.warning(f"Background enhancement skipped: {str(e)}")
+        return {**result, "enhancement": "unavailable"}
+    return {
+        **result,
+        "generation_id": generation_id,
+        "enhancement": "queued",
+        "enhancement_url": f"/rest-assured-test/gemini/enhancements/{generation_id}",
+    }
+
+
+@app.before_request
+def assign_request_id():
+    """Associe un identifiant à la requête (X-Request-ID reçu ou généré) pour les logs"""
+    request_id_var.set(request.headers.get("X-Request-ID") or uuid.uuid4().hex[:12])
+
+
+@app.after_request
+def add_request_id_header(response):
+    response.headers["X-Request-ID"] = request_id_var.get()
+    return response
+
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    if SERVER_TIMING:
+        start_request_timing()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Enregistre la durée de la requête et ajoute l'en-tête Server-Timing.
+
+    Pour les réponses en streaming, la durée mesurée s'arrête au premier octet.
+    """
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    pipeline_metrics.requests.observe(
+        time.perf_counter() - g.request_started, route, str(response.status_code)
     )
-    return response.content.strip()
+    if SERVER_TIMING:
+        timing = server_timing_header()
+        if timing:
+            response.headers["Server-Timing"] = timing
+    return response
+
+
+@app.before_request
+def start_job_workers():
+    """
+    Démarre les workers au premier appel servi par ce processus.
+
+    Le démarrage n'a pas lieu à l'import pour que le processus de surveillance
+    du reloader de Flask (debug=True) ne traite pas la file en double.
+    """
+    job_manager.start()
+    enhancement_manager.start()
 
 
 @app.route("/rest-assured-test/gemini", methods=["POST"])
@@ -199,20 +1378,68 @@ def generate_restassured_test():
     2. Génération d'un test de base
     3. Amélioration du test avec des scénarios avancés
 
+    Les résultats sont mis en cache (mémoire + disque) selon le code normalisé,
+    le modèle, les paramètres d'échantillonnage et la version des prompts.
+    Le champ "no_cache" de la requête permet de forcer une nouvelle génération.
+    Le champ "analysis_id" (renvoyé par une génération ou par l'endpoint d'analyse)
+    permet de sauter l'étape 1; "api_code" devient alors facultatif.
+    Le champ "mode" ("single" ou "fanout") choisit la génération en un seul appel
+    ou un appel parallèle par endpoint; "incremental" ne régénère que les endpoints
+    ajoutés ou modifiés depuis la dernière génération du même contrôleur.
+    Avec "enhance": true (ou BACKGROUND_ENHANCEMENT=1), le test de base est renvoyé
+    immédiatement avec un "generation_id"; le test amélioré se récupère ensuite sur
+    /rest-assured-test/gemini/enhancements/<generation_id>, ou est envoyé par POST à
+    "callback_url" si ce champ est fourni.
+
     Retourne:
         Le code Java du test RestAssured amélioré ou None si une erreur survient
     """
     logger.info("REST API endpoint /rest-assured-test/gemini called")
 
     data = request.get_json()
-    logger.debug(f"Request received with content type: {request.content_type}")
+    logger.debug("Request received with content type: %s", request.content_type)
+
+    analysis_id = data.get("analysis_id")
+    if analysis_id:
+        cached_analysis = get_cached_analysis(analysis_id)
+        if cached_analysis is None:
+            logger.warning(f"Unknown analysis_id: {analysis_id}")
+            return jsonify({"error": "Unknown analysis_id"}), 404
+        data.setdefault("api_code", cached_analysis["api_code"])
+        if not analysis_matches(cached_analysis, data["api_code"]):
+            logger.warning(f"analysis_id {analysis_id} does not match api_code")
+            return jsonify({"error": "analysis_id was produced for a different api_code"}), 409
 
     if "api_code" not in data:
         logger.warning("Request missing api_code parameter")
         return jsonify({"error": "Missing api_code parameter"}), 400
 
     api_code = data["api_code"]
-    logger.debug(f"Received API code of length: {len(api_code)} characters")
+    logger.debug("Received API code of length: %d characters", len(api_code))
+
+    mode = data.get("mode")
+    if mode is not None and mode not in GENERATION_MODES:
+        logger.warning(f"Invalid generation mode: {mode}")
+        return jsonify({"error": f"Invalid mode, expected one of {GENERATION_MODES}"}), 400
+
+    enhance = data.get("enhance", BACKGROUND_ENHANCEMENT)
+    callback_url = data.get("callback_url")
+    if callback_url and not callback_allowed(callback_url):
+        logger.warning(f"Rejected callback_url: {callback_url}")
+        return (
+            jsonify({"error": "callback_url must be an http(s) URL on an allowed host"}),
+            400,
+        )
+
+    cache_key = result_cache_key(api_code, mode)
+    if not data.get("no_cache"):
+        cached = lookup_result(cache_key)
+        if cached is not None:
+            logger.info("Returning cached test generation result")
+            result = {**cached, "cached": True}
+            if enhance:
+                result = schedule_enhancement(result, api_code, mode, callback_url)
+            return jsonify(result)
 
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
@@ -228,49 +1455,415 @@ def generate_restassured_test():
         llm = setup_llm(api_key)
         logger.info("LLM setup complete.")
 
-        # Étape 1: Analyser l'API
-        logger.info("Step 1: Analyzing API code")
-        api_info = analyze_api_code(llm, api_code)
-        if not api_info:
-            logger.error("API analysis failed!")
-            raise Exception("API analysis failed")
-
-        logger.info(f"API analysis successful")
-        logger.debug(f"API analysis details: {json.dumps(api_info, indent=2)[:500]}")
-
-        # Étape 2: Générer un test de base
-        logger.info("Step 2: Generating basic test")
-        basic_test = generate_basic_test(llm, api_code, api_info)
-        logger.info("Basic test generation successful")
-        logger.debug("Basic test:\n" + basic_test)
-
-        # Étape 3: Améliorer le test
-        skipping_enhancement = True
-        # The enhanced test are always empty using basic_test for now
-        if not skipping_enhancement:
-            logger.info("Step 3: Enhancing test")
-            enhanced_test = enhance_test(llm, api_code, basic_test)
-
-            logger.info("Enhanced test generation successful")
-            logger.debug(
-                "Enhanced test preview: "
-                + (
-                    enhanced_test[:500] + "..."
-                    if len(enhanced_test) > 500
-                    else enhanced_test
-                )
+        result = generate_and_cache(
+            llm, api_code, analysis_id, mode, no_cache=bool(data.get("no_cache"))
+        )
+        if enhance:
+            result = schedule_enhancement(result, api_code, mode, callback_url)
+        return jsonify(result)
+
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    except Exception as e:
+        logger.error(f"Error occurred while generating test: {str(e)}")
+        logger.exception("Full traceback:")
+        return jsonify({"error": str(e)}), 500
+
+
+def rate_limited_response(error):
+    """Réponse 429 avec Retry-After quand le quota LLM reste épuisé après les tentatives"""
+    logger.warning(f"LLM quota exhausted: {str(error)}")
+    response = jsonify({"error": "LLM rate limit exceeded", "retry_after": error.retry_after})
+    response.headers["Retry-After"] = str(max(1, round(error.retry_after)))
+    return response, 429
+
+
+def sse_event(event, data):
+    """Formate un évènement Server-Sent Events avec des données JSON"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/rest-assured-test/gemini/stream", methods=["POST"])
+def stream_restassured_test():
+    """
+    Variante en streaming (Server-Sent Events) de /rest-assured-test/gemini.
+
+    Les évènements émis sont:
+    - "stage": progression du pipeline (démarrage, analyse terminée et nombre d'endpoints)
+    - "token": fragment de texte produit par le LLM pendant la génération
+    - "done": test final extrait ({"generated_test", "analysis_id", "cached"})
+    - "error": erreur survenue pendant la génération
+
+    La génération se fait toujours en un seul appel afin de pouvoir diffuser la
+    réponse au fil de l'eau. Les résultats sont partagés avec le cache de
+    /rest-assured-test/gemini.
+    """
+    logger.info("REST API endpoint /rest-assured-test/gemini/stream called")
+
+    data = request.get_json()
+    analysis_id = data.get("analysis_id")
+    cached_analysis = get_cached_analysis(analysis_id) if analysis_id else None
+    if analysis_id and cached_analysis is None:
+        logger.warning(f"Unknown analysis_id: {analysis_id}")
+        return jsonify({"error": "Unknown analysis_id"}), 404
+    if cached_analysis is not None:
+        data.setdefault("api_code", cached_analysis["api_code"])
+        if not analysis_matches(cached_analysis, data["api_code"]):
+            logger.warning(f"analysis_id {analysis_id} does not match api_code")
+            return jsonify({"error": "analysis_id was produced for a different api_code"}), 409
+
+    if "api_code" not in data:
+        logger.warning("Request missing api_code parameter")
+        return jsonify({"error": "Missing api_code parameter"}), 400
+
+    api_code = data["api_code"]
+    cache_key = result_cache_key(api_code, "single")
+    cached = None if data.get("no_cache") else lookup_result(cache_key)
+
+    def generate():
+        yield sse_event("stage", {"stage": "started"})
+        if cached is not None:
+            logger.info("Returning cached test generation result")
+            yield sse_event("done", {**cached, "cached": True})
+            return
+
+        try:
+            llm = setup_llm()
+            if cached_analysis is not None:
+                current_id, api_info = analysis_id, cached_analysis["api_info"]
+            else:
+                current_id, api_info = analyze_with_cache(llm, api_code)
+            yield sse_event(
+                "stage",
+                {
+                    "stage": "analysis",
+                    "analysis_id": current_id,
+                    "controller_name": api_info["controller_name"],
+                    "endpoints": len(api_info["endpoints"]),
+                },
+            )
+
+            yield sse_event("stage", {"stage": "generation"})
+            # Le code est extrait au fil des fragments, sans seconde passe sur la réponse
+            extractor = FenceExtractor()
+            with timed_stage("basic", cache="miss"):
+                for text in stream_basic_test(llm, api_code, api_info):
+                    extractor.feed(text)
+                    yield sse_event("token", {"text": text})
+
+            test_code = validate_generated_test(llm, api_code, api_info, extractor.result())
+            result = {"generated_test": test_code, "analysis_id": current_id}
+            result_cache.put(cache_key, result)
+            logger.info(f"Streamed test generated successfully: {len(test_code)} characters")
+            yield sse_event("done", {**result, "cached": False})
+        except RateLimitExceeded as e:
+            logger.warning(f"LLM quota exhausted while streaming: {str(e)}")
+            yield sse_event(
+                "error",
+                {"error": "LLM rate limit exceeded", "status": 429, "retry_after": e.retry_after},
             )
+        except Exception as e:
+            logger.error(f"Error occurred while streaming test: {str(e)}")
+            logger.exception("Full traceback:")
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/rest-assured-test/gemini/jobs", methods=["POST"])
+def submit_job():
+    """
+    Soumet une génération en tâche de fond et retourne immédiatement son identifiant.
+
+    Le corps accepte les mêmes champs que /rest-assured-test/gemini, plus
+    "timeout" (échéance en secondes). Si la file est pleine, la réponse est
+    429 avec un en-tête Retry-After; un analysis_id inconnu donne 404.
+
+    L'échéance est coopérative: elle est vérifiée entre les étapes du pipeline,
+    pas pendant un appel au LLM. Une tâche peut donc la dépasser de la durée
+    d'un appel en cours avant de passer à "expired".
+    """
+    data = request.get_json()
+    if "api_code" not in data:
+        logger.warning("Request missing api_code parameter")
+        return jsonify({"error": "Missing api_code parameter"}), 400
+    if data.get("mode") is not None and data["mode"] not in GENERATION_MODES:
+        return jsonify({"error": f"Invalid mode, expected one of {GENERATION_MODES}"}), 400
+    timeout = data.get("timeout")
+    if timeout is not None and (
+        isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0
+    ):
+        return jsonify({"error": "timeout must be a positive number of seconds"}), 400
+    analysis_id = data.get("analysis_id")
+    if analysis_id:
+        cached_analysis = get_cached_analysis(analysis_id)
+        if cached_analysis is None:
+            logger.warning(f"Unknown analysis_id: {analysis_id}")
+            return jsonify({"error": "Unknown analysis_id"}), 404
+        if not analysis_matches(cached_analysis, data["api_code"]):
+            logger.warning(f"analysis_id {analysis_id} does not match api_code")
+            return jsonify({"error": "analysis_id was produced for a different api_code"}), 409
+
+    payload = {
+        key: data[key]
+        for key in ("api_code", "mode", "analysis_id", "no_cache")
+        if key in data
+    }
+    try:
+        job_id = job_manager.submit(payload, timeout=timeout)
+    except JobQueueFull as e:
+        logger.warning(str(e))
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+
+    response = jsonify({"job_id": job_id, "status": "queued"})
+    response.headers["Location"] = f"/rest-assured-test/gemini/jobs/{job_id}"
+    return response, 202
+
+
+@app.route("/rest-assured-test/gemini/jobs", methods=["GET"])
+def job_stats():
+    """Retourne le nombre de tâches par état et la configuration du pool."""
+    return jsonify(job_manager.stats())
 
-            logger.info("Test generation completed successfully")
-            return jsonify({"generated_test": enhanced_test})
+
+@app.route("/rest-assured-test/gemini/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """Retourne l'état d'une tâche (sans son résultat)."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    job.pop("result")
+    return jsonify(job)
+
+
+@app.route("/rest-assured-test/gemini/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    """
+    Retourne le résultat d'une tâche.
+
+    Codes de retour: 200 si terminée avec succès, 202 si en attente ou en cours,
+    500 si elle a échoué, 410 si elle a été annulée ou a dépassé son échéance.
+    """
+    return job_result_response(job_manager.get(job_id), "job_id")
+
+
+def job_result_response(job, id_field):
+    """Réponse HTTP pour le résultat d'une tâche (job ou amélioration)"""
+    if job is None:
+        return jsonify({"error": f"Unknown {id_field}"}), 404
+    job_id = job["job_id"]
+    if job["status"] == SUCCEEDED:
+        return jsonify(job["result"])
+    if job["status"] not in FINISHED_STATES:
+        return jsonify({id_field: job_id, "status": job["status"]}), 202
+    if job["status"] == FAILED:
+        return jsonify({"error": job["error"]}), 500
+    return jsonify({id_field: job_id, "status": job["status"], "error": job["error"]}), 410
+
+
+@app.route("/rest-assured-test/gemini/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """Annule une tâche en attente, ou demande l'arrêt d'une tâche en cours."""
+    status = job_manager.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown job_id"}), 404
+    return jsonify({"job_id": job_id, "status": status})
+
+
+@app.route("/rest-assured-test/gemini/enhancements/<generation_id>", methods=["GET"])
+def get_enhancement(generation_id):
+    """
+    Retourne le test amélioré en arrière-plan pour une génération.
+
+    Mêmes codes de retour que /rest-assured-test/gemini/jobs/<job_id>/result.
+    """
+    return job_result_response(enhancement_manager.get(generation_id), "generation_id")
+
+
+@app.route("/rest-assured-test/gemini/enhancements", methods=["GET"])
+def enhancement_stats():
+    """Retourne le nombre d'améliorations par état et la taille du pool."""
+    return jsonify(enhancement_manager.stats())
+
+
+@app.route("/rest-assured-test/gemini/batch", methods=["POST"])
+def generate_batch():
+    """
+    Génère les tests de plusieurs contrôleurs en un seul appel.
+
+    Le corps est soit du JSON {"controllers": [...], "mode": ..., "no_cache": ...},
+    soit une archive tar(.gz) d'un arbre de sources dont les contrôleurs Spring
+    sont extraits (le mode est alors lu dans la query string).
+
+    Les contrôleurs identiques ne sont générés qu'une fois et les générations
+    sont réparties sur BATCH_CONCURRENCY workers avec une seule instance du modèle.
+    La réponse est du NDJSON: une ligne par contrôleur, émise dès qu'il est
+    terminé, suivie d'une ligne de résumé.
+    """
+    logger.info("REST API endpoint /rest-assured-test/gemini/batch called")
+    try:
+        if request.is_json:
+            options = request.get_json()
+            controllers = controllers_from_json(options)
         else:
-            return jsonify({"generated_test": basic_test})
+            options = request.args.to_dict()
+            controllers = controllers_from_tarball(
+                request.get_data(), BATCH_MAX_ARCHIVE_BYTES, BATCH_MAX_ARCHIVE_MEMBERS
+            )
+    except ArchiveTooLarge as e:
+        logger.warning(f"Batch archive rejected: {str(e)}")
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        logger.warning(f"Invalid batch request: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+    mode = options.get("mode")
+    if mode is not None and mode not in GENERATION_MODES:
+        return jsonify({"error": f"Invalid mode, expected one of {GENERATION_MODES}"}), 400
+    no_cache = options.get("no_cache") in (True, "true", "1")
+
+    groups = dedupe_controllers(controllers, lambda code: result_cache_key(code, mode))
+    logger.info(f"Batch of {len(controllers)} controllers ({len(groups)} unique)")
+    try:
+        llm = setup_llm()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate_one(api_code):
+        # Le batch passe après les requêtes interactives dans l'ordonnanceur
+        with LLMScheduler.priority(BATCH):
+            return generate_with_cache(api_code, mode, no_cache=no_cache, llm=llm)
+
+    def generate():
+        started = time.perf_counter()
+        failed = 0
+        executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+        try:
+            # Les workers héritent du contexte de la requête (request_id des logs)
+            futures = {
+                executor.submit(contextvars.copy_context().run, generate_one, api_code): ids
+                for api_code, ids in groups.values()
+            }
+            for future in as_completed(futures):
+                try:
+                    line = future.result()
+                except Exception as e:
+                    logger.error(f"Batch generation failed for {futures[future]}: {str(e)}")
+                    line = {"error": str(e)}
+                    failed += len(futures[future])
+                for controller_id in futures[future]:
+                    yield json.dumps({"id": controller_id, **line}) + "\n"
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        summary = {
+            "controllers": len(controllers),
+            "unique": len(groups),
+            "failed": failed,
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info(f"Batch completed: {summary}")
+        yield json.dumps({"summary": summary}) + "\n"
 
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/rest-assured-test/gemini/analysis", methods=["POST"])
+def analyze_only():
+    """
+    Exécute uniquement l'étape d'analyse et retourne son identifiant.
+
+    L'identifiant peut ensuite être passé dans le champ "analysis_id" de
+    /rest-assured-test/gemini pour sauter l'analyse.
+    """
+    data = request.get_json()
+    if "api_code" not in data:
+        logger.warning("Request missing api_code parameter")
+        return jsonify({"error": "Missing api_code parameter"}), 400
+
+    api_code = data["api_code"]
+    analysis_id = analysis_fingerprint(api_code)
+    cached = get_cached_analysis(analysis_id)
+    if cached is not None:
+        return jsonify(
+            {"analysis_id": analysis_id, "analysis": cached["api_info"], "cached": True}
+        )
+
+    try:
+        llm = setup_llm()
+        analysis_id, api_info = analyze_with_cache(llm, api_code)
+        return jsonify({"analysis_id": analysis_id, "analysis": api_info, "cached": False})
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
     except Exception as e:
-        logger.error(f"Error occurred while generating test: {str(e)}")
+        logger.error(f"Error occurred while analyzing API code: {str(e)}")
         logger.exception("Full traceback:")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/rest-assured-test/gemini/analysis/<analysis_id>", methods=["GET"])
+def get_analysis(analysis_id):
+    """Retourne une analyse en cache à partir de son identifiant."""
+    cached = get_cached_analysis(analysis_id)
+    if cached is None:
+        return jsonify({"error": "Unknown analysis_id"}), 404
+    return jsonify({"analysis_id": analysis_id, "analysis": cached["api_info"]})
+
+
+@app.route("/rest-assured-test/gemini/health", methods=["GET"])
+def llm_health():
+    """Contrôle la disponibilité des clients LLM partagés."""
+    clients = llm_registry.check_health()
+    healthy = all(client["healthy"] is not False for client in clients)
+    return (
+        jsonify({"healthy": healthy, "clients": clients, "scheduler": llm_scheduler.stats()}),
+        200 if healthy else 503,
+    )
+
+
+@app.route("/rest-assured-test/gemini/cache", methods=["GET"])
+def cache_stats():
+    """Retourne les compteurs des caches de résultats et d'analyses et de l'index de similarité."""
+    return jsonify(
+        {
+            "results": result_cache.stats(),
+            "analyses": analysis_cache.stats(),
+            "similarity": similarity_index.stats() if similarity_index is not None else None,
+        }
+    )
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Expose les durées et tokens par étape au format texte de Prometheus."""
+    return Response(pipeline_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/rest-assured-test/gemini/tiers", methods=["GET"])
+def tier_stats():
+    """Retourne, par étape et par tier de modèle, les appels, le taux d'escalade et la durée moyenne."""
+    return jsonify(
+        {
+            "tiers": [tier._asdict() for tier in model_policy.tiers],
+            "default": model_policy.default.name,
+            "stages": model_policy.snapshot(),
+        }
+    )
+
+
+@app.route("/rest-assured-test/gemini/compaction", methods=["GET"])
+def compaction_stats():
+    """Retourne, par étape, les tokens estimés avant et après compaction des prompts."""
+    return jsonify({"enabled": PROMPT_COMPACTION, "stages": compaction_report.snapshot()})
+
+
+warm_up_llm()
+
 if __name__ == "__main__":
     app.run(debug=True)
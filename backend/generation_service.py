@@ -0,0 +1,95 @@
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from java_validation import extract_code
+from llm_clients import registry
+from logger import setup_logger
+from prompts.registry import prompt_registry
+from providers.base import ProviderError
+from providers.gemini_provider import GeminiProvider
+from providers.mistral_provider import MistralProvider
+from providers.ollama_provider import OllamaProvider
+from providers.router import Router
+
+# ====================================
+# SERVICE DE GÉNÉRATION MULTI-FOURNISSEURS
+# ====================================
+
+logger = setup_logger()
+load_dotenv()
+
+PROVIDER_CLASSES = {
+    "gemini": GeminiProvider,
+    "mistral": MistralProvider,
+    "ollama": OllamaProvider,
+}
+
+
+def build_router() -> Router:
+    """
+    Construit le routeur à partir des variables d'environnement.
+
+    GENERATION_PROVIDERS liste les fournisseurs (ex: "gemini,mistral,ollama") et
+    HEDGE_DELAY_MS active le hedging après ce délai en millisecondes.
+    """
+    names = os.environ.get("GENERATION_PROVIDERS", "gemini,mistral,ollama").split(",")
+    providers = [PROVIDER_CLASSES[name.strip()]() for name in names if name.strip()]
+    hedge_delay = os.environ.get("HEDGE_DELAY_MS")
+    return Router(providers, hedge_delay=float(hedge_delay) / 1000 if hedge_delay else None)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await registry.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.state.router = build_router()
+
+
+class GenerationRequest(BaseModel):
+    api_code: str
+    test_type: str = "API"
+    providers: Optional[List[str]] = None
+    hedge: Optional[bool] = None
+    max_tokens: int = 4096
+    temperature: float = 0.2
+
+
+@app.post("/generate")
+async def generate(request: GenerationRequest):
+    """Génère un test avec le fournisseur le plus rapide et fiable du moment."""
+    prompt = prompt_registry.get("direct_test").format_prompt(
+        api_code=request.api_code, test_type=request.test_type
+    )
+    try:
+        result = await app.state.router.generate(
+            prompt,
+            providers=request.providers,
+            hedge=request.hedge,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+        )
+    except ProviderError as e:
+        logger.error(f"Generation failed on every provider: {str(e)}")
+        raise HTTPException(status_code=502, detail=str(e))
+
+    return {
+        "generated_test": extract_code(result.text),
+        "provider": result.provider,
+        "model": result.model,
+        "latency": result.latency,
+        "hedged": result.hedged,
+    }
+
+
+@app.get("/providers")
+async def provider_stats():
+    """Retourne la latence p50/p95 et le taux d'erreur glissants de chaque fournisseur."""
+    return app.state.router.snapshot()
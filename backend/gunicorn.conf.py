@@ -0,0 +1,93 @@
+"""
+Configuration gunicorn du backend Gemini en production.
+
+    gunicorn -c gunicorn.conf.py
+
+Le processus maître importe une seule fois les bibliothèques lourdes
+(LangChain, client Gemini, pydantic, Flask) et construit le registre des
+prompts; les workers, créés par fork, en héritent sans les réimporter. Chaque
+worker importe ensuite gemini.py: connexions SQLite, ordonnanceur LLM, client
+Gemini et threads des tâches lui sont propres, aucun de ces objets ne
+survivant correctement à un fork.
+
+Chaque worker a ses propres métriques (/metrics, /health, statistiques de /tiers
+et /cache; le nombre de tâches de /jobs vient de SQLite et est global) et son propre fichier de log
+(logs/gemini_api.<pid>.log, LOG_FILE_PER_PROCESS): plusieurs processus ne
+peuvent pas faire tourner un même fichier. Les workers de tâches (JOB_WORKERS,
+ENHANCE_WORKERS) tournent dans chaque worker et se partagent la file SQLite:
+une tâche n'est réclamée que par un seul d'entre eux, et un verrou tenu par un
+autre processus est attendu puis retenté (voir JobManager).
+
+Rechargement sans coupure: kill -HUP <pid du maître> recharge les modules du
+backend dans le maître, démarre de nouveaux workers puis arrête les anciens
+après leurs requêtes en cours (graceful_timeout).
+
+Variables d'environnement:
+    BIND: Adresse d'écoute (0.0.0.0:5000 par défaut)
+    WEB_WORKERS: Nombre de processus workers (nombre de CPU par défaut)
+    WEB_THREADS: Threads par worker (8 par défaut; les requêtes attendent surtout le LLM)
+    WEB_TIMEOUT: Durée maximale d'une requête en secondes (600 par défaut)
+    WEB_GRACEFUL_TIMEOUT: Délai laissé aux requêtes en cours à l'arrêt (60 par défaut)
+"""
+
+import importlib
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules importés par le maître avant le fork
+PRELOADED_MODULES = (
+    "flask",
+    "pydantic",
+    "langchain_core.runnables",
+    "langchain_google_genai",
+    "prompts.registry",
+)
+
+# Un fichier de log par worker (les workers sont créés après la lecture de ce fichier)
+os.environ.setdefault("LOG_FILE_PER_PROCESS", "1")
+
+wsgi_app = "gemini:app"
+chdir = BACKEND_DIR
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_WORKERS", str(os.cpu_count() or 1)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "8"))
+timeout = int(os.environ.get("WEB_TIMEOUT", "600"))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "60"))
+keepalive = 5
+accesslog = "-"
+
+
+def _preload(server):
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    started = time.perf_counter()
+    for name in PRELOADED_MODULES:
+        importlib.import_module(name)
+    server.log.info(f"Preloaded {len(PRELOADED_MODULES)} modules in {time.perf_counter() - started:.2f}s")
+
+
+def on_starting(server):
+    _preload(server)
+
+
+def on_reload(server):
+    # Les modules du backend (prompts compris) sont oubliés puis réimportés: les
+    # nouveaux workers voient le code modifié, les bibliothèques restent en mémoire
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if path.startswith(BACKEND_DIR + os.sep):
+            del sys.modules[name]
+    _preload(server)
+
+
+def post_worker_init(worker):
+    # Les tâches en file sont reprises dès le démarrage du worker, sans attendre
+    # une première requête (voir start_job_workers)
+    import gemini
+
+    gemini.job_manager.start()
+    gemini.enhancement_manager.start()
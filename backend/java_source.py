@@ -0,0 +1,210 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+# ====================================
+# OUTILS LEXICAUX POUR LE CODE JAVA
+# ====================================
+
+_OPENING = {"(": ")", "{": "}", "[": "]", "<": ">"}
+
+
+def strip_comments(code: str) -> str:
+    """
+    Remplace les commentaires Java par des espaces en conservant les positions.
+
+    Les retours à la ligne sont gardés et les littéraux (chaînes, caractères,
+    text blocks) sont laissés intacts, de sorte qu'un index dans le résultat
+    correspond au même index dans le code original.
+    """
+    out = []
+    i = 0
+    n = len(code)
+    while i < n:
+        c = code[i]
+        if code.startswith('"""', i):
+            end = code.find('"""', i + 3)
+            end = n if end == -1 else end + 3
+            out.append(code[i:end])
+            i = end
+        elif c == '"' or c == "'":
+            end = skip_literal(code, i)
+            out.append(code[i:end])
+            i = end
+        elif code.startswith("//", i):
+            end = code.find("\n", i)
+            end = n if end == -1 else end
+            out.append(" " * (end - i))
+            i = end
+        elif code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            end = n if end == -1 else end + 2
+            out.append(re.sub(r"[^\n]", " ", code[i:end]))
+            i = end
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+
+def skip_literal(code: str, start: int) -> int:
+    """Retourne l'index suivant la fin du littéral chaîne/caractère qui commence à start"""
+    quote = code[start]
+    i = start + 1
+    n = len(code)
+    while i < n:
+        if code[i] == "\\":
+            i += 2
+            continue
+        if code[i] == quote or code[i] == "\n":
+            return i + 1
+        i += 1
+    return n
+
+
+def find_matching(code: str, open_index: int) -> int:
+    """
+    Retourne l'index du délimiteur fermant correspondant à celui situé à open_index.
+
+    Le code doit être débarrassé de ses commentaires (voir strip_comments).
+    Retourne -1 si le délimiteur n'est jamais fermé (code tronqué).
+    """
+    opening = code[open_index]
+    closing = _OPENING[opening]
+    depth = 0
+    i = open_index
+    n = len(code)
+    while i < n:
+        c = code[i]
+        if c == '"' or c == "'":
+            i = skip_literal(code, i)
+            continue
+        if c == opening:
+            depth += 1
+        elif c == closing:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+
+def iter_members(code: str, start: int, end: int) -> Iterator[Tuple[int, str, int, int]]:
+    """
+    Parcourt les membres de premier niveau entre start et end.
+
+    Retourne des tuples (début, en-tête, ouverture du bloc, fermeture du bloc);
+    les membres sans bloc (champs, imports) ont -1 comme bornes de bloc.
+    """
+    i = member_start = start
+    while i < end:
+        c = code[i]
+        if c == '"' or c == "'":
+            i = skip_literal(code, i)
+            continue
+        if c == "(":
+            # Les arguments d'annotation peuvent contenir des accolades ({"/a", "/b"})
+            close = find_matching(code, i)
+            i = end if close == -1 else close + 1
+            continue
+        if c == ";":
+            yield member_start, code[member_start:i], -1, -1
+            member_start = i + 1
+        elif c == "{":
+            close = find_matching(code, i)
+            close = end if close == -1 or close > end else close
+            yield member_start, code[member_start:i], i, close
+            i = member_start = close + 1
+            continue
+        i += 1
+
+
+def split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Découpe le texte sur le séparateur en ignorant les (), <>, {}, [] et littéraux"""
+    parts = []
+    depth = 0
+    current = []
+    i = 0
+    n = len(text)
+    while i < n:
+        c = text[i]
+        if c == '"' or c == "'":
+            end = skip_literal(text, i)
+            current.append(text[i:end])
+            i = end
+            continue
+        if c in "(<{[":
+            depth += 1
+        elif c in ")>}]":
+            depth -= 1
+        if c == separator and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(c)
+        i += 1
+    tail = "".join(current).strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def parse_annotations(text: str) -> Tuple[List[Tuple[str, str]], str]:
+    """
+    Extrait les annotations en tête du texte.
+
+    Retourne:
+        Tuple (annotations, reste) où annotations est une liste de (nom, arguments)
+        et reste le texte qui suit la dernière annotation
+    """
+    annotations = []
+    i = 0
+    n = len(text)
+    while True:
+        while i < n and text[i].isspace():
+            i += 1
+        match = re.match(r"@\s*([\w.]+)", text[i:])
+        if not match or match.group(1) == "interface":
+            break
+        name = match.group(1).split(".")[-1]
+        i += match.end()
+        j = i
+        while j < n and text[j].isspace():
+            j += 1
+        args = ""
+        if j < n and text[j] == "(":
+            end = find_matching(text, j)
+            end = n - 1 if end == -1 else end
+            args = text[j + 1 : end].strip()
+            i = end + 1
+        annotations.append((name, args))
+    return annotations, text[i:]
+
+
+def annotation_values(args: str, *names: str) -> List[str]:
+    """
+    Retourne les chaînes d'un argument d'annotation.
+
+    Cherche d'abord les attributs nommés (ex: value, path), puis l'argument
+    positionnel. Gère les valeurs simples ("/x") et les tableaux ({"/a", "/b"}).
+    """
+    if not args:
+        return []
+    for part in split_top_level(args):
+        key, sep, value = part.partition("=")
+        if sep and key.strip().isidentifier() and not value.startswith("="):
+            if key.strip() not in names:
+                continue
+        else:
+            value = part
+        return re.findall(r'"((?:[^"\\]|\\.)*)"', value)
+    return []
+
+
+def annotation_attribute(args: str, name: str) -> Optional[str]:
+    """Retourne le texte brut d'un attribut nommé d'annotation, ou None"""
+    for part in split_top_level(args):
+        key, sep, value = part.partition("=")
+        if sep and key.strip() == name:
+            return value.strip()
+    return None
+
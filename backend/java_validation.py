@@ -0,0 +1,238 @@
+import re
+from typing import List, NamedTuple, Optional
+
+from endpoint_merge import ENDPOINT_MARKER, endpoint_label
+from java_source import skip_literal, strip_comments
+
+# ====================================
+# EXTRACTION DU CODE DES RÉPONSES
+# ====================================
+
+FENCE = "```"
+LANGUAGE_TAG = re.compile(r"[\w+#.-]*")
+
+
+class FenceExtractor:
+    """
+    Extrait, au fil des fragments d'une réponse, le code du premier bloc ```.
+
+    Chaque fragment n'est examiné qu'une fois: feed retourne le code devenu
+    disponible (pour le diffuser), et result le code complet une fois la réponse
+    terminée. L'étiquette de langage (```java) est ignorée. Sans bloc de code,
+    result retourne tout le texte.
+
+    Attributs:
+        found: Un bloc de code a été ouvert
+        complete: Le bloc de code a été fermé
+    """
+
+    def __init__(self):
+        self.found = False
+        self.complete = False
+        self._raw = []
+        self._code = []
+        self._pending = ""
+        self._in_tag = False
+
+    def feed(self, text: str) -> str:
+        """Ajoute un fragment de la réponse et retourne le code nouvellement extrait"""
+        self._raw.append(text)
+        if self.complete:
+            return ""
+        pending = self._pending + text
+        emitted = []
+
+        if not self.found:
+            start = pending.find(FENCE)
+            if start == -1:
+                # Garder de quoi reconnaître une clôture coupée entre deux fragments
+                self._pending = pending[-(len(FENCE) - 1) :]
+                return ""
+            self.found = True
+            self._in_tag = True
+            pending = pending[start + len(FENCE) :]
+
+        if self._in_tag:
+            newline = pending.find("\n")
+            if newline == -1:
+                self._pending = pending
+                return ""
+            self._in_tag = False
+            if LANGUAGE_TAG.fullmatch(pending[:newline].strip()):
+                pending = pending[newline + 1 :]
+
+        end = pending.find(FENCE)
+        if end != -1:
+            self.complete = True
+            emitted.append(pending[:end])
+            self._pending = ""
+        else:
+            # Les derniers caractères peuvent être le début de la clôture
+            keep = next(
+                (n for n in range(len(FENCE) - 1, 0, -1) if pending.endswith(FENCE[:n])), 0
+            )
+            emitted.append(pending[: len(pending) - keep])
+            self._pending = pending[len(pending) - keep :]
+        code = "".join(emitted)
+        self._code.append(code)
+        return code
+
+    def result(self) -> str:
+        """Retourne le code du bloc (même non fermé), ou tout le texte sans bloc de code"""
+        if not self.found:
+            return "".join(self._raw).strip()
+        code = "".join(self._code)
+        if not self.complete:
+            code += self._pending if not self._in_tag else ""
+        return code.strip()
+
+
+def extract_code(text: str) -> str:
+    """Retourne le code du premier bloc ``` de text, ou text entier sans bloc de code"""
+    extractor = FenceExtractor()
+    extractor.feed(text)
+    return extractor.result()
+
+
+# ====================================
+# VALIDATION DES CLASSES DE TEST GÉNÉRÉES
+# ====================================
+
+_CLOSING = {"}": "{", ")": "(", "]": "["}
+
+
+class JavaCheck(NamedTuple):
+    """
+    Résultat de check_java.
+
+    Attributs:
+        errors: Problèmes de syntaxe ou de structure détectés
+        missing_endpoints: Endpoints de l'analyse sans méthode de test
+        truncated: Le code s'arrête avec des blocs encore ouverts
+    """
+
+    errors: List[str]
+    missing_endpoints: List[dict]
+    truncated: bool
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.missing_endpoints
+
+
+def _scan(code: str):
+    """
+    Parcourt les délimiteurs du code sans commentaires.
+
+    Retourne:
+        Tuple (erreurs, délimiteurs restés ouverts, fin du dernier membre complet
+        de la classe de premier niveau ou -1)
+    """
+    errors = []
+    stack = []
+    last_member_end = -1
+    i = 0
+    n = len(code)
+    while i < n:
+        c = code[i]
+        if code.startswith('"""', i):
+            end = code.find('"""', i + 3)
+            i = n if end == -1 else end + 3
+            continue
+        if c == '"' or c == "'":
+            i = skip_literal(code, i)
+            continue
+        if c in "{([":
+            stack.append((c, i))
+        elif c in _CLOSING:
+            if not stack:
+                line = code.count("\n", 0, i) + 1
+                errors.append(f"Unexpected '{c}' at line {line}")
+            elif stack[-1][0] != _CLOSING[c]:
+                line = code.count("\n", 0, i) + 1
+                errors.append(f"Mismatched '{c}' at line {line}")
+                stack.pop()
+            else:
+                stack.pop()
+                if c == "}" and len(stack) == 1:
+                    last_member_end = i
+        elif c == ";" and len(stack) == 1:
+            last_member_end = i
+        i += 1
+    return errors, stack, last_member_end
+
+
+def _path_pattern(path: str) -> str:
+    parts = re.split(r"\{[^}]*\}", path.rstrip("/"))
+    return "[^/\"?]+".join(re.escape(part) for part in parts) + r"/?(?:\?[^\"]*)?"
+
+
+def _covered(endpoint: dict, code: str, literals: List[str], base_path: str) -> bool:
+    if ENDPOINT_MARKER + endpoint_label(endpoint) in code:
+        return True
+    method = endpoint["method"].lower()
+    if not re.search(rf"\.{method}\s*\(", code):
+        return False
+    candidates = [endpoint["path"]]
+    base = (base_path or "").rstrip("/")
+    if base and endpoint["path"].startswith(base):
+        # Chemin relatif quand le test configure RestAssured.basePath
+        candidates.append(endpoint["path"][len(base) :] or "/")
+    for path in candidates:
+        pattern = re.compile(_path_pattern(path) + "$")
+        if any(pattern.match(literal) for literal in literals):
+            return True
+    return False
+
+
+def check_java(code: str, endpoints: Optional[List[dict]] = None, base_path: str = "") -> JavaCheck:
+    """
+    Vérifie rapidement (sans compilateur) une classe de test générée.
+
+    La syntaxe est contrôlée par l'équilibre des accolades, parenthèses et
+    crochets (hors commentaires et littéraux); la structure par la présence d'une
+    classe et de méthodes @Test, et d'un test pour chaque endpoint: marqueur
+    "// endpoint: ..." des classes fusionnées, ou appel .get/.post... sur un
+    littéral correspondant au chemin.
+
+    Arguments:
+        code: Code Java de la classe de test
+        endpoints: Endpoints de l'analyse (facultatif)
+        base_path: Chemin de base du contrôleur (pour les chemins relatifs)
+
+    Retourne:
+        JavaCheck
+    """
+    stripped = strip_comments(code)
+    errors, unclosed, _ = _scan(stripped)
+    truncated = bool(unclosed)
+    if truncated:
+        line = stripped.count("\n", 0, unclosed[-1][1]) + 1
+        errors.append(f"{len(unclosed)} unclosed delimiter(s), last opened at line {line}")
+    if not re.search(r"\bclass\s+\w+", stripped):
+        errors.append("No class declaration")
+    elif "@Test" not in stripped:
+        errors.append("No @Test method")
+
+    literals = re.findall(r'"((?:\\.|[^"\\\n])*)"', stripped)
+    missing = [
+        endpoint
+        for endpoint in endpoints or []
+        if not _covered(endpoint, code, literals, base_path)
+    ]
+    return JavaCheck(errors, missing, truncated)
+
+
+def close_truncated(code: str) -> Optional[str]:
+    """
+    Répare une classe tronquée: coupe après le dernier membre complet de la classe
+    principale et referme celle-ci.
+
+    Retourne:
+        Le code réparé, ou None si aucun membre n'est complet
+    """
+    stripped = strip_comments(code)
+    _, unclosed, last_member_end = _scan(stripped)
+    if not unclosed or last_member_end == -1 or unclosed[0][0] != "{":
+        return None
+    return code[: last_member_end + 1].rstrip() + "\n}\n"
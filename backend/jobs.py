@@ -0,0 +1,359 @@
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+from logger import request_id_var
+
+# Le logger est configuré par gemini.py; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+# États possibles d'une tâche
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, EXPIRED)
+
+
+class JobQueueFull(Exception):
+    """Levée quand la file d'attente a atteint sa taille maximale"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+class JobCancelled(Exception):
+    """Levée par le point de contrôle quand l'annulation d'une tâche est demandée"""
+
+
+class JobDeadlineExceeded(Exception):
+    """Levée par le point de contrôle quand une tâche dépasse son échéance"""
+
+
+class JobManager:
+    """
+    File de tâches persistante (SQLite) traitée par un pool de threads.
+
+    Les tâches en attente survivent aux redémarrages: la base est la seule source
+    de vérité et chaque worker réserve sa prochaine tâche par une transaction
+    immédiate, ce qui permet aussi de partager la file entre plusieurs processus.
+    Une tâche "running" dont le heartbeat n'est plus mis à jour (processus arrêté)
+    est remise en attente.
+
+    Attributs:
+        handler: Fonction (payload, checkpoint) -> résultat exécutant une tâche
+        path: Chemin du fichier SQLite
+        workers: Nombre de threads de traitement
+        max_queued: Nombre maximal de tâches en attente avant de refuser (429)
+        default_timeout: Échéance par défaut d'une tâche, en secondes
+        on_finish: Fonction (payload, tâche) appelée quand une tâche se termine (facultatif)
+        name: Préfixe du nom des threads (pour les logs)
+    """
+
+    HEARTBEAT_INTERVAL = 5.0
+    STALE_AFTER = 30.0
+    POLL_INTERVAL = 1.0
+    # Attente d'un verrou SQLite tenu par un autre processus, et pause maximale
+    # après une erreur de la base (les threads ne s'arrêtent jamais)
+    BUSY_TIMEOUT = 30.0
+    MAX_BACKOFF = 30.0
+    FINISH_ATTEMPTS = 5
+
+    def __init__(
+        self,
+        handler: Callable[[dict, Callable[[], None]], dict],
+        path: str,
+        workers: int = 4,
+        max_queued: int = 100,
+        default_timeout: float = 600,
+        on_finish: Optional[Callable[[dict, dict], None]] = None,
+        name: str = "job",
+    ):
+        self.handler = handler
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.default_timeout = default_timeout
+        self.on_finish = on_finish
+        self.name = name
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._running = set()
+        self._started = False
+        self._average_duration = 10.0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(
+            path, timeout=self.BUSY_TIMEOUT, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, deadline REAL NOT NULL, heartbeat_at REAL, "
+            "cancel_requested INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+        )
+
+    def start(self):
+        """Démarre les workers et le heartbeat (sans effet s'ils tournent déjà)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            self._requeue_stale()
+        except sqlite3.OperationalError as e:
+            # Le heartbeat refera la reprise des tâches abandonnées
+            logger.error(f"{self.name} could not requeue stale jobs at startup: {str(e)}")
+        for index in range(self.workers):
+            threading.Thread(
+                target=self._work, name=f"{self.name}-worker-{index}", daemon=True
+            ).start()
+        threading.Thread(
+            target=self._heartbeat, name=f"{self.name}-heartbeat", daemon=True
+        ).start()
+        logger.info(f"Job manager started with {self.workers} workers ({self.path})")
+
+    def submit(self, payload: dict, timeout: Optional[float] = None) -> str:
+        """
+        Ajoute une tâche à la file.
+
+        Retourne:
+            L'identifiant de la tâche
+
+        Lève:
+            JobQueueFull: Si max_queued tâches sont déjà en attente
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            queued = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFull(self._retry_after(queued))
+            self._db.execute(
+                "INSERT INTO jobs (id, status, payload, created_at, deadline) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload), now, now + (timeout or self.default_timeout)),
+            )
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"Job {job_id} queued ({queued + 1} waiting)")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Retourne l'état d'une tâche (avec son résultat si terminée), ou None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, result, error, created_at, started_at, "
+                "finished_at, deadline FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "created_at": row[4],
+            "started_at": row[5],
+            "finished_at": row[6],
+            "deadline": row[7],
+        }
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Annule une tâche.
+
+        Une tâche en attente est annulée immédiatement; une tâche en cours
+        s'arrête à son prochain point de contrôle.
+
+        Retourne:
+            Le nouvel état de la tâche, ou None si elle est inconnue
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+            row = self._db.execute(
+                "SELECT status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> dict:
+        """Retourne le nombre de tâches par état"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        return {"workers": self.workers, "max_queued": self.max_queued, **dict(rows)}
+
+    def _retry_after(self, queued: int) -> int:
+        return max(1, math.ceil(queued / self.workers * self._average_duration))
+
+    def _claim(self) -> Optional[tuple]:
+        """Réserve la plus ancienne tâche en attente pour ce processus"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, payload, deadline FROM jobs WHERE status = ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? "
+                        "WHERE id = ?",
+                        (RUNNING, now, now, row[0]),
+                    )
+                    self._running.add(row[0])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id: str, status: str, result=None, error=None):
+        # La tâche reste "running" (et son heartbeat actif) tant que l'état final
+        # n'est pas écrit: sinon elle serait remise en attente et exécutée deux fois
+        for attempt in range(self.FINISH_ATTEMPTS):
+            try:
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                        "WHERE id = ?",
+                        (
+                            status,
+                            json.dumps(result) if result is not None else None,
+                            error,
+                            time.time(),
+                            job_id,
+                        ),
+                    )
+                    self._running.discard(job_id)
+                return
+            except sqlite3.OperationalError as e:
+                if attempt + 1 == self.FINISH_ATTEMPTS:
+                    with self._lock:
+                        self._running.discard(job_id)
+                    raise
+                logger.warning(f"Could not record end of job {job_id}, retrying: {str(e)}")
+                time.sleep(self._backoff(attempt))
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.MAX_BACKOFF, self.POLL_INTERVAL * 2**failures)
+
+    def _checkpoint(self, job_id: str, deadline: float) -> Callable[[], None]:
+        def checkpoint():
+            if time.time() > deadline:
+                raise JobDeadlineExceeded(f"Job {job_id} exceeded its deadline")
+            with self._lock:
+                cancel = self._db.execute(
+                    "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()[0]
+            if cancel:
+                raise JobCancelled(f"Job {job_id} was cancelled")
+
+        return checkpoint
+
+    def _work(self):
+        failures = 0
+        while True:
+            try:
+                self._work_once()
+                failures = 0
+            except Exception as e:
+                # Erreur de la base (verrou tenu par un autre processus...): le
+                # thread attend puis reprend au lieu de s'arrêter définitivement
+                delay = self._backoff(failures)
+                failures += 1
+                logger.error(f"{self.name} worker error, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+
+    def _work_once(self):
+        """Traite la prochaine tâche en attente, ou attend qu'il y en ait une"""
+        job = self._claim()
+        if job is None:
+            with self._wakeup:
+                self._wakeup.wait(self.POLL_INTERVAL)
+            return
+
+        job_id, payload, deadline = job
+        request_id_var.set(job_id)
+        started = time.time()
+        logger.info(f"Job {job_id} started")
+        try:
+            checkpoint = self._checkpoint(job_id, deadline)
+            checkpoint()
+            result = self.handler(json.loads(payload), checkpoint)
+            self._finish(job_id, SUCCEEDED, result=result)
+            logger.info(f"Job {job_id} succeeded in {time.time() - started:.1f}s")
+        except JobCancelled:
+            self._finish(job_id, CANCELLED)
+            logger.info(f"Job {job_id} cancelled")
+        except JobDeadlineExceeded as e:
+            self._finish(job_id, EXPIRED, error=str(e))
+            logger.warning(f"Job {job_id} expired")
+        except Exception as e:
+            self._finish(job_id, FAILED, error=str(e))
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            logger.exception("Full traceback:")
+        finally:
+            duration = time.time() - started
+            self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+        if self.on_finish is not None:
+            try:
+                self.on_finish(json.loads(payload), self.get(job_id))
+            except Exception as e:
+                logger.error(f"Job {job_id} completion hook failed: {str(e)}")
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    for job_id in list(self._running):
+                        self._db.execute(
+                            "UPDATE jobs SET heartbeat_at = ? WHERE id = ?",
+                            (time.time(), job_id),
+                        )
+                self._requeue_stale()
+            except Exception as e:
+                # Un heartbeat manqué est rattrapé au suivant, bien avant STALE_AFTER
+                logger.error(f"{self.name} heartbeat failed: {str(e)}")
+
+    def _requeue_stale(self):
+        """Remet en attente les tâches dont le processus propriétaire s'est arrêté"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ? "
+                "AND heartbeat_at < ?",
+                (QUEUED, RUNNING, time.time() - self.STALE_AFTER),
+            )
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} interrupted jobs")
@@ -0,0 +1,224 @@
+import hashlib
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Le logger est configuré par le serveur appelant; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+# ====================================
+# REGISTRE DES CLIENTS LLM
+# ====================================
+
+
+class ClientEntry:
+    """
+    Client partagé et état de son dernier contrôle de santé.
+
+    Attributs:
+        provider: Nom du fournisseur (gemini, ollama, mistral)
+        model: Modèle servi par ce client (None si le client est multi-modèles)
+        client: Instance du client
+        check: Fonction de contrôle de santé (synchrone ou coroutine)
+        created_at: Date de création du client
+    """
+
+    def __init__(self, provider: str, model: Optional[str], client, check: Optional[Callable]):
+        self.provider = provider
+        self.model = model
+        self.client = client
+        self.check = check
+        self.created_at = time.time()
+        self.healthy = None
+        self.last_check = None
+        self.error = None
+
+    def status(self) -> dict:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "created_at": self.created_at,
+            "healthy": self.healthy,
+            "last_check": self.last_check,
+            "error": self.error,
+        }
+
+
+class ClientRegistry:
+    """
+    Registre de clients LLM partagés par tout le processus.
+
+    Un client est créé une seule fois par (fournisseur, modèle, paramètres) puis
+    réutilisé par toutes les requêtes, ce qui conserve ses connexions ouvertes
+    (keep-alive) au lieu de refaire la connexion TLS et l'initialisation à
+    chaque appel. Les clés API ne sont jamais conservées en clair dans les clés.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, tuple] = {}
+        self._entries: Dict[tuple, ClientEntry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, provider: str, factory: Callable, check: Optional[Callable] = None):
+        """
+        Déclare un fournisseur.
+
+        Arguments:
+            provider: Nom du fournisseur
+            factory: Fonction (model, **params) -> client
+            check: Fonction (client) -> None levant une exception si le client est
+                indisponible; peut être une coroutine pour les clients asynchrones
+        """
+        self._factories[provider] = (factory, check)
+
+    @staticmethod
+    def _key(provider: str, model: Optional[str], params: dict) -> tuple:
+        items = []
+        for name, value in sorted(params.items()):
+            if name in ("api_key", "google_api_key") and value:
+                value = hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:16]
+            items.append((name, value))
+        return provider, model, tuple(items)
+
+    def get(self, provider: str, model: Optional[str] = None, **params):
+        """Retourne le client partagé pour ces paramètres, en le créant au besoin"""
+        key = self._key(provider, model, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry.client
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                factory, check = self._factories[provider]
+                started = time.perf_counter()
+                client = factory(model, **params)
+                entry = ClientEntry(provider, model, client, check)
+                self._entries[key] = entry
+                logger.info(
+                    f"Created {provider} client for {model or 'all models'} "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+                )
+        return entry.client
+
+    def warm_up(self, specs, background: bool = True):
+        """
+        Crée les clients à l'avance pour que la première requête ne paie pas leur initialisation.
+
+        Arguments:
+            specs: Liste de tuples (provider, model, params)
+            background: Créer les clients dans un thread pour ne pas retarder le démarrage
+        """
+
+        def run():
+            for provider, model, params in specs:
+                try:
+                    self.get(provider, model, **params)
+                except Exception as e:
+                    logger.warning(f"Warm-up of {provider} client failed: {str(e)}")
+
+        if background:
+            threading.Thread(target=run, name="llm-warmup", daemon=True).start()
+        else:
+            run()
+
+    def check_health(self) -> list:
+        """Exécute les contrôles de santé synchrones et retourne l'état de chaque client"""
+        for entry in list(self._entries.values()):
+            if entry.check is None or inspect.iscoroutinefunction(entry.check):
+                continue
+            self._record(entry, lambda: entry.check(entry.client))
+        return [entry.status() for entry in self._entries.values()]
+
+    async def acheck_health(self) -> list:
+        """Exécute tous les contrôles de santé (y compris asynchrones)"""
+        for entry in list(self._entries.values()):
+            if entry.check is None:
+                continue
+            try:
+                result = entry.check(entry.client)
+                if inspect.isawaitable(result):
+                    await result
+                entry.healthy, entry.error = True, None
+            except Exception as e:
+                entry.healthy, entry.error = False, str(e)
+            entry.last_check = time.time()
+        return [entry.status() for entry in self._entries.values()]
+
+    @staticmethod
+    def _record(entry: ClientEntry, check: Callable):
+        try:
+            check()
+            entry.healthy, entry.error = True, None
+        except Exception as e:
+            entry.healthy, entry.error = False, str(e)
+            logger.warning(f"Health check failed for {entry.provider} client: {str(e)}")
+        entry.last_check = time.time()
+
+    async def aclose(self):
+        """Ferme les clients (asynchrones compris) et vide le registre"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            close = getattr(entry.client, "aclose", None) or getattr(entry.client, "close", None)
+            if close is None:
+                continue
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+
+
+# ====================================
+# FOURNISSEURS
+# ====================================
+
+
+def _create_gemini(model, **params):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=model, **params)
+
+
+def _check_gemini(client):
+    # count_tokens ne consomme pas de quota de génération
+    client.get_num_tokens("ping")
+
+
+def _create_ollama(model, host=None):
+    from ollama import Client
+
+    return Client(host=host or os.environ.get("OLLAMA_HOST"))
+
+
+def _check_ollama(client):
+    client.list()
+
+
+def _create_mistral(model, api_key="", endpoint="https://api.mistral.ai/v1"):
+    import httpx
+
+    return httpx.AsyncClient(
+        base_url=endpoint,
+        headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+        limits=httpx.Limits(
+            max_connections=int(os.environ.get("MISTRAL_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.environ.get("MISTRAL_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=60,
+        ),
+        timeout=30,
+    )
+
+
+async def _check_mistral(client):
+    response = await client.get("/models")
+    response.raise_for_status()
+
+
+registry = ClientRegistry()
+registry.register("gemini", _create_gemini, _check_gemini)
+registry.register("ollama", _create_ollama, _check_ollama)
+registry.register("mistral", _create_mistral, _check_mistral)
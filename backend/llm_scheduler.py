@@ -0,0 +1,294 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Le logger est configuré par gemini.py; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+# Priorités: plus la valeur est basse, plus la requête passe tôt
+INTERACTIVE = 0
+BATCH = 10
+
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """Levée quand un appel reste limité par le fournisseur après toutes les tentatives"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Seau à jetons rempli en continu.
+
+    Attributs:
+        capacity: Nombre maximal de jetons (budget par minute)
+        rate: Jetons ajoutés par seconde
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Retourne le délai avant que amount jetons soient disponibles"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        """Consomme des jetons (le solde peut devenir négatif pour corriger une estimation)"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Extrait le délai demandé par le fournisseur (en-tête Retry-After ou message)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    match = re.search(r"retry in ([\d.]+)\s*s|retry_delay\s*\{\s*seconds:\s*(\d+)", str(error))
+    if match:
+        return float(match.group(1) or match.group(2))
+    return None
+
+
+def is_throttled(error: Exception) -> bool:
+    """Indique si l'erreur correspond à une limitation de débit ou de quota"""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in (429, 503):
+        return True
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable"):
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+class LLMScheduler:
+    """
+    Ordonnanceur partagé devant les appels LLM.
+
+    Chaque appel réserve une requête dans le budget RPM et ses tokens estimés
+    (BasePrompt.estimate_tokens) dans le budget TPM; l'estimation est corrigée
+    avec l'usage réel renvoyé par le modèle. Les appels en attente sont servis
+    par priorité (INTERACTIVE avant BATCH), puis par ordre d'arrivée. Les
+    appels limités par le fournisseur sont relancés avec un backoff exponentiel
+    aléatoire qui respecte le délai Retry-After.
+
+    Attributs:
+        rpm: Budget de requêtes par minute
+        tpm: Budget de tokens par minute
+        max_retries: Nombre de nouvelles tentatives après une limitation
+        base_delay: Délai initial du backoff en secondes
+        max_delay: Délai maximal du backoff en secondes
+        usage_callback: Fonction appelée avec l'usage en tokens de chaque appel réussi
+        traffic: LLMTraffic qui enregistre les appels ou les rejoue sans réseau (facultatif)
+    """
+
+    def __init__(
+        self,
+        rpm: float = 60,
+        tpm: float = 1_000_000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        usage_callback: Optional[Callable[[dict], None]] = None,
+        traffic=None,
+    ):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.usage_callback = usage_callback
+        self.traffic = traffic
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self.throttled = 0
+
+    @staticmethod
+    @contextmanager
+    def priority(level: int):
+        """Exécute le bloc avec la priorité donnée pour tous ses appels LLM"""
+        token = _priority.set(level)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    def _acquire(self, tokens: int):
+        entry = (_priority.get(), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            while True:
+                if self._waiters[0] == entry:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        heapq.heappop(self._waiters)
+                        self._condition.notify_all()
+                        return
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+    def _settle(self, estimated: int, usage: Optional[dict]):
+        """Corrige le budget de tokens avec l'usage réel de la réponse"""
+        usage = usage or {}
+        actual = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        if actual:
+            with self._condition:
+                self.tokens.take(actual - estimated)
+        if self.usage_callback is not None:
+            self.usage_callback(usage)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = min(self.max_delay, self.base_delay * 2**attempt) * random.uniform(0.5, 1.0)
+        return max(delay, _retry_after(error) or 0.0)
+
+    def _estimate(self, prompt, inputs: dict) -> int:
+        if prompt is None:
+            return sum(len(str(value)) for value in inputs.values()) // 4
+        return prompt.estimate_tokens(**inputs)
+
+    def invoke(self, chain, inputs: dict, prompt=None):
+        """
+        Exécute chain.invoke(inputs) dans le respect des budgets.
+
+        Arguments:
+            chain: Chaîne LangChain (prompt | llm)
+            inputs: Variables du prompt
+            prompt: BasePrompt utilisé pour estimer les tokens (facultatif)
+
+        Retourne:
+            La réponse du modèle
+
+        Lève:
+            RateLimitExceeded: Si l'appel est encore limité après max_retries tentatives
+        """
+        if self.traffic is not None and self.traffic.replaying:
+            # Rejeu: ni budget ni réseau, mais l'usage enregistré alimente les métriques
+            response = self.traffic.replay(chain, inputs)
+            if self.usage_callback is not None:
+                self.usage_callback(response.usage_metadata or {})
+            return response
+
+        estimated = self._estimate(prompt, inputs)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimated)
+            started = time.perf_counter()
+            try:
+                response = chain.invoke(inputs)
+            except Exception as e:
+                if not is_throttled(e):
+                    raise
+                self._throttled(attempt, e)
+                continue
+            usage = getattr(response, "usage_metadata", None)
+            if self.traffic is not None:
+                self.traffic.record(chain, inputs, response.content, usage, time.perf_counter() - started)
+            self._settle(estimated, usage)
+            return response
+
+    def stream(self, chain, inputs: dict, prompt=None):
+        """
+        Comme invoke, mais pour chain.stream: retourne un générateur de fragments.
+
+        Les nouvelles tentatives ne sont possibles que tant qu'aucun fragment n'a
+        été transmis à l'appelant.
+        """
+        if self.traffic is not None and self.traffic.replaying:
+            for chunk in self.traffic.replay_stream(chain, inputs):
+                if chunk.usage_metadata and self.usage_callback is not None:
+                    self.usage_callback(chunk.usage_metadata)
+                yield chunk
+            return
+
+        estimated = self._estimate(prompt, inputs)
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimated)
+            started = False
+            began = time.perf_counter()
+            usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+            content = []
+            try:
+                for chunk in chain.stream(inputs):
+                    started = True
+                    for name, count in (getattr(chunk, "usage_metadata", None) or {}).items():
+                        if name in usage:
+                            usage[name] += count
+                    if self.traffic is not None:
+                        content.append(chunk.content)
+                    yield chunk
+                if self.traffic is not None:
+                    self.traffic.record(chain, inputs, "".join(content), usage, time.perf_counter() - began)
+                self._settle(estimated, usage)
+                return
+            except Exception as e:
+                if started or not is_throttled(e):
+                    raise
+                self._throttled(attempt, e)
+
+    def _throttled(self, attempt: int, error: Exception):
+        self.throttled += 1
+        delay = self._backoff(attempt, error)
+        if attempt >= self.max_retries:
+            logger.error(f"LLM call still throttled after {attempt + 1} attempts")
+            raise RateLimitExceeded(str(error), retry_after=delay)
+        logger.warning(
+            f"LLM call throttled (attempt {attempt + 1}), retrying in {delay:.1f}s: {str(error)[:200]}"
+        )
+        time.sleep(delay)
+
+    def stats(self) -> dict:
+        """Retourne l'état des budgets et le nombre d'appels limités"""
+        with self._condition:
+            return {
+                "waiting": len(self._waiters),
+                "requests_available": round(self.requests.tokens, 2),
+                "tokens_available": round(self.tokens.tokens),
+                "throttled": self.throttled,
+                "traffic": self.traffic.mode if self.traffic is not None else "off",
+            }
+
+
+def scheduler_from_env(
+    usage_callback: Optional[Callable[[dict], None]] = None, traffic=None
+) -> LLMScheduler:
+    """Crée l'ordonnanceur à partir de LLM_RPM, LLM_TPM, LLM_MAX_RETRIES, LLM_BACKOFF_*"""
+    return LLMScheduler(
+        rpm=float(os.environ.get("LLM_RPM", "60")),
+        tpm=float(os.environ.get("LLM_TPM", "1000000")),
+        max_retries=int(os.environ.get("LLM_MAX_RETRIES", "5")),
+        base_delay=float(os.environ.get("LLM_BACKOFF_BASE", "1.0")),
+        max_delay=float(os.environ.get("LLM_BACKOFF_MAX", "60")),
+        usage_callback=usage_callback,
+        traffic=traffic,
+    )
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# Le logger est configuré par gemini.py; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+
+class ReplayMiss(LookupError):
+    """Levée en mode replay quand aucun enregistrement ne correspond au prompt"""
+
+
+def prompt_hash(model: Optional[str], prompt: str) -> str:
+    """Hash identifiant un appel: modèle et prompt rendu"""
+    return hashlib.sha256(f"{model or ''}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def render_prompt(chain, inputs: dict) -> str:
+    """Rend le prompt d'une chaîne prompt | llm tel qu'il est envoyé au modèle"""
+    return chain.first.invoke(inputs).to_string()
+
+
+def chain_model(chain) -> Optional[str]:
+    return getattr(chain.last, "model", None) or getattr(chain.last, "model_name", None)
+
+
+class LLMTraffic:
+    """
+    Enregistrement et rejeu des appels LLM.
+
+    En mode "record", chaque appel est ajouté au fichier JSONL (une ligne par
+    appel: hash du prompt, modèle, prompt rendu, réponse, usage en tokens et
+    latence) et son offset est ajouté à l'index <path>.idx ("hash offset").
+    En mode "replay", l'index est chargé (ou reconstruit s'il est incomplet) et
+    les réponses sont lues directement dans le fichier projeté en mémoire (mmap),
+    sans parcours. Un même prompt enregistré plusieurs fois est rejoué à tour
+    de rôle, et la latence d'origine peut être reproduite.
+
+    Attributs:
+        path: Fichier JSONL des appels
+        mode: "record" ou "replay"
+        replay_timing: Attendre la latence enregistrée avant de répondre en replay
+    """
+
+    def __init__(self, path: str, mode: str, replay_timing: bool = False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.mode = mode
+        self.replay_timing = replay_timing
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[int]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._map = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if mode == RECORD:
+            self._log = open(path, "ab")
+            self._index_file = open(self.index_path, "a", encoding="utf-8")
+        elif mode == REPLAY:
+            self._open_replay()
+        else:
+            raise ValueError(f"Unknown LLM traffic mode: {mode}")
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    # ---------------------------------
+    # Enregistrement
+    # ---------------------------------
+
+    def record(self, chain, inputs: dict, content: str, usage: Optional[dict], latency: float):
+        """Ajoute un appel au fichier JSONL et à son index"""
+        model = chain_model(chain)
+        prompt = render_prompt(chain, inputs)
+        key = prompt_hash(model, prompt)
+        line = json.dumps(
+            {
+                "hash": key,
+                "time": time.time(),
+                "model": model,
+                "prompt": prompt,
+                "response": content,
+                "usage": usage or {},
+                "latency": round(latency, 4),
+            },
+            ensure_ascii=False,
+        ).encode("utf-8")
+        with self._lock:
+            offset = self._log.seek(0, os.SEEK_END)
+            self._log.write(line + b"\n")
+            self._log.flush()
+            self._index_file.write(f"{key} {offset}\n")
+            self._index_file.flush()
+
+    # ---------------------------------
+    # Rejeu
+    # ---------------------------------
+
+    def _open_replay(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size == 0:
+            logger.warning(f"LLM traffic file {self.path} is empty, every call will miss")
+            return
+        with open(self.path, "rb") as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+
+        indexed_until = self._load_index()
+        if indexed_until < size:
+            # Index absent ou en retard sur le fichier: on complète à partir du dernier offset
+            self._scan_from(indexed_until)
+        logger.info(
+            f"Replaying LLM traffic from {self.path}: "
+            f"{sum(len(o) for o in self._index.values())} calls, {len(self._index)} prompts"
+        )
+
+    def _load_index(self) -> int:
+        """Charge l'index et retourne l'offset du premier octet non indexé"""
+        if not os.path.exists(self.index_path):
+            return 0
+        end = 0
+        with open(self.index_path, encoding="utf-8") as index:
+            for line in index:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                key, offset = parts[0], int(parts[1])
+                if offset >= len(self._map):
+                    continue
+                self._index.setdefault(key, []).append(offset)
+                line_end = self._map.find(b"\n", offset)
+                end = max(end, len(self._map) if line_end == -1 else line_end + 1)
+        return end
+
+    def _scan_from(self, offset: int):
+        while offset < len(self._map):
+            line_end = self._map.find(b"\n", offset)
+            line_end = len(self._map) if line_end == -1 else line_end
+            try:
+                key = json.loads(self._map[offset:line_end])["hash"]
+                self._index.setdefault(key, []).append(offset)
+            except (ValueError, KeyError):
+                logger.warning(f"Skipping malformed LLM traffic line at offset {offset}")
+            offset = line_end + 1
+
+    def lookup(self, key: str) -> dict:
+        """
+        Retourne l'enregistrement suivant pour ce hash.
+
+        Lève:
+            ReplayMiss: Si le prompt n'a jamais été enregistré
+        """
+        offsets = self._index.get(key)
+        if not offsets:
+            raise ReplayMiss(f"No recorded LLM response for prompt {key[:12]}")
+        with self._lock:
+            position = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+        offset = offsets[position % len(offsets)]
+        line_end = self._map.find(b"\n", offset)
+        return json.loads(self._map[offset : line_end if line_end != -1 else len(self._map)])
+
+    @staticmethod
+    def _usage(entry: dict) -> Optional[dict]:
+        # Les enregistrements de flux antérieurs n'ont pas de total_tokens, requis par AIMessage
+        usage = entry.get("usage")
+        if not usage:
+            return None
+        usage = dict(usage)
+        usage.setdefault(
+            "total_tokens", usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        )
+        return usage
+
+    def replay(self, chain, inputs: dict) -> AIMessage:
+        """Retourne la réponse enregistrée pour cet appel, sous forme d'AIMessage"""
+        entry = self.lookup(prompt_hash(chain_model(chain), render_prompt(chain, inputs)))
+        if self.replay_timing:
+            time.sleep(entry.get("latency", 0))
+        return AIMessage(content=entry["response"], usage_metadata=self._usage(entry))
+
+    def replay_stream(self, chain, inputs: dict, chunk_size: int = 64):
+        """Comme replay, mais en fragments (latence répartie sur les fragments)"""
+        entry = self.lookup(prompt_hash(chain_model(chain), render_prompt(chain, inputs)))
+        content = entry["response"]
+        pieces = [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)] or [""]
+        pause = entry.get("latency", 0) / len(pieces) if self.replay_timing else 0
+        for piece in pieces:
+            if pause:
+                time.sleep(pause)
+            yield AIMessageChunk(content=piece)
+        yield AIMessageChunk(content="", usage_metadata=self._usage(entry))
+
+
+def traffic_from_env() -> Optional[LLMTraffic]:
+    """
+    Crée l'enregistreur à partir de LLM_TRAFFIC_MODE (off, record, replay),
+    LLM_TRAFFIC_PATH et LLM_REPLAY_TIMING; retourne None si désactivé.
+    """
+    mode = os.environ.get("LLM_TRAFFIC_MODE", OFF).lower()
+    if mode == OFF:
+        return None
+    return LLMTraffic(
+        os.environ.get("LLM_TRAFFIC_PATH", "cache/llm_traffic.jsonl"),
+        mode,
+        replay_timing=os.environ.get("LLM_REPLAY_TIMING", "0") == "1",
+    )
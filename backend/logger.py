@@ -1,39 +1,233 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
-from datetime import datetime
-import sys
+import logging.handlers
 import os
+import queue
+import sys
+import zlib
+from datetime import datetime, timezone
+
+# Identifiant de la requête (ou de la tâche) en cours, ajouté à chaque enregistrement
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+# Listeners actifs par nom de logger: setup_logger est idempotent
+_listeners = {}
+# Répertoire des fichiers de log par nom de logger (pour les rouvrir après un fork)
+_log_dirs = {}
+
+
+def truncate(text: str, limit: int) -> str:
+    """Tronque un texte trop long en indiquant le nombre de caractères retirés"""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} chars truncated]"
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Ajoute request_id à l'enregistrement et échantillonne les messages DEBUG.
+
+    L'échantillonnage se fait par requête (hash de l'identifiant) pour garder
+    ou écarter tous les messages DEBUG d'une même requête.
+    """
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.threshold = int(debug_sample_rate * 0xFFFFFFFF)
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        if record.levelno > logging.DEBUG or self.threshold >= 0xFFFFFFFF:
+            return True
+        return zlib.crc32(record.request_id.encode("utf-8")) <= self.threshold
+
+
+class TruncatingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler qui ne fait que fusionner et tronquer le message dans le thread
+    appelant; le formatage et l'écriture ont lieu dans le thread du QueueListener.
+    """
+
+    def __init__(self, log_queue, max_length: int):
+        super().__init__(log_queue)
+        self.max_length = max_length
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = truncate(record.getMessage(), self.max_length)
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formate chaque enregistrement en une ligne JSON"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _LazyDirectoryMixin:
+    """Crée le répertoire du fichier à sa première ouverture (handlers ouverts avec delay=True)"""
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _RotatingFileHandler(_LazyDirectoryMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class _TimedRotatingFileHandler(_LazyDirectoryMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+def _file_handler(path: str) -> logging.Handler:
+    """
+    Fichier à rotation par taille (LOG_MAX_BYTES) ou par période (LOG_ROTATE_WHEN).
+
+    Le fichier (et son répertoire) n'est créé qu'au premier enregistrement, par
+    le thread du QueueListener: l'import ne touche pas au disque.
+    """
+    backups = int(os.environ.get("LOG_BACKUP_COUNT", "5"))
+    when = os.environ.get("LOG_ROTATE_WHEN")
+    if when:
+        return _TimedRotatingFileHandler(
+            path, when=when, backupCount=backups, encoding="utf-8", delay=True
+        )
+    return _RotatingFileHandler(
+        path,
+        maxBytes=int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=backups,
+        encoding="utf-8",
+        delay=True,
+    )
+
+
+def _per_process() -> bool:
+    return os.environ.get("LOG_FILE_PER_PROCESS", "0") == "1"
+
+
+def _log_path(log_dir: str, name: str) -> str:
+    """
+    Chemin du fichier de log: <name>.log, ou <name>.<pid>.log avec
+    LOG_FILE_PER_PROCESS=1 (plusieurs processus ne peuvent pas faire tourner le
+    même fichier sans perdre ou mélanger des enregistrements)
+    """
+    if _per_process():
+        return os.path.join(log_dir, f"{name}.{os.getpid()}.log")
+    return os.path.join(log_dir, f"{name}.log")
+
+
+def _reopen_file_handler(handler: logging.Handler, name: str) -> logging.Handler:
+    """Remplace, dans un processus fils, le fichier du parent par celui du fils"""
+    if not isinstance(handler, logging.FileHandler) or not _per_process():
+        return handler
+    handler.close()
+    reopened = _file_handler(_log_path(_log_dirs[name], name))
+    reopened.setLevel(handler.level)
+    reopened.setFormatter(handler.formatter)
+    return reopened
+
+
+def _restart_listeners():
+    """
+    Relance les QueueListener dans un processus fils (fork d'un serveur préchargé).
+
+    Le thread d'écriture du parent n'existe pas dans le fils: sans lui, les
+    enregistrements resteraient dans la file. Les enregistrements copiés avec la
+    file au moment du fork sont écrits par le parent et écartés ici. Avec
+    LOG_FILE_PER_PROCESS=1, le fils écrit dans son propre fichier.
+    """
+    for name, listener in list(_listeners.items()):
+        while True:
+            try:
+                listener.queue.get_nowait()
+            except queue.Empty:
+                break
+        handlers = [_reopen_file_handler(handler, name) for handler in listener.handlers]
+        restarted = logging.handlers.QueueListener(
+            listener.queue, *handlers, respect_handler_level=True
+        )
+        restarted.start()
+        _listeners[name] = restarted
+        atexit.register(restarted.stop)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listeners)
 
 
 # Configure logger
 def setup_logger(name: str = "gemini_api"):
-    # Create logs directory if it doesn't exist
-    if not os.path.exists("logs"):
-        os.makedirs("logs")
+    """
+    Configure le logger de l'application (une seule fois par nom).
+
+    Les enregistrements passent par une file: le thread appelant ne fait que
+    filtrer, tronquer et mettre en file, et un QueueListener écrit sur la console
+    (texte, niveau INFO) et dans logs/<name>.log (JSON, rotation).
 
-    # Get current date for log filename
-    current_date = datetime.now().strftime("%Y-%m-%d")
+    Variables d'environnement:
+        LOG_LEVEL: Niveau minimal (INFO par défaut; DEBUG pour les détails)
+        LOG_DEBUG_SAMPLE_RATE: Fraction des requêtes dont les messages DEBUG sont gardés
+        LOG_MAX_MESSAGE_CHARS: Longueur maximale d'un message (0 = illimitée)
+        LOG_MAX_BYTES / LOG_ROTATE_WHEN / LOG_BACKUP_COUNT: Rotation du fichier
+        LOG_DIR: Répertoire des fichiers de log (logs par défaut)
+        LOG_FILE_PER_PROCESS: 1 pour un fichier par processus (<name>.<pid>.log),
+            activé par gunicorn.conf.py
 
-    # Configure logger
+    Retourne:
+        Le logger configuré
+    """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    if name in _listeners:
+        return logger
 
-    # Log format
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
+    log_dir = os.environ.get("LOG_DIR", "logs")
+
+    logger.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
 
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(
+        logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+    )
 
     # File handler
-    file_handler = logging.FileHandler(f"logs/{name}_{current_date}.log")
+    _log_dirs[name] = log_dir
+    file_handler = _file_handler(_log_path(log_dir, name))
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = TruncatingQueueHandler(
+        log_queue, int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "4000"))
+    )
+    queue_handler.addFilter(
+        RequestContextFilter(float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "1.0")))
+    )
+    logger.addHandler(queue_handler)
 
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    _listeners[name] = listener
+    atexit.register(listener.stop)
 
     return logger
@@ -0,0 +1,178 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+# ====================================
+# MÉTRIQUES DU PIPELINE (FORMAT PROMETHEUS)
+# ====================================
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072)
+
+# Étape en cours (pour attribuer les tokens consommés) et chronos de la requête
+_current_stage = contextvars.ContextVar("metrics_stage", default=None)
+_request_timings = contextvars.ContextVar("metrics_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Histogramme Prometheus à étiquettes.
+
+    Attributs:
+        name: Nom de la métrique
+        documentation: Texte de l'aide (# HELP)
+        labels: Noms des étiquettes
+        buckets: Bornes supérieures des intervalles (sans +Inf)
+    """
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [compteurs par intervalle..., somme, nombre]
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{_format_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return "\n".join(lines)
+
+
+class StageContext:
+    """Étape chronométrée en cours; le statut de cache et le modèle peuvent être fixés pendant l'étape"""
+
+    def __init__(self, name: str, provider: str, model: str, cache: str):
+        self.name = name
+        self.provider = provider
+        self.model = model
+        self.cache = cache
+
+
+class PipelineMetrics:
+    """
+    Durées et tokens par étape du pipeline (analyze, basic, enhance, parse...).
+
+    Chaque étape est étiquetée par fournisseur, modèle et statut de cache
+    (hit, miss ou none). Les tokens sont ceux rapportés par le modèle
+    (usage_metadata) pour les appels faits pendant l'étape.
+    """
+
+    def __init__(self):
+        self.durations = Histogram(
+            "autotest_stage_duration_seconds",
+            "Wall time of each pipeline stage",
+            ("stage", "provider", "model", "cache"),
+            DURATION_BUCKETS,
+        )
+        self.tokens = Histogram(
+            "autotest_stage_tokens",
+            "Tokens per LLM call, by pipeline stage and direction",
+            ("stage", "provider", "model", "direction"),
+            TOKEN_BUCKETS,
+        )
+        self.llm_calls = Histogram(
+            "autotest_llm_call_duration_seconds",
+            "Wall time of each LLM call, by stage and model tier",
+            ("stage", "tier", "model", "outcome"),
+            DURATION_BUCKETS,
+        )
+        self.requests = Histogram(
+            "autotest_request_duration_seconds",
+            "Wall time of each HTTP request",
+            ("route", "status"),
+            DURATION_BUCKETS,
+        )
+
+    @contextmanager
+    def stage(self, name: str, provider: str = "none", model: str = "none", cache: str = "none"):
+        """Chronomètre le bloc comme étape name et l'ajoute au Server-Timing de la requête"""
+        context = StageContext(name, provider, model, cache)
+        token = _current_stage.set(context)
+        started = time.perf_counter()
+        try:
+            yield context
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_stage.reset(token)
+            self.durations.observe(elapsed, name, provider, context.model, context.cache)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.append((name, elapsed))
+
+    def set_model(self, model: str):
+        """Fixe le modèle de l'étape en cours (celui du dernier appel LLM de l'étape)"""
+        context = _current_stage.get()
+        if context is not None:
+            context.model = model
+
+    def record_usage(self, usage: Optional[dict]):
+        """Attribue l'usage en tokens d'un appel LLM à l'étape en cours"""
+        context = _current_stage.get()
+        if not usage or context is None:
+            return
+        for direction in ("input", "output"):
+            count = usage.get(f"{direction}_tokens")
+            if count:
+                self.tokens.observe(count, context.name, context.provider, context.model, direction)
+
+    def render(self) -> str:
+        """Retourne toutes les métriques au format texte de Prometheus"""
+        return "\n".join(
+            metric.render()
+            for metric in (self.durations, self.tokens, self.llm_calls, self.requests)
+        ) + "\n"
+
+
+def start_request_timing():
+    """Commence la collecte des étapes de la requête courante (pour Server-Timing)"""
+    _request_timings.set([])
+
+
+def server_timing_header() -> Optional[str]:
+    """Retourne la valeur de l'en-tête Server-Timing de la requête courante"""
+    timings = _request_timings.get()
+    if not timings:
+        return None
+    return ", ".join(f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in timings)
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+# ====================================
+# CHOIX DU MODÈLE PAR ÉTAPE (TIERS)
+# ====================================
+
+
+class Tier(NamedTuple):
+    """Modèle et limite de tokens de sortie utilisés pour un appel"""
+
+    name: str
+    model: str
+    max_tokens: int
+
+
+class TierRule(NamedTuple):
+    """
+    Règle de choix d'un tier; la première règle qui correspond l'emporte.
+
+    Attributs:
+        tier: Nom du tier choisi
+        stage: Étape concernée (None = toutes)
+        max_chars: Taille maximale de l'entrée (caractères après compaction, None = illimitée)
+        max_endpoints: Nombre maximal d'endpoints (None = illimité)
+    """
+
+    tier: str
+    stage: Optional[str] = None
+    max_chars: Optional[int] = None
+    max_endpoints: Optional[int] = None
+
+    def matches(self, stage: str, input_chars: int, endpoints: int) -> bool:
+        return (
+            (self.stage is None or self.stage == stage)
+            and (self.max_chars is None or input_chars <= self.max_chars)
+            and (self.max_endpoints is None or endpoints <= self.max_endpoints)
+        )
+
+
+class TieringPolicy:
+    """
+    Politique de choix du modèle par étape, taille d'entrée et nombre d'endpoints.
+
+    Les tiers sont ordonnés du plus petit au plus grand: quand la réponse d'un
+    tier échoue à la validation (JSON invalide, code tronqué...), l'appel est
+    refait avec le tier suivant. Les appels, escalades et durées sont cumulés
+    par étape et par tier.
+
+    Attributs:
+        tiers: Tiers du plus petit au plus grand
+        rules: Règles de choix, évaluées dans l'ordre
+        default: Tier utilisé quand aucune règle ne correspond
+    """
+
+    def __init__(self, tiers: List[Tier], rules: List[TierRule], default: str):
+        self.tiers = list(tiers)
+        self.rules = list(rules)
+        self._by_name = {tier.name: tier for tier in self.tiers}
+        for name in [default] + [rule.tier for rule in self.rules]:
+            if name not in self._by_name:
+                raise ValueError(f"Unknown model tier: {name}")
+        self.default = self._by_name[default]
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, dict] = {}
+
+    @property
+    def version(self) -> str:
+        """Description stable de la politique, pour les clés de cache"""
+        return json.dumps([self.tiers, self.rules, self.default.name])
+
+    def choose(self, stage: str, input_chars: int = 0, endpoints: int = 0) -> Tier:
+        """Retourne le tier de départ pour un appel"""
+        for rule in self.rules:
+            if rule.matches(stage, input_chars, endpoints):
+                return self._by_name[rule.tier]
+        return self.default
+
+    def escalate(self, tier: Tier) -> Optional[Tier]:
+        """Retourne le tier suivant, ou None si tier est déjà le plus grand"""
+        index = self.tiers.index(tier)
+        return self.tiers[index + 1] if index + 1 < len(self.tiers) else None
+
+    def record(self, stage: str, tier: Tier, seconds: float, escalated: bool):
+        with self._lock:
+            totals = self._stats.setdefault(
+                (stage, tier.name), {"calls": 0, "escalations": 0, "seconds": 0.0}
+            )
+            totals["calls"] += 1
+            totals["escalations"] += escalated
+            totals["seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        """Retourne, par étape et par tier, les appels, le taux d'escalade et la durée moyenne"""
+        with self._lock:
+            stats = {key: dict(totals) for key, totals in self._stats.items()}
+        report = {}
+        for (stage, name), totals in sorted(stats.items()):
+            report.setdefault(stage, {})[name] = {
+                "model": self._by_name[name].model,
+                "calls": totals["calls"],
+                "escalation_rate": round(totals["escalations"] / totals["calls"], 3),
+                "average_seconds": round(totals["seconds"] / totals["calls"], 3),
+            }
+        return report
+
+
+def policy_from_env(model: str, max_tokens: int) -> TieringPolicy:
+    """
+    Crée la politique à partir de LLM_TIERS, LLM_TIER_RULES et LLM_DEFAULT_TIER.
+
+    LLM_TIERS est une liste JSON de {"name", "model", "max_tokens"} du plus petit
+    au plus grand tier; LLM_TIER_RULES une liste JSON de {"tier", "stage",
+    "max_chars", "max_endpoints"}. Par défaut, toutes les étapes utilisent le
+    modèle de l'application ("standard") et escaladent vers le même modèle avec
+    deux fois plus de tokens de sortie ("extended").
+    """
+    raw_tiers = os.environ.get("LLM_TIERS")
+    if raw_tiers:
+        tiers = [Tier(t["name"], t["model"], int(t["max_tokens"])) for t in json.loads(raw_tiers)]
+    else:
+        tiers = [Tier("standard", model, max_tokens), Tier("extended", model, max_tokens * 2)]
+    rules = [TierRule(**rule) for rule in json.loads(os.environ.get("LLM_TIER_RULES", "[]"))]
+    return TieringPolicy(tiers, rules, os.environ.get("LLM_DEFAULT_TIER", tiers[0].name))
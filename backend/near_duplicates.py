@@ -0,0 +1,288 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+from java_source import strip_comments
+
+# Le logger est configuré par gemini.py; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+# ====================================
+# INDEX DE QUASI-DOUBLONS (MINHASH + LSH)
+# ====================================
+
+TOKEN = re.compile(r'"(?:\\.|[^"\\\n])*"|\w+|[^\s\w]')
+_EMPTY = (1 << 64) - 1
+
+JAVA_KEYWORDS = {
+    "abstract", "boolean", "break", "byte", "case", "catch", "char", "class", "continue",
+    "default", "do", "double", "else", "enum", "extends", "final", "finally", "float",
+    "for", "if", "implements", "import", "instanceof", "int", "interface", "long", "new",
+    "null", "package", "private", "protected", "public", "return", "short", "static",
+    "super", "switch", "this", "throw", "throws", "try", "void", "while", "true", "false",
+}
+
+
+def _normalize_token(token: str) -> str:
+    # Variables, paramètres et méthodes (minuscule initiale) sont anonymisés;
+    # types, annotations et littéraux (chemins) sont conservés
+    if token[0].islower() and token not in JAVA_KEYWORDS:
+        return "_"
+    return token
+
+
+def shingles(api_code: str, size: int = 5) -> set:
+    """
+    Retourne les k-grammes de tokens du code, sans commentaires ni mise en forme.
+
+    Le reformatage et les commentaires ne changent donc pas l'ensemble, et les
+    identifiants en minuscule sont anonymisés: renommer une variable locale ne
+    le change pas non plus.
+    """
+    tokens = [_normalize_token(t) for t in TOKEN.findall(strip_comments(api_code))]
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(items: set, num_perm: int) -> List[int]:
+    """
+    Signature MinHash en une seule passe (one permutation hashing).
+
+    Chaque élément est haché une fois: le reste de la division choisit l'un des
+    num_perm intervalles et le quotient est comparé au minimum de cet intervalle.
+    Un intervalle vide reprend la valeur de l'intervalle non vide suivant
+    (densification), pour que deux signatures restent comparables position par position.
+    """
+    bins = [_EMPTY] * num_perm
+    for item in items:
+        value = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        index, rank = value % num_perm, value // num_perm
+        if rank < bins[index]:
+            bins[index] = rank
+    filled = [i for i, value in enumerate(bins) if value != _EMPTY]
+    if not filled:
+        return bins
+    signature = list(bins)
+    for i in range(num_perm):
+        if bins[i] == _EMPTY:
+            donor = next((j for j in filled if j > i), filled[0])
+            signature[i] = bins[donor]
+    return signature
+
+
+def jaccard(a: List[int], b: List[int]) -> float:
+    """Estimation de la similarité de Jaccard à partir de deux signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def _type_name(java_type) -> str:
+    # Types comparés sans espaces: Map<String, User> == Map<String,User>
+    return re.sub(r"\s+", "", str(java_type or ""))
+
+
+def endpoint_signature(api_info: dict) -> str:
+    """
+    Empreinte de l'ensemble des endpoints d'une ApiAnalysis.
+
+    Chaque endpoint est réduit à sa méthode, son chemin (variables sans leur nom),
+    ses paramètres (nom, type et emplacement: path, query, body...) et son type de
+    retour: un test n'est réutilisé que si les requêtes et les réponses qu'il
+    vérifie sont les mêmes. L'ordre des endpoints n'a pas d'importance.
+    """
+    endpoints = sorted(
+        (
+            endpoint["method"].upper(),
+            re.sub(r"\{[^}]*\}", "{}", endpoint["path"].rstrip("/") or "/"),
+            sorted(
+                (str(p.get("name", "")), _type_name(p.get("type")), str(p.get("in", "")))
+                for p in endpoint.get("parameters") or []
+            ),
+            _type_name(endpoint.get("return_type")),
+        )
+        for endpoint in api_info.get("endpoints") or []
+    )
+    return hashlib.sha256(json.dumps(endpoints).encode("utf-8")).hexdigest()
+
+
+class NearDuplicate(NamedTuple):
+    """Génération précédente retrouvée par l'index"""
+
+    result_key: str
+    similarity: float
+    controller_name: str
+
+
+class SimilarityIndex:
+    """
+    Index local (SQLite) des contrôleurs déjà générés, interrogé par similarité.
+
+    Chaque contrôleur est représenté par une signature MinHash de ses k-grammes
+    de tokens, découpée en bandes (LSH): deux contrôleurs qui partagent au moins
+    une bande deviennent candidats, et seuls les max_candidates meilleurs sont
+    comparés signature contre signature. Un candidat n'est retenu que si sa
+    similarité atteint threshold et si ses endpoints (endpoint_signature) sont
+    identiques. Les entrées sont cloisonnées par scope (modèle, prompts, mode).
+
+    Attributs:
+        path: Chemin du fichier SQLite (partagé avec les caches)
+        threshold: Similarité de Jaccard minimale (0 à 1)
+        num_perm: Taille de la signature MinHash
+        bands: Nombre de bandes LSH (num_perm doit en être un multiple)
+        shingle_size: Taille des k-grammes de tokens
+        max_candidates: Nombre maximal de candidats comparés par recherche
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 32,
+        shingle_size: int = 5,
+        max_candidates: int = 20,
+    ):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._matches = 0
+        self._lookup_seconds = 0.0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS similarity_signatures (key TEXT PRIMARY KEY, "
+            "signature TEXT NOT NULL, endpoints TEXT NOT NULL, result_key TEXT NOT NULL, "
+            "controller_name TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS similarity_bands (bucket TEXT NOT NULL, key TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS similarity_bands_bucket ON similarity_bands (bucket)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS similarity_bands_key ON similarity_bands (key)"
+        )
+        self._db.commit()
+
+    def _buckets(self, scope: str, signature: List[int]) -> List[str]:
+        rows = self.num_perm // self.bands
+        return [
+            hashlib.blake2b(
+                f"{scope}:{band}:{signature[band * rows : (band + 1) * rows]}".encode("utf-8"),
+                digest_size=10,
+            ).hexdigest()
+            for band in range(self.bands)
+        ]
+
+    def add(self, scope: str, api_code: str, api_info: dict, result_key: str):
+        """Indexe un contrôleur généré et la clé de son résultat dans le cache"""
+        signature = minhash(shingles(api_code, self.shingle_size), self.num_perm)
+        key = hashlib.sha256(f"{scope}:{result_key}".encode("utf-8")).hexdigest()
+        with self._lock:
+            self._db.execute("DELETE FROM similarity_bands WHERE key = ?", (key,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO similarity_signatures "
+                "(key, signature, endpoints, result_key, controller_name, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    json.dumps(signature),
+                    endpoint_signature(api_info),
+                    result_key,
+                    api_info.get("controller_name", ""),
+                    time.time(),
+                ),
+            )
+            self._db.executemany(
+                "INSERT INTO similarity_bands (bucket, key) VALUES (?, ?)",
+                [(bucket, key) for bucket in self._buckets(scope, signature)],
+            )
+            self._db.commit()
+
+    def find(self, scope: str, api_code: str, api_info: dict) -> Optional[NearDuplicate]:
+        """
+        Cherche un contrôleur déjà généré, similaire et aux endpoints identiques.
+
+        Retourne:
+            Le meilleur NearDuplicate, ou None si aucun candidat ne convient
+        """
+        started = time.perf_counter()
+        signature = minhash(shingles(api_code, self.shingle_size), self.num_perm)
+        endpoints = endpoint_signature(api_info)
+        buckets = self._buckets(scope, signature)
+        best = None
+        with self._lock:
+            candidates = self._db.execute(
+                "SELECT s.signature, s.result_key, s.controller_name, s.endpoints, COUNT(*) AS shared "
+                "FROM similarity_bands b JOIN similarity_signatures s ON s.key = b.key "
+                f"WHERE b.bucket IN ({','.join('?' * len(buckets))}) "
+                "GROUP BY b.key ORDER BY shared DESC LIMIT ?",
+                (*buckets, self.max_candidates),
+            ).fetchall()
+        for stored, result_key, controller_name, stored_endpoints, _ in candidates:
+            if stored_endpoints != endpoints:
+                continue
+            similarity = jaccard(signature, json.loads(stored))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = NearDuplicate(result_key, similarity, controller_name)
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._lookups += 1
+            self._matches += best is not None
+            self._lookup_seconds += elapsed
+        logger.debug(
+            "Similarity lookup: %d candidates, match=%s, %.1f ms",
+            len(candidates), best is not None, elapsed * 1000,
+        )
+        return best
+
+    def stats(self) -> dict:
+        """Retourne le nombre de recherches, de correspondances et la latence moyenne"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM similarity_signatures").fetchone()[0]
+            return {
+                "entries": entries,
+                "threshold": self.threshold,
+                "lookups": self._lookups,
+                "matches": self._matches,
+                "average_lookup_ms": round(self._lookup_seconds / self._lookups * 1000, 2)
+                if self._lookups
+                else 0.0,
+            }
+
+
+def similarity_index_from_env() -> Optional[SimilarityIndex]:
+    """
+    Crée l'index à partir de SIMILARITY_THRESHOLD (0 = désactivé), SIMILARITY_NUM_PERM,
+    SIMILARITY_BANDS, SIMILARITY_SHINGLE_SIZE et SIMILARITY_MAX_CANDIDATES.
+    """
+    threshold = float(os.environ.get("SIMILARITY_THRESHOLD", "0.85"))
+    if threshold <= 0:
+        return None
+    return SimilarityIndex(
+        path=os.environ.get("CACHE_PATH", "cache/gemini_cache.sqlite3"),
+        threshold=threshold,
+        num_perm=int(os.environ.get("SIMILARITY_NUM_PERM", "128")),
+        bands=int(os.environ.get("SIMILARITY_BANDS", "32")),
+        shingle_size=int(os.environ.get("SIMILARITY_SHINGLE_SIZE", "5")),
+        max_candidates=int(os.environ.get("SIMILARITY_MAX_CANDIDATES", "20")),
+    )
@@ -0,0 +1,154 @@
+import json
+import re
+import threading
+import typing
+from functools import lru_cache
+from typing import List
+
+from pydantic import BaseModel
+
+from java_source import iter_members, parse_annotations, strip_comments
+from spring_analyzer import MAPPING_ANNOTATIONS
+
+# ====================================
+# COMPACTION DES ENTRÉES DE PROMPT
+# ====================================
+
+# Méthodes dont le corps décrit le contrat HTTP (statuts, erreurs) et est conservé
+CONTRACT_ANNOTATIONS = set(MAPPING_ANNOTATIONS) | {"RequestMapping", "ExceptionHandler"}
+
+TYPE_DECLARATION = re.compile(r"\b(?:class|interface|enum|record)\b")
+CONTRACT_ANNOTATION = re.compile(r"@(?:%s)\b" % "|".join(sorted(CONTRACT_ANNOTATIONS)))
+
+
+def _squeeze(text: str) -> str:
+    """Supprime l'indentation, les espaces de fin de ligne et les lignes vides"""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _compact_members(code: str, start: int, end: int) -> List[str]:
+    lines = []
+    position = start
+    for member_start, header, block_start, block_end in iter_members(code, start, end):
+        position = block_end + 1 if block_start != -1 else member_start + len(header) + 1
+        header = " ".join(header.split())
+        if block_start == -1:
+            if header and not header.startswith("import "):
+                lines.append(header + ";")
+            continue
+
+        annotations, rest = parse_annotations(header)
+        if TYPE_DECLARATION.search(rest):
+            lines.append(header + " {")
+            lines.extend(_compact_members(code, block_start + 1, block_end))
+            lines.append("}")
+        elif {name for name, _ in annotations} & CONTRACT_ANNOTATIONS:
+            lines.append(header + " " + _squeeze(code[block_start : block_end + 1]))
+        else:
+            lines.append(header + " { ... }")
+    # Texte sans ";" ni bloc après le dernier membre: constantes d'un enum ("A, B")
+    trailing = " ".join(code[position:end].split())
+    if trailing:
+        lines.append(trailing)
+    return lines
+
+
+@lru_cache(maxsize=64)
+def compact_java(api_code: str) -> str:
+    """
+    Réduit un code Java à ce qui décrit son contrat HTTP.
+
+    Les commentaires, importations, lignes vides et l'indentation sont supprimés;
+    le corps des méthodes est remplacé par "{ ... }" sauf pour les handlers
+    (@*Mapping) et les @ExceptionHandler, dont les statuts et erreurs renvoyés
+    servent aux tests. Un code sans aucun handler (client HTTP, classe
+    quelconque) garde tous ses corps de méthodes: ils sont alors la seule
+    description du contrat. Le résultat est mis en cache car le même code est
+    compacté à chaque étape du pipeline.
+
+    Arguments:
+        api_code: Code Java d'un ou plusieurs types
+
+    Retourne:
+        Le code compacté (ou le code sans commentaires, importations ni lignes
+        vides si aucun handler ou aucun type n'a été reconnu)
+    """
+    code = strip_comments(api_code)
+    lines = _compact_members(code, 0, len(code)) if CONTRACT_ANNOTATION.search(code) else []
+    if not any(TYPE_DECLARATION.search(line) for line in lines):
+        return _squeeze(
+            "\n".join(
+                line for line in code.splitlines() if not line.strip().startswith("import ")
+            )
+        )
+    return "\n".join(lines)
+
+
+def compact_json(value) -> str:
+    """Sérialise une valeur en JSON sans espaces superflus"""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def minify_json(text: str) -> str:
+    """Minifie un texte JSON (retourné inchangé s'il n'est pas valide)"""
+    try:
+        return compact_json(json.loads(text))
+    except ValueError:
+        return text
+
+
+def _describe(annotation) -> str:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        fields = (f'"{name}":{_describe(f.annotation)}' for name, f in annotation.model_fields.items())
+        return "{" + ",".join(fields) + "}"
+    if origin in (list, List):
+        return "[" + _describe(args[0]) + "]"
+    if origin is dict:
+        return "{" + _describe(args[0]) + ":" + _describe(args[1]) + "}"
+    if origin is typing.Union:
+        options = [_describe(arg) for arg in args if arg is not type(None)]
+        return "|".join(options) + ("|null" if len(options) < len(args) else "")
+    return getattr(annotation, "__name__", str(annotation))
+
+
+def compact_schema(model) -> str:
+    """
+    Remplace les instructions de format de PydanticOutputParser (schéma JSON
+    complet) par une description d'une ligne de la forme attendue.
+
+    Exemple pour ApiAnalysis:
+        {"controller_name":str,"base_path":str,"endpoints":[{"path":str,...}],...}
+    """
+    return (
+        "Réponds uniquement avec un objet JSON de cette forme, dans un bloc ```json:\n"
+        + _describe(model)
+    )
+
+
+class CompactionReport:
+    """Cumule, par étape du pipeline, les tokens estimés avant et après compaction"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage: str, before: int, after: int):
+        with self._lock:
+            totals = self._stages.setdefault(stage, {"calls": 0, "before": 0, "after": 0})
+            totals["calls"] += 1
+            totals["before"] += before
+            totals["after"] += after
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                stage: {
+                    **totals,
+                    "saved_ratio": round(1 - totals["after"] / totals["before"], 3)
+                    if totals["before"]
+                    else 0.0,
+                }
+                for stage, totals in self._stages.items()
+            }
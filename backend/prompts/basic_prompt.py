@@ -1,7 +1,7 @@
 from typing import List
 
-from langchain.output_parsers import PydanticOutputParser
-from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import PromptTemplate
 
 from config_class import EndpointInfo, ApiAnalysis
 
@@ -23,7 +23,9 @@ class BasePrompt:
         partial_variables: dict = None,
         temperature: float = 0.2,
     ):
-        self.template = template
+        # L'indentation des templates (chaînes multilignes dans les méthodes) n'apporte
+        # rien au modèle et coûte des tokens à chaque appel
+        self.template = "\n".join(line.strip() for line in template.splitlines())
         self.input_variables = input_variables
         self.partial_variables = partial_variables or {}
         self.temperature = temperature
@@ -0,0 +1,142 @@
+import hashlib
+import string
+from types import MappingProxyType
+from typing import Callable, Dict, NamedTuple
+
+from prompts.basic_prompt import BasePrompt
+from prompts.rest_prompt import RestAssuredPrompts
+
+# ====================================
+# REGISTRE DES PROMPTS PRÉCOMPILÉS
+# ====================================
+
+
+class CompiledPrompt(NamedTuple):
+    """
+    Prompt construit et validé une seule fois.
+
+    Attributs:
+        name: Nom du prompt dans le registre
+        prompt: Instance BasePrompt (PromptTemplate compilé et variables partielles)
+        static_prefix: Texte rendu qui précède la première variable d'entrée,
+            identique pour tous les appels (cache de préfixe des fournisseurs)
+        content_hash: Hash du template rendu et de ses variables d'entrée
+    """
+
+    name: str
+    prompt: BasePrompt
+    static_prefix: str
+    content_hash: str
+
+
+def _fields(template: str):
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+
+
+def validate_prompt(name: str, prompt: BasePrompt):
+    """
+    Vérifie que les variables déclarées correspondent exactement au template.
+
+    Lève:
+        ValueError: Si une variable est dupliquée, manquante ou inutilisée
+    """
+    declared = list(prompt.input_variables)
+    if len(set(declared)) != len(declared):
+        raise ValueError(f"Prompt {name}: duplicated input variables {declared}")
+    used = set(_fields(prompt.template))
+    provided = set(declared) | set(prompt.partial_variables)
+    if used != provided:
+        raise ValueError(
+            f"Prompt {name}: template uses {sorted(used)}, declared {sorted(provided)}"
+        )
+
+
+def static_prefix(prompt: BasePrompt) -> str:
+    """Retourne le texte rendu du template jusqu'à sa première variable d'entrée"""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(prompt.template):
+        parts.append(literal)
+        if field is None:
+            continue
+        if field not in prompt.partial_variables:
+            break
+        parts.append(str(prompt.partial_variables[field]))
+    return "".join(parts)
+
+
+def _content_hash(prompt: BasePrompt) -> str:
+    digest = hashlib.sha256(prompt.template.encode("utf-8"))
+    for name, value in sorted(prompt.partial_variables.items()):
+        digest.update(f"\0{name}={value}".encode("utf-8"))
+    digest.update(("\0" + ",".join(prompt.input_variables)).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class PromptRegistry:
+    """
+    Ensemble immuable des prompts, construits et validés à l'import.
+
+    Les handlers réutilisent les mêmes PromptTemplate au lieu d'en reconstruire
+    (et de régénérer les instructions de format du parseur) à chaque requête.
+    La version du registre est un hash de tous les prompts: elle change dès
+    qu'un template est modifié et sert de clé aux caches.
+    """
+
+    def __init__(self, builders: Dict[str, Callable[[], BasePrompt]]):
+        compiled = {}
+        for name, build in builders.items():
+            prompt = build()
+            validate_prompt(name, prompt)
+            compiled[name] = CompiledPrompt(
+                name, prompt, static_prefix(prompt), _content_hash(prompt)
+            )
+        self._prompts = MappingProxyType(compiled)
+        digest = hashlib.sha256()
+        for name in sorted(compiled):
+            digest.update(f"{name}:{compiled[name].content_hash}\n".encode("utf-8"))
+        self._version = digest.hexdigest()[:16]
+
+    @property
+    def version(self) -> str:
+        """Hash de contenu de l'ensemble des prompts"""
+        return self._version
+
+    @property
+    def prompts(self):
+        """Vue en lecture seule nom -> CompiledPrompt"""
+        return self._prompts
+
+    def get(self, name: str) -> BasePrompt:
+        """Retourne le prompt précompilé (KeyError si inconnu)"""
+        return self._prompts[name].prompt
+
+    def prefix(self, name: str) -> str:
+        """Retourne le préfixe statique du prompt"""
+        return self._prompts[name].static_prefix
+
+    def describe(self) -> dict:
+        """Retourne, pour chaque prompt, son hash et la taille de son préfixe statique"""
+        return {
+            "version": self._version,
+            "prompts": {
+                name: {
+                    "hash": compiled.content_hash,
+                    "input_variables": list(compiled.prompt.input_variables),
+                    "static_prefix_chars": len(compiled.static_prefix),
+                }
+                for name, compiled in self._prompts.items()
+            },
+        }
+
+
+prompt_registry = PromptRegistry(
+    {
+        "api_analysis": RestAssuredPrompts.get_api_analysis_prompt,
+        "api_analysis_compact": lambda: RestAssuredPrompts.get_api_analysis_prompt(compact=True),
+        "basic_test": RestAssuredPrompts.get_basic_test_prompt,
+        "advanced_test": RestAssuredPrompts.get_advanced_test_prompt,
+        "endpoint_test": RestAssuredPrompts.get_endpoint_test_prompt,
+        "endpoint_description": RestAssuredPrompts.get_endpoint_description_prompt,
+        "direct_test": RestAssuredPrompts.get_direct_test_prompt,
+    }
+)
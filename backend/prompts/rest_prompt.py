@@ -1,47 +1,52 @@
+from config_class import ApiAnalysis
+from prompt_compaction import compact_schema
 from prompts.basic_prompt import BasePrompt, api_parser
 
 # ====================================
 # CONFIGURATION DES PROMPTS
 # ====================================
 
+# Les instructions fixes de chaque prompt précèdent les variables: la partie
+# statique forme ainsi un préfixe commun réutilisable par le cache de contexte
+# des fournisseurs (voir prompts.registry).
+
 
 class RestAssuredPrompts:
-    """Collection of prompts for generating RestAssured tests"""
+    """
+    Collection of prompt builders for generating RestAssured tests.
+
+    Each getter builds a new BasePrompt; request handlers should use the
+    prebuilt instances of prompts.registry.prompt_registry instead.
+    """
 
     @staticmethod
-    def get_api_analysis_prompt() -> BasePrompt:
-        """Prompt for analyzing Spring Boot API code"""
-        template = """Tu es un expert en analyse de code Java Spring Boot. Analyse minutieusement le code API suivant et extrait les informations structurées au format spécifié.
+    def get_api_analysis_prompt(compact: bool = False) -> BasePrompt:
+        """Prompt for analyzing Spring Boot API code (compact: one-line schema instead of the full JSON schema)"""
+        template = """Tu es un expert en analyse de code Java Spring Boot. Analyse minutieusement le code API fourni et extrait les informations structurées au format spécifié.
+
+        {format_instructions}
+
+        Fournir une analyse détaillée et précise.
 
         Code API:
         ```java
         {api_code}
-        ```
-
-        {format_instructions}
-
-        Fournir une analyse détaillée et précise."""
+        ```"""
         prompt = BasePrompt(
             template=template,
             input_variables=["api_code"],
             partial_variables={
-                "format_instructions": api_parser.get_format_instructions()
+                "format_instructions": compact_schema(ApiAnalysis)
+                if compact
+                else api_parser.get_format_instructions()
             },
-        ) 
+        )
         return prompt
 
     @staticmethod
     def get_basic_test_prompt() -> BasePrompt:
         """Prompt for generating basic RestAssured tests"""
-        template = """En tant qu'ingénieur de test API expérimenté, génère un test RestAssured complet pour l'API Spring Boot suivante. Le test doit suivre les meilleures pratiques et inclure toutes les validations nécessaires.
-
-        Informations API:
-        {api_info}
-
-        Code API:
-        ```java
-        {api_code}
-        ```
+        template = """En tant qu'ingénieur de test API expérimenté, génère un test RestAssured complet pour l'API Spring Boot fournie. Le test doit suivre les meilleures pratiques et inclure toutes les validations nécessaires.
 
         Génère uniquement le code Java du test, sans explications supplémentaires. Le test doit:
         1. Inclure toutes les importations nécessaires
@@ -50,28 +55,26 @@ class RestAssuredPrompts:
         4. Tester chaque endpoint avec des assertions complètes
         5. Inclure des tests positifs et négatifs
         6. Utiliser @DisplayName et @Nested pour une meilleure organisation
-        7. Inclure des assertions sur le code de statut, les headers et le corps de la réponse"""
+        7. Inclure des assertions sur le code de statut, les headers et le corps de la réponse
+
+        Informations API:
+        {api_info}
+
+        Code API:
+        ```java
+        {api_code}
+        ```"""
 
         return BasePrompt(
             template=template,
-            input_variables=["api_code", "api_code"],
+            input_variables=["api_code", "api_info"],
             temperature=0.2,
         )
 
     @staticmethod
     def get_advanced_test_prompt() -> BasePrompt:
         """Prompt for generating advanced RestAssured tests"""
-        template = """En tant qu'expert en tests d'API, améliore le test RestAssured suivant en ajoutant des scénarios de test avancés et des techniques sophistiquées.
-
-        Code API:
-        ```java
-        {api_code}
-        ```
-
-        Test de base:
-        ```java
-        {basic_test}
-        ```
+        template = """En tant qu'expert en tests d'API, améliore le test RestAssured fourni en ajoutant des scénarios de test avancés et des techniques sophistiquées.
 
         Améliore ce test en ajoutant:
         1. Tests de limites et cas extrêmes
@@ -84,9 +87,87 @@ class RestAssuredPrompts:
         8. Utilisation de fixtures/data builders pour les données de test
         9. Assertions plus sophistiquées
 
-        Ne conserve que le code Java final amélioré, sans explications."""
+        Ne conserve que le code Java final amélioré, sans explications.
+
+        Code API:
+        ```java
+        {api_code}
+        ```
+
+        Test de base:
+        ```java
+        {basic_test}
+        ```"""
         return BasePrompt(
             template=template,
             input_variables=["api_code", "basic_test"],
             temperature=0.2,
         )
+
+    @staticmethod
+    def get_endpoint_test_prompt() -> BasePrompt:
+        """Prompt for generating the @Nested test group of a single endpoint"""
+        template = """En tant qu'ingénieur de test API expérimenté, génère les tests RestAssured d'un seul endpoint d'un contrôleur Spring Boot.
+
+        Génère uniquement le code Java, sans explications supplémentaires:
+        1. Les importations nécessaires, puis une seule classe annotée @Nested et @DisplayName
+        2. Pas de classe englobante, de @SpringBootTest ni de configuration du port: ils sont fournis par la classe parente
+        3. Des tests positifs et négatifs pour cet endpoint uniquement
+        4. Des assertions sur le code de statut, les headers et le corps de la réponse
+
+        Contrôleur: {controller_name} (chemin de base: {base_path})
+
+        Endpoint à tester:
+        {endpoint}
+
+        Code API:
+        ```java
+        {api_code}
+        ```"""
+        return BasePrompt(
+            template=template,
+            input_variables=["controller_name", "base_path", "endpoint", "api_code"],
+            temperature=0.2,
+        )
+
+    @staticmethod
+    def get_direct_test_prompt() -> BasePrompt:
+        """Prompt for generating a test in a single call, shared by every provider"""
+        template = """En tant qu'ingénieur de test API expérimenté, génère un test complet en Java avec RestAssured pour l'API Spring Boot fournie.
+
+        Génère uniquement le code Java du test dans un bloc ```java, sans explications supplémentaires. Le test doit:
+        1. Inclure toutes les importations nécessaires et la configuration de RestAssured
+        2. Tester chaque endpoint avec des assertions sur le code de statut, les headers et le corps
+        3. Inclure des tests positifs et négatifs
+
+        Type de test: {test_type}
+
+        Code API:
+        ```java
+        {api_code}
+        ```"""
+        return BasePrompt(
+            template=template,
+            input_variables=["api_code", "test_type"],
+            temperature=0.2,
+        )
+
+    @staticmethod
+    def get_endpoint_description_prompt() -> BasePrompt:
+        """Prompt for describing endpoints the local analyzer could not document"""
+        template = """Tu es un expert en analyse de code Java Spring Boot. Pour chaque endpoint listé, rédige une description courte (une phrase) de ce qu'il fait, d'après le code API.
+
+        Réponds uniquement avec un objet JSON dont les clés sont "MÉTHODE chemin" (ex: "GET /users/{{id}}") et les valeurs les descriptions.
+
+        Code API:
+        ```java
+        {api_code}
+        ```
+
+        Endpoints (méthode HTTP, chemin, méthode Java):
+        {endpoints}"""
+        return BasePrompt(
+            template=template,
+            input_variables=["api_code", "endpoints"],
+            temperature=0.2,
+        )
@@ -0,0 +1,53 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class GenerationResult(BaseModel):
+    """
+    Réponse normalisée d'un fournisseur LLM.
+
+    Attributs:
+        text: Texte généré
+        provider: Nom du fournisseur ayant répondu
+        model: Modèle utilisé
+        input_tokens: Nombre de tokens en entrée (si connu)
+        output_tokens: Nombre de tokens en sortie (si connu)
+        latency: Durée de l'appel en secondes
+        hedged: Vrai si la réponse provient d'une requête de couverture (hedge)
+    """
+
+    text: str = Field(description="Texte généré")
+    provider: str = Field(description="Nom du fournisseur")
+    model: str = Field(description="Modèle utilisé")
+    input_tokens: Optional[int] = Field(description="Tokens en entrée", default=None)
+    output_tokens: Optional[int] = Field(description="Tokens en sortie", default=None)
+    latency: float = Field(description="Durée de l'appel en secondes", default=0.0)
+    hedged: bool = Field(description="Réponse issue d'une requête de couverture", default=False)
+
+
+class ProviderError(Exception):
+    """Erreur renvoyée par un fournisseur (réseau, quota, réponse invalide)"""
+
+
+class Provider(ABC):
+    """
+    Interface commune des fournisseurs LLM.
+
+    Chaque implémentation transforme un prompt texte en GenerationResult, quel
+    que soit le format de l'API sous-jacente.
+    """
+
+    name: str = "provider"
+    model: str = ""
+
+    @abstractmethod
+    async def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+    ) -> GenerationResult:
+        """Génère une réponse pour le prompt donné"""
@@ -0,0 +1,57 @@
+import asyncio
+import random
+import time
+from typing import Optional, Sequence
+
+from providers.base import GenerationResult, Provider, ProviderError
+
+
+class FakeProvider(Provider):
+    """
+    Fournisseur local déterministe pour les tests et les benchmarks.
+
+    Attributs:
+        name: Nom du fournisseur simulé
+        latencies: Latences successives en secondes (réutilisées en boucle)
+        error_rate: Probabilité qu'un appel échoue
+        response: Texte renvoyé à chaque appel
+        seed: Graine du générateur aléatoire (rend les erreurs reproductibles)
+    """
+
+    def __init__(
+        self,
+        name: str = "fake",
+        latencies: Sequence[float] = (0.05,),
+        error_rate: float = 0.0,
+        response: str = "```java\nclass GeneratedTest {}\n```",
+        seed: Optional[int] = 0,
+    ):
+        self.name = name
+        self.model = f"{name}-model"
+        self.latencies = list(latencies)
+        self.error_rate = error_rate
+        self.response = response
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    async def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+    ) -> GenerationResult:
+        latency = self.latencies[self.calls % len(self.latencies)]
+        self.calls += 1
+        started = time.perf_counter()
+        await asyncio.sleep(latency)
+        if self._random.random() < self.error_rate:
+            raise ProviderError(f"{self.name} simulated failure")
+        return GenerationResult(
+            text=self.response,
+            provider=self.name,
+            model=self.model,
+            input_tokens=len(prompt) // 4,
+            output_tokens=len(self.response) // 4,
+            latency=time.perf_counter() - started,
+        )
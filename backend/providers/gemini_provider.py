@@ -0,0 +1,74 @@
+import os
+import time
+from typing import Optional
+
+from llm_clients import registry
+from providers.base import GenerationResult, Provider, ProviderError
+
+# Le registre garde un client par combinaison de paramètres: les valeurs demandées
+# sont arrondies pour que leur nombre reste borné (au plus 21 x 9 clients par modèle)
+TEMPERATURE_STEP = 0.1
+MAX_TEMPERATURE = 2.0
+MIN_MAX_TOKENS = 256
+MAX_MAX_TOKENS = 65536
+
+
+def quantize_sampling(temperature: float, max_tokens: int) -> tuple:
+    """
+    Arrondit les paramètres d'échantillonnage utilisés comme clé du registre.
+
+    Retourne:
+        Tuple (température bornée à [0, 2] au pas de 0.1, max_tokens borné et
+        arrondi à la puissance de deux supérieure: la réponse n'est jamais
+        plus courte que demandé)
+    """
+    temperature = min(MAX_TEMPERATURE, max(0.0, float(temperature)))
+    temperature = round(round(temperature / TEMPERATURE_STEP) * TEMPERATURE_STEP, 1)
+    max_tokens = min(MAX_MAX_TOKENS, max(MIN_MAX_TOKENS, int(max_tokens)))
+    return temperature, 1 << (max_tokens - 1).bit_length()
+
+
+class GeminiProvider(Provider):
+    """Fournisseur Gemini via LangChain (client partagé du registre)"""
+
+    name = "gemini"
+
+    def __init__(self, model: str = "gemini-2.5-flash", api_key: Optional[str] = None):
+        self.model = model
+        self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
+
+    async def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+    ) -> GenerationResult:
+        if not self.api_key:
+            raise ProviderError("Missing GEMINI_API_KEY")
+        temperature, max_tokens = quantize_sampling(temperature, max_tokens)
+        client = registry.get(
+            "gemini",
+            self.model,
+            google_api_key=self.api_key,
+            temperature=temperature,
+            top_p=0.95,
+            max_tokens=max_tokens,
+        )
+        messages = ([("system", system)] if system else []) + [("human", prompt)]
+
+        started = time.perf_counter()
+        try:
+            response = await client.ainvoke(messages)
+        except Exception as e:
+            raise ProviderError(f"Gemini request failed: {str(e)}") from e
+
+        usage = response.usage_metadata or {}
+        return GenerationResult(
+            text=response.content,
+            provider=self.name,
+            model=self.model,
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            latency=time.perf_counter() - started,
+        )
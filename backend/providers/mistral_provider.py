@@ -0,0 +1,62 @@
+import os
+import time
+from typing import Optional
+
+from llm_clients import registry
+from providers.base import GenerationResult, Provider, ProviderError
+
+
+class MistralProvider(Provider):
+    """Fournisseur Mistral via l'API HTTP (client httpx partagé du registre)"""
+
+    name = "mistral"
+
+    def __init__(
+        self,
+        model: str = "mistral-medium",
+        api_key: Optional[str] = None,
+        endpoint: str = "https://api.mistral.ai/v1",
+    ):
+        self.model = model
+        self.api_key = api_key or os.environ.get("MISTRAL_API_KEY", "")
+        self.endpoint = endpoint
+
+    async def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+    ) -> GenerationResult:
+        client = registry.get("mistral", api_key=self.api_key, endpoint=self.endpoint)
+        messages = ([{"role": "system", "content": system}] if system else []) + [
+            {"role": "user", "content": prompt}
+        ]
+        data = {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        }
+
+        started = time.perf_counter()
+        try:
+            response = await client.post("/chat/completions", json=data)
+        except Exception as e:
+            raise ProviderError(f"Mistral request failed: {str(e)}") from e
+        if response.status_code != 200:
+            raise ProviderError(
+                f"Mistral returned {response.status_code}: {response.text[:200]}"
+            )
+
+        body = response.json()
+        usage = body.get("usage", {})
+        text = body.get("choices", [{}])[0].get("message", {}).get("content", "")
+        return GenerationResult(
+            text=text,
+            provider=self.name,
+            model=self.model,
+            input_tokens=usage.get("prompt_tokens"),
+            output_tokens=usage.get("completion_tokens"),
+            latency=time.perf_counter() - started,
+        )
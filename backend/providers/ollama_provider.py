@@ -0,0 +1,52 @@
+import asyncio
+import re
+import time
+from typing import Optional
+
+from llm_clients import registry
+from providers.base import GenerationResult, Provider, ProviderError
+
+
+class OllamaProvider(Provider):
+    """Fournisseur local ollama (client partagé du registre, appelé dans un thread)"""
+
+    name = "ollama"
+
+    def __init__(self, model: str = "deepseek-r1:7b", host: Optional[str] = None):
+        self.model = model
+        self.host = host
+
+    async def generate(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.2,
+    ) -> GenerationResult:
+        params = {"host": self.host} if self.host else {}
+        client = registry.get("ollama", **params)
+        messages = ([{"role": "system", "content": system}] if system else []) + [
+            {"role": "user", "content": prompt}
+        ]
+
+        started = time.perf_counter()
+        try:
+            response = await asyncio.to_thread(
+                client.chat,
+                model=self.model,
+                messages=messages,
+                options={"temperature": temperature, "num_predict": max_tokens},
+            )
+        except Exception as e:
+            raise ProviderError(f"Ollama request failed: {str(e)}") from e
+
+        # Les modèles de raisonnement (deepseek-r1) incluent leur réflexion
+        text = re.sub(r"<think>.*?</think>", "", response.message.content, flags=re.DOTALL)
+        return GenerationResult(
+            text=text,
+            provider=self.name,
+            model=self.model,
+            input_tokens=response.prompt_eval_count,
+            output_tokens=response.eval_count,
+            latency=time.perf_counter() - started,
+        )
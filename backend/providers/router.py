@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from providers.base import GenerationResult, Provider, ProviderError
+
+# Le logger est configuré par le serveur appelant; on réutilise la même instance
+logger = logging.getLogger("gemini_api")
+
+
+class ProviderStats:
+    """
+    Statistiques glissantes d'un fournisseur sur ses derniers appels.
+
+    Attributs:
+        window: Nombre d'appels conservés pour le calcul des percentiles
+    """
+
+    def __init__(self, window: int = 100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+
+    def record(self, latency: float, success: bool):
+        if success:
+            self.latencies.append(latency)
+        self.outcomes.append(success)
+
+    def record_censored(self, elapsed: float):
+        """
+        Enregistre un appel abandonné après elapsed secondes.
+
+        Sa vraie latence est inconnue (au moins elapsed): elle n'est retenue que si
+        elapsed dépasse déjà le p95, et ne peut donc pas faire baisser les
+        percentiles. Le taux d'erreur n'est pas modifié.
+        """
+        p95 = self.percentile(0.95)
+        if p95 is None or elapsed >= p95:
+            self.latencies.append(elapsed)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": len(self.outcomes),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "error_rate": round(self.error_rate, 4),
+        }
+
+
+class Router:
+    """
+    Répartit les générations entre plusieurs fournisseurs.
+
+    Les fournisseurs sont classés par taux d'erreur puis par latence p50; un
+    fournisseur sans historique passe en premier pour être mesuré. En cas
+    d'échec, la requête est relancée sur le suivant (failover). Si hedge_delay
+    est défini, une requête de couverture est envoyée au deuxième fournisseur
+    lorsque le premier n'a pas répondu après ce délai, et la première réponse
+    reçue est retenue.
+
+    Attributs:
+        providers: Fournisseurs disponibles
+        hedge_delay: Délai en secondes avant la requête de couverture (None = désactivé)
+        window: Taille de la fenêtre glissante des statistiques
+    """
+
+    def __init__(
+        self,
+        providers: List[Provider],
+        hedge_delay: Optional[float] = None,
+        window: int = 100,
+    ):
+        if not providers:
+            raise ValueError("Router requires at least one provider")
+        self.providers = {provider.name: provider for provider in providers}
+        self.hedge_delay = hedge_delay
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats(window) for name in self.providers
+        }
+
+    def ranked(self, names: Optional[List[str]] = None) -> List[Provider]:
+        """Retourne les fournisseurs (éventuellement filtrés) du meilleur au moins bon"""
+        candidates = [self.providers[n] for n in (names or self.providers) if n in self.providers]
+
+        def score(provider):
+            stats = self.stats[provider.name]
+            return (round(stats.error_rate, 2), stats.percentile(0.5) or 0.0)
+
+        return sorted(candidates, key=score)
+
+    async def _call(self, provider: Provider, prompt: str, **kwargs) -> GenerationResult:
+        started = time.perf_counter()
+        try:
+            result = await provider.generate(prompt, **kwargs)
+        except asyncio.CancelledError:
+            # Appel abandonné au profit d'un autre: sa durée est une borne inférieure
+            self.stats[provider.name].record_censored(time.perf_counter() - started)
+            raise
+        except Exception:
+            self.stats[provider.name].record(time.perf_counter() - started, False)
+            raise
+        self.stats[provider.name].record(time.perf_counter() - started, True)
+        return result
+
+    async def generate(
+        self,
+        prompt: str,
+        providers: Optional[List[str]] = None,
+        hedge: Optional[bool] = None,
+        **kwargs,
+    ) -> GenerationResult:
+        """
+        Génère une réponse avec le meilleur fournisseur disponible.
+
+        Arguments:
+            prompt: Prompt à envoyer
+            providers: Noms des fournisseurs autorisés (tous par défaut)
+            hedge: Forcer l'activation/désactivation du hedging pour cet appel
+            **kwargs: Paramètres transmis à Provider.generate
+
+        Retourne:
+            La première réponse valide obtenue
+
+        Lève:
+            ProviderError: Si tous les fournisseurs ont échoué
+        """
+        queue = self.ranked(providers)
+        if not queue:
+            raise ProviderError("No provider available")
+        use_hedge = self.hedge_delay is not None if hedge is None else hedge
+        errors = []
+
+        while queue:
+            primary = queue.pop(0)
+            if use_hedge and queue and self.hedge_delay is not None:
+                backup = queue.pop(0)
+                try:
+                    return await self._hedged(primary, backup, prompt, **kwargs)
+                except ProviderError as e:
+                    errors.append(str(e))
+                    continue
+            try:
+                return await self._call(primary, prompt, **kwargs)
+            except Exception as e:
+                logger.warning(f"Provider {primary.name} failed: {str(e)}")
+                errors.append(f"{primary.name}: {str(e)}")
+
+        raise ProviderError("All providers failed: " + "; ".join(errors))
+
+    async def _hedged(
+        self, primary: Provider, backup: Provider, prompt: str, **kwargs
+    ) -> GenerationResult:
+        """Lance primary, puis backup après hedge_delay, et retourne la première réponse valide"""
+        tasks = {asyncio.create_task(self._call(primary, prompt, **kwargs)): primary}
+        done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay)
+        if not done or next(iter(done)).exception() is not None:
+            logger.info(f"Hedging {primary.name} with {backup.name}")
+            tasks[asyncio.create_task(self._call(backup, prompt, **kwargs))] = backup
+
+        errors = []
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result = task.result()
+                        result.hedged = tasks[task] is backup
+                        return result
+                    errors.append(f"{tasks[task].name}: {str(task.exception())}")
+        finally:
+            for task in pending:
+                task.cancel()
+        raise ProviderError("; ".join(errors))
+
+    def snapshot(self) -> dict:
+        """Retourne les statistiques courantes de chaque fournisseur"""
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
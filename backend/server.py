@@ -1,9 +1,15 @@
 from flask import Flask, request, jsonify
-from ollama import chat
 import re
 
+from llm_clients import registry
+
 app = Flask(__name__)
 
+OLLAMA_MODEL = 'deepseek-r1:7b'
+
+# Client ollama partagé, créé en arrière-plan au démarrage
+registry.warm_up([('ollama', None, {})])
+
 @app.route('/rest-assured-test', methods=['POST'])
 def generate_test():
     data = request.get_json()
@@ -13,7 +19,8 @@ def generate_test():
 
     api_code = data['api_code']
 
-    response = chat(model='deepseek-r1:7b', messages=[
+    client = registry.get('ollama')
+    response = client.chat(model=OLLAMA_MODEL, messages=[
         {
             'role': 'user',
             'content': f'''You are an experienced API test engineer. Given a Java Spring Boot API endpoint, your task is to generate a comprehensive API test using RestAssured. The generated test should include:
@@ -33,5 +40,11 @@ Your response should only include the Java test code with clear structure and be
 
     return jsonify({'generated_test': generated_test})
 
+@app.route('/health', methods=['GET'])
+def health():
+    clients = registry.check_health()
+    healthy = all(client['healthy'] is not False for client in clients)
+    return jsonify({'healthy': healthy, 'clients': clients}), 200 if healthy else 503
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,302 @@
+import re
+from typing import List, Optional, Tuple
+
+from config_class import ApiAnalysis
+from java_source import (
+    annotation_attribute,
+    annotation_values,
+    find_matching,
+    iter_members,
+    parse_annotations,
+    split_top_level,
+    strip_comments,
+)
+
+# ====================================
+# ANALYSE LOCALE DES CONTRÔLEURS SPRING
+# ====================================
+
+MAPPING_ANNOTATIONS = {
+    "GetMapping": "GET",
+    "PostMapping": "POST",
+    "PutMapping": "PUT",
+    "DeleteMapping": "DELETE",
+    "PatchMapping": "PATCH",
+}
+
+PARAMETER_SOURCES = {
+    "PathVariable": "path",
+    "RequestParam": "query",
+    "RequestBody": "body",
+    "RequestHeader": "header",
+    "CookieValue": "cookie",
+    "ModelAttribute": "query",
+    "RequestPart": "multipart",
+}
+
+# Paramètres injectés par le framework, absents du contrat HTTP
+FRAMEWORK_TYPES = {
+    "HttpServletRequest",
+    "HttpServletResponse",
+    "HttpSession",
+    "Principal",
+    "Authentication",
+    "BindingResult",
+    "Errors",
+    "Model",
+    "ModelMap",
+    "UriComponentsBuilder",
+    "WebRequest",
+    "Locale",
+}
+
+# Types standards qui ne sont pas des classes de modèle de l'API
+STANDARD_TYPES = {
+    "String", "Object", "Void", "void", "Integer", "Long", "Short", "Byte",
+    "Double", "Float", "Boolean", "Character", "BigDecimal", "BigInteger",
+    "int", "long", "short", "byte", "double", "float", "boolean", "char",
+    "List", "Set", "Map", "Collection", "Iterable", "Optional", "Page",
+    "Pageable", "ResponseEntity", "HttpEntity", "HttpStatus", "UUID",
+    "LocalDate", "LocalDateTime", "Instant", "MultipartFile", "Mono", "Flux",
+}
+
+SECURITY_ANNOTATIONS = {"PreAuthorize", "PostAuthorize", "Secured", "RolesAllowed"}
+
+MODIFIERS = {
+    "public", "protected", "private", "static", "final", "abstract",
+    "synchronized", "native", "default", "strictfp",
+}
+
+
+def _join_paths(*parts: str) -> str:
+    path = "/".join(part.strip("/") for part in parts if part and part.strip("/"))
+    return "/" + path
+
+
+def _clean_type(type_text: str) -> str:
+    return re.sub(r"\s+", " ", type_text).replace(" <", "<").replace("< ", "<").strip()
+
+
+def _model_types(type_text: str) -> List[str]:
+    """Retourne les types non standards contenus dans une déclaration de type"""
+    names = re.findall(r"[A-Z]\w*", type_text)
+    return [name for name in names if name not in STANDARD_TYPES]
+
+
+def _javadoc_summary(original: str) -> str:
+    """Retourne la première phrase de la Javadoc contenue dans le texte"""
+    docs = re.findall(r"/\*\*([\s\S]*?)\*/", original)
+    if not docs:
+        return ""
+    lines = [re.sub(r"^\s*\*\s?", "", line) for line in docs[-1].splitlines()]
+    text = " ".join(line.strip() for line in lines if line.strip())
+    text = re.split(r"\s@\w+", " " + text)[0].strip()
+    return re.split(r"(?<=\.)\s", text)[0].strip()
+
+
+def humanize_handler(name: str) -> str:
+    """Transforme un nom de méthode (getUserById) en description lisible (get user by id)"""
+    words = re.findall(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])", name)
+    return " ".join(word.lower() for word in words).capitalize()
+
+
+def _parse_parameters(params_text: str) -> List[dict]:
+    parameters = []
+    for raw in split_top_level(params_text):
+        annotations, declaration = parse_annotations(raw)
+        tokens = [t for t in declaration.split() if t != "final"]
+        if len(tokens) < 2:
+            continue
+        var_name = tokens[-1]
+        param_type = _clean_type(" ".join(tokens[:-1]))
+
+        source = None
+        required = "true"
+        name = var_name
+        for annotation, args in annotations:
+            if annotation not in PARAMETER_SOURCES:
+                continue
+            source = PARAMETER_SOURCES[annotation]
+            values = annotation_values(args, "value", "name")
+            if values and source != "body":
+                name = values[0]
+            required_attr = annotation_attribute(args, "required")
+            if required_attr == "false" or annotation_attribute(args, "defaultValue"):
+                required = "false"
+
+        if source is None:
+            if param_type.split("<")[0] in FRAMEWORK_TYPES:
+                continue
+            # Spring lie les paramètres simples non annotés à la query string
+            source = "query"
+            required = "false"
+
+        parameters.append(
+            {"name": name, "type": param_type, "in": source, "required": required}
+        )
+    return parameters
+
+
+def _parse_method(original: str, header: str) -> Optional[dict]:
+    """Analyse l'en-tête d'une méthode et retourne ses informations brutes"""
+    annotations, signature = parse_annotations(header)
+    paren = signature.find("(")
+    if paren == -1:
+        return None
+    close = find_matching(signature, paren)
+    if close == -1:
+        return None
+
+    before = signature[:paren].split()
+    tokens = [t for t in before if t not in MODIFIERS]
+    if len(tokens) < 2:
+        return None
+    return {
+        "annotations": annotations,
+        "name": tokens[-1],
+        "return_type": _clean_type(" ".join(tokens[:-1])),
+        "params": signature[paren + 1 : close],
+        "javadoc": _javadoc_summary(original),
+    }
+
+
+def _endpoint_mappings(annotations) -> List[Tuple[str, List[str]]]:
+    """Retourne les couples (méthode HTTP, chemins) déclarés par les annotations"""
+    mappings = []
+    for name, args in annotations:
+        if name in MAPPING_ANNOTATIONS:
+            paths = annotation_values(args, "value", "path") or [""]
+            mappings.append((MAPPING_ANNOTATIONS[name], paths))
+        elif name == "RequestMapping":
+            paths = annotation_values(args, "value", "path") or [""]
+            methods = re.findall(
+                r"RequestMethod\.(\w+)", annotation_attribute(args, "method") or ""
+            )
+            for method in methods or ["GET"]:
+                mappings.append((method, paths))
+    return mappings
+
+
+def _description(annotations, javadoc: str) -> str:
+    for name, args in annotations:
+        if name == "Operation":
+            values = annotation_values(args, "summary") or annotation_values(
+                args, "description"
+            )
+            if values:
+                return values[0]
+        elif name == "ApiOperation":
+            values = annotation_values(args, "value")
+            if values:
+                return values[0]
+    return javadoc
+
+
+def analyze_controller(api_code: str) -> Optional[dict]:
+    """
+    Analyse localement un contrôleur Spring à partir de ses annotations.
+
+    Arguments:
+        api_code: Code Java Spring Boot à analyser
+
+    Retourne:
+        Dictionnaire au format ApiAnalysis, ou None si aucun endpoint n'est détecté.
+        Les endpoints sans Javadoc ni @Operation ont une description vide et
+        conservent le nom de leur méthode dans la clé "handler".
+    """
+    code = strip_comments(api_code)
+    controllers = []
+    model_classes = []
+    dependencies = []
+    authentication_type = None
+
+    for start, header, body_start, body_end in iter_members(code, 0, len(code)):
+        match = re.search(r"\b(?:class|interface)\s+(\w+)", header)
+        if body_start == -1 or not match:
+            continue
+        class_annotations, _ = parse_annotations(header[: match.start()])
+        names = {name for name, _ in class_annotations}
+        base_paths = [""]
+        for name, args in class_annotations:
+            if name == "RequestMapping":
+                base_paths = annotation_values(args, "value", "path") or [""]
+        if names & SECURITY_ANNOTATIONS:
+            authentication_type = "Spring Security (method security)"
+
+        endpoints = []
+        for m_start, m_header, m_block, _ in iter_members(code, body_start + 1, body_end):
+            if m_block == -1:
+                field = re.search(r"([A-Z]\w*)\s+\w+\s*$", m_header)
+                if field and ("@Autowired" in m_header or "final" in m_header.split()):
+                    dependencies.append(field.group(1))
+                continue
+            method = _parse_method(api_code[m_start:m_block], m_header)
+            if method is None:
+                continue
+            mappings = _endpoint_mappings(method["annotations"])
+            if not mappings:
+                continue
+
+            parameters = _parse_parameters(method["params"])
+            method_names = {name for name, _ in method["annotations"]}
+            if method_names & SECURITY_ANNOTATIONS:
+                authentication_type = "Spring Security (method security)"
+            if authentication_type is None and any(
+                p["in"] == "header" and p["name"].lower() == "authorization"
+                for p in parameters
+            ):
+                authentication_type = "Authorization header"
+
+            for p in parameters:
+                if p["in"] == "body":
+                    model_classes.extend(_model_types(p["type"]))
+            model_classes.extend(_model_types(method["return_type"]))
+
+            description = _description(method["annotations"], method["javadoc"])
+            for http_method, paths in mappings:
+                for base_path in base_paths:
+                    for path in paths:
+                        endpoints.append(
+                            {
+                                "path": _join_paths(base_path, path),
+                                "method": http_method,
+                                "parameters": parameters,
+                                "return_type": method["return_type"],
+                                "description": description,
+                                "handler": method["name"],
+                            }
+                        )
+
+        if endpoints or names & {"RestController", "Controller"}:
+            controllers.append((match.group(1), _join_paths(base_paths[0]), endpoints))
+
+    endpoints = [e for _, _, controller_endpoints in controllers for e in controller_endpoints]
+    if not endpoints:
+        return None
+
+    controller_name, base_path, _ = next(c for c in controllers if c[2])
+    return {
+        "controller_name": controller_name,
+        "base_path": base_path,
+        "endpoints": endpoints,
+        "model_classes": list(dict.fromkeys(model_classes)),
+        "dependencies": list(dict.fromkeys(dependencies)),
+        "authentication_type": authentication_type,
+    }
+
+
+def unresolved_endpoints(api_info: dict) -> List[dict]:
+    """Retourne les endpoints dont la description n'a pas pu être déterminée localement"""
+    return [e for e in api_info["endpoints"] if not e.get("description")]
+
+
+def finalize_analysis(api_info: dict) -> dict:
+    """
+    Complète les descriptions manquantes et valide le résultat avec ApiAnalysis.
+
+    Les descriptions absentes sont déduites du nom de la méthode; les clés
+    internes (comme "handler") sont supprimées par la validation.
+    """
+    for endpoint in unresolved_endpoints(api_info):
+        endpoint["description"] = humanize_handler(endpoint.get("handler", ""))
+    return ApiAnalysis.model_validate(api_info).model_dump()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules du backend sont importés à plat (from batch import ...), comme par gemini.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,42 @@
+import io
+import tarfile
+
+import pytest
+
+from batch import ArchiveTooLarge, controllers_from_tarball
+
+CONTROLLER = b'@RestController\npublic class UserController {\n    @GetMapping("/users") List<User> all() { return null; }\n}\n'
+
+
+def make_archive(files, mode="w:gz"):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_extracts_only_controllers():
+    raw = make_archive([("src/UserController.java", CONTROLLER), ("src/User.java", b"class User {}")])
+    assert controllers_from_tarball(raw) == [("src/UserController.java", CONTROLLER.decode())]
+
+
+def test_truncated_archive_is_invalid():
+    raw = make_archive([("src/UserController.java", CONTROLLER * 200)])
+    with pytest.raises(ValueError, match="Invalid source archive"):
+        controllers_from_tarball(raw[: len(raw) // 2])
+
+
+def test_garbage_is_invalid():
+    with pytest.raises(ValueError, match="Invalid source archive"):
+        controllers_from_tarball(b"not an archive")
+
+
+def test_archive_limits():
+    raw = make_archive([(f"src/F{i}.java", CONTROLLER) for i in range(5)])
+    with pytest.raises(ArchiveTooLarge):
+        controllers_from_tarball(raw, max_members=4)
+    with pytest.raises(ArchiveTooLarge):
+        controllers_from_tarball(raw, max_bytes=len(CONTROLLER) * 4)
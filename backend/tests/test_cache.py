@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from cache import TwoTierCache
+
+
+def test_disk_tier_evicts_least_recently_read_past_the_cap(tmp_path):
+    cache = TwoTierCache(str(tmp_path / "cache.sqlite3"), "results", max_entries=2, max_disk_entries=5)
+    for i in range(5):
+        cache.put(f"k{i}", {"i": i})
+        time.sleep(0.001)
+    assert cache.get("k0") == {"i": 0}  # lu depuis le disque: devient le plus récent
+    for i in range(5, 12):
+        cache.put(f"k{i}", {"i": i})
+        time.sleep(0.001)
+
+    stats = cache.stats()
+    assert stats["disk_entries"] == 5
+    assert stats["evictions"] == 7
+    fresh = TwoTierCache(str(tmp_path / "cache.sqlite3"), "results", max_entries=2, max_disk_entries=5)
+    assert fresh.get("k1") is None
+    assert fresh.get("k11") == {"i": 11}
+
+
+def test_expired_rows_are_swept_without_being_read(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TwoTierCache(path, "results", ttl=60)
+    cache.put("old", {"v": 1})
+    db = sqlite3.connect(path)
+    db.execute("UPDATE results SET created_at = created_at - 120")
+    db.commit()
+
+    TwoTierCache(path, "results", ttl=60)
+    assert db.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+
+
+def test_table_without_accessed_at_is_migrated(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE results (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+    db.execute("INSERT INTO results VALUES ('k', '{\"v\": 1}', ?)", (time.time(),))
+    db.commit()
+
+    cache = TwoTierCache(path, "results")
+    assert cache.get("k") == {"v": 1}
+    cache.put("k2", {"v": 2})
+    assert cache.stats()["disk_entries"] == 2
@@ -0,0 +1,28 @@
+from near_duplicates import endpoint_signature
+
+
+def analysis(param_type="Long", location="path", return_type="User", path="/users/{id}"):
+    return {
+        "endpoints": [
+            {
+                "method": "get",
+                "path": path,
+                "parameters": [{"name": "id", "type": param_type, "in": location}],
+                "return_type": return_type,
+            }
+        ]
+    }
+
+
+def test_signature_ignores_path_variable_names_and_type_spacing():
+    assert endpoint_signature(analysis(path="/users/{userId}/")) == endpoint_signature(analysis())
+    assert endpoint_signature(analysis(return_type="Map<String, User>")) == endpoint_signature(
+        analysis(return_type="Map<String,User>")
+    )
+
+
+def test_signature_distinguishes_parameter_and_return_types():
+    base = endpoint_signature(analysis())
+    assert endpoint_signature(analysis(param_type="String")) != base
+    assert endpoint_signature(analysis(location="query")) != base
+    assert endpoint_signature(analysis(return_type="UserDto")) != base
@@ -9,8 +9,8 @@ export function GenerationOutput({
   generatedTest, 
   isLoading = false 
 }: GenerationOutputProps) {
-  // Determine what text to display
-  const displayValue = isLoading 
+  // Determine what text to display (streamed code is shown while loading)
+  const displayValue = isLoading && !generatedTest
     ? "Generating test code..." 
     : generatedTest || "No test generated yet. Click 'Generate' to create a test.";
   
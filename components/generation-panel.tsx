@@ -9,7 +9,7 @@ import ModelTemperatureSlider from "./model-temperature-slider";
 import { GenerationOutput } from "./generation-output";
 import { useState } from "react";
 import { ScrollArea } from "./ui/scroll-area";
-import { sendRequest } from "@/hooks/sendrequest";
+import { sendStreamRequest } from "@/hooks/sendrequest";
 
 export interface GenerationPanelProps {
   prompt: string;
@@ -59,7 +59,7 @@ export function GenerationPanel({
             buttonText="Generate"
             isLoading={isLoading}
             action={() =>
-              sendRequest({
+              sendStreamRequest({
                 testType: selectedTest,
                 prompt,
                 outputCode,
@@ -22,64 +22,183 @@ export const sendRequest = async ({
   setOuputCode,
 }: SendRequestProps) => {
   setIsLoading(true);
-  const isValidTestType = Object.values(TestType).includes(
-    testType as TestType
-  );
+  try {
+    const isValidTestType = Object.values(TestType).includes(
+      testType as TestType
+    );
 
-  if (outputCode !== "") {
-    setOuputCode("");
-  }
+    if (outputCode !== "") {
+      setOuputCode("");
+    }
 
-  if (!isValidTestType) {
-    throw new Error(
-      `Invalid testType: ${testType}. Expected values are: ${Object.values(
-        TestType
-      ).join(", ")}`
-    );
-  }
+    if (!isValidTestType) {
+      throw new Error(
+        `Invalid testType: ${testType}. Expected values are: ${Object.values(
+          TestType
+        ).join(", ")}`
+      );
+    }
 
-  const api = `/api/${testType}`;
+    const api = `/api/${testType}`;
 
-  const response = await fetch(api, {
-    method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-    },
-    body: JSON.stringify({
-      api_code: prompt,
-    }),
-  });
+    const response = await fetch(api, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        api_code: prompt,
+      }),
+    });
 
-  if (response.status !== 200) {
-    setIsLoading(false);
-    toast.error("Failed to send request to the server", {
-      description: `Request failed with status ${response.status}`,
+    if (response.status !== 200) {
+      toast.error("Failed to send request to the server", {
+        description: `Request failed with status ${response.status}`,
+      });
+      throw new Error(`Request failed with status ${response.status}`);
+    }
+
+    const data = await response.json();
+
+    console.log("API Response received:", {
+      hasGeneratedTest: !!data.generated_test,
+      responseLength: data.generated_test?.length || 0,
     });
-    throw new Error(`Request failed with status ${response.status}`);
+    // Check if data.generated_test exists
+    if (!data.generated_test) {
+      toast.error("No test generated", {
+        description: "The server response didn't contain any generated test code",
+      });
+      return;
+    }
+    const codeFilter = exctractTestCaseCode(data.generated_test);
+    if (codeFilter && codeFilter.length > 0) {
+      console.log("Extracted code successfully, length:", codeFilter[0].length);
+      setOuputCode(codeFilter[0]);
+    } else {
+      console.error("Failed to extract code from response:", data.generated_test);
+      toast.error("Failed to parse response");
+      setOuputCode(data.generated_test); // Fallback to using raw response
+    }
+  } finally {
+    setIsLoading(false);
+  }
+};
+
+interface StreamEvent {
+  event: string;
+  data: {
+    text?: string;
+    stage?: string;
+    endpoints?: number;
+    generated_test?: string;
+    error?: string;
+  };
+}
+
+// Parses one Server-Sent Events block ("event: ...\ndata: ...")
+const parseStreamEvent = (block: string): StreamEvent | null => {
+  let event = "message";
+  const dataLines: string[] = [];
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) {
+      event = line.slice(6).trim();
+    } else if (line.startsWith("data:")) {
+      dataLines.push(line.slice(5).trim());
+    }
   }
+  if (dataLines.length === 0) {
+    return null;
+  }
+  return { event, data: JSON.parse(dataLines.join("\n")) };
+};
 
-  const data = await response.json();
+// Sends the API code to the backend and displays the generated code while it is streamed
+export const sendStreamRequest = async ({
+  testType,
+  prompt,
+  outputCode,
+  setIsLoading,
+  setOuputCode,
+}: SendRequestProps) => {
+  setIsLoading(true);
+  try {
+    const isValidTestType = Object.values(TestType).includes(
+      testType as TestType
+    );
 
-  console.log("API Response received:", {
-  hasGeneratedTest: !!data.generated_test,
-  responseLength: data.generated_test?.length || 0
-  });
-  // Check if data.generated_test exists
-  if (!data.generated_test) {
-    toast.error("No test generated", {
-      description: "The server response didn't contain any generated test code"
+    if (outputCode !== "") {
+      setOuputCode("");
+    }
+
+    if (!isValidTestType) {
+      throw new Error(
+        `Invalid testType: ${testType}. Expected values are: ${Object.values(
+          TestType
+        ).join(", ")}`
+      );
+    }
+
+    const api = `/api/${testType}/stream`;
+
+    const response = await fetch(api, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+        Accept: "text/event-stream",
+      },
+      body: JSON.stringify({
+        api_code: prompt,
+      }),
     });
+
+    if (response.status !== 200 || !response.body) {
+      toast.error("Failed to send request to the server", {
+        description: `Request failed with status ${response.status}`,
+      });
+      throw new Error(`Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = "";
+    let streamedCode = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += value;
+      const blocks = buffer.split("\n\n");
+      buffer = blocks.pop() ?? "";
+
+      for (const block of blocks) {
+        const parsed = parseStreamEvent(block);
+        if (!parsed) {
+          continue;
+        }
+        const { event, data } = parsed;
+        if (event === "stage" && data.stage === "analysis") {
+          console.log("API analysis done:", { endpoints: data.endpoints });
+        } else if (event === "token" && data.text) {
+          streamedCode += data.text;
+          setOuputCode(streamedCode);
+        } else if (event === "done") {
+          if (!data.generated_test) {
+            toast.error("No test generated", {
+              description:
+                "The server response didn't contain any generated test code",
+            });
+          } else {
+            setOuputCode(data.generated_test);
+          }
+        } else if (event === "error") {
+          toast.error("Test generation failed", { description: data.error });
+        }
+      }
+    }
+  } finally {
+    // Also reached when the request fails or the stream is interrupted
     setIsLoading(false);
-    return;
-  }
-  const codeFilter = exctractTestCaseCode(data.generated_test);
-  if (codeFilter && codeFilter.length > 0) {
-    console.log("Extracted code successfully, length:", codeFilter[0].length);
-    setOuputCode(codeFilter[0]);
-  } else {
-    console.error("Failed to extract code from response:", data.generated_test);
-    toast.error("Failed to parse response");
-    setOuputCode(data.generated_test); // Fallback to using raw response
   }
-  setIsLoading(false);
 };